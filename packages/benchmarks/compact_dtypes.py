@@ -0,0 +1,60 @@
+"""Memory and throughput of scoring with and without compact dtypes.
+
+Run from the `packages` directory:
+
+    PYTHONPATH=. python benchmarks/compact_dtypes.py --rows 200000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import get_pipeline
+from gradient_boosting_model.processing.data_management import load_dataset
+from gradient_boosting_model.processing.dtypes import (
+    check_split_parity,
+    downcast_dtypes,
+)
+from gradient_boosting_model.processing.validation import drop_na_inputs
+
+
+def _score(data: pd.DataFrame, repeats: int) -> float:
+    """Return the best rows/second over several scoring runs."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        get_pipeline().predict(data[config.gradient_boosting_model_config.features])
+        best = min(best, time.perf_counter() - start)
+    return len(data) / best
+
+
+def run_benchmark(*, rows: int, repeats: int) -> None:
+    data = drop_na_inputs(
+        input_data=load_dataset(file_name=config.app_config.test_data_file)
+    )
+    data = pd.concat(
+        [data] * (rows // len(data) + 1), ignore_index=True
+    ).iloc[:rows]
+    compact = downcast_dtypes(dataframe=data)
+
+    features = config.gradient_boosting_model_config.features
+    parity = check_split_parity(pipeline=get_pipeline(), data=data[features])
+
+    for label, frame in (("default", data), ("compact", compact)):
+        full_mb = frame.memory_usage(deep=True).sum() / 1e6
+        features_mb = frame[features].memory_usage(deep=True).sum() / 1e6
+        throughput = _score(frame, repeats)
+        print(
+            f"{label:>8}: all columns {full_mb:8.1f} MB | "
+            f"features {features_mb:7.1f} MB | {throughput:12,.0f} rows/s"
+        )
+    print(f"identical splits: {parity}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(rows=args.rows, repeats=args.repeats)
@@ -0,0 +1,45 @@
+"""Throughput of `make_prediction` by thread count on a large batch.
+
+Run from the `packages` directory:
+
+    PYTHONPATH=. python benchmarks/parallel_scoring.py --rows 500000
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import get_pipeline, score_features
+from gradient_boosting_model.processing.data_management import load_dataset
+from gradient_boosting_model.processing.validation import drop_na_inputs
+
+
+def run_benchmark(*, rows: int, chunk_rows: int) -> None:
+    data = drop_na_inputs(
+        input_data=load_dataset(file_name=config.app_config.test_data_file)
+    )[config.gradient_boosting_model_config.features]
+    data = pd.concat(
+        [data] * (rows // len(data) + 1), ignore_index=True
+    ).iloc[:rows]
+
+    thread_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    for n_threads in thread_counts:
+        start = time.perf_counter()
+        score_features(
+            pipeline=get_pipeline(),
+            features=data,
+            n_threads=n_threads,
+            chunk_rows=chunk_rows,
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{n_threads:>3} threads: {rows / elapsed:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--chunk-rows", type=int, default=10_000)
+    args = parser.parse_args()
+    run_benchmark(rows=args.rows, chunk_rows=args.chunk_rows)
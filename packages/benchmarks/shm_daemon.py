@@ -0,0 +1,95 @@
+"""Front-end workers scoring with their own model vs. through a scoring daemon.
+
+Every front-end process sends `--batch-size` row requests back to back
+for `--seconds`; the per-worker mode calls `make_prediction` in each
+worker, the daemon mode calls `ScoringDaemon.predict`, so only the daemon
+process scores. Run from the `packages` directory:
+
+    PYTHONPATH=. python benchmarks/shm_daemon.py --workers 4 --batch-size 1
+"""
+import argparse
+import multiprocessing
+import os
+import time
+import typing as t
+
+import numpy as np
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.processing.data_management import load_dataset
+from gradient_boosting_model.processing.validation import drop_na_inputs
+from gradient_boosting_model.serving.shm_daemon import ScoringDaemon
+
+
+def _worker(
+    predictor: t.Callable[..., dict],
+    batches: t.List[t.Any],
+    seconds: float,
+    results: "multiprocessing.Queue[t.List[float]]",
+) -> None:
+    latencies: t.List[float] = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        predictor(input_data=batches[len(latencies) % len(batches)])
+        latencies.append(time.perf_counter() - start)
+    results.put(latencies)
+
+
+def _run(
+    *, predictor: t.Callable[..., dict], batches: list, workers: int, seconds: float
+) -> t.List[float]:
+    context = multiprocessing.get_context("fork")
+    results: "multiprocessing.Queue[t.List[float]]" = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(predictor, batches, seconds, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    latencies = [latency for _ in processes for latency in results.get()]
+    for process in processes:
+        process.join()
+    return latencies
+
+
+def run_benchmark(*, workers: int, batch_size: int, seconds: float) -> None:
+    data = drop_na_inputs(
+        input_data=load_dataset(file_name=config.app_config.test_data_file)
+    )
+    batches = [
+        data.iloc[start:start + batch_size]
+        for start in range(0, len(data) - batch_size + 1, batch_size)
+    ][:100]
+
+    print(f"{workers} workers, {batch_size} rows per request, {os.cpu_count()} cores")
+    with ScoringDaemon() as daemon:
+        for mode, predictor in (
+            ("per-worker model", make_prediction),
+            ("scoring daemon", daemon.predict),
+        ):
+            latencies = np.array(
+                _run(
+                    predictor=predictor,
+                    batches=batches,
+                    workers=workers,
+                    seconds=seconds,
+                )
+            )
+            print(
+                f"{mode:>17}: {len(latencies) / seconds:8.1f} requests/s, "
+                f"p50 {np.percentile(latencies, 50) * 1000:7.2f} ms, "
+                f"p99 {np.percentile(latencies, 99) * 1000:7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    run_benchmark(
+        workers=args.workers, batch_size=args.batch_size, seconds=args.seconds
+    )
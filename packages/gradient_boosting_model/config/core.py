@@ -24,6 +24,11 @@ class AppConfig(BaseModel):
     pipeline_save_file: str
     training_data_file: str
     test_data_file: str
+    emit_scoring_bundle: bool = False
+    model_dir: t.Optional[str] = None
+    artifact_chunk_bytes: int = 1048576
+    artifact_download_threads: int = 8
+    artifact_retries: int = 3
 
 
 class ModelConfig(BaseModel):
@@ -50,6 +55,19 @@ class ModelConfig(BaseModel):
     allowed_loss_functions: t.Tuple[str, ...]
     loss: str
 
+    tuning_grid: t.Dict[str, t.List[str]] = {}
+    cv_folds: int = 5
+    tuning_n_jobs: int = -1
+
+    compact_model: bool = False
+    compaction_mse_tolerance: float = 0.01
+    compaction_leaf_tolerance: float = 0.0
+    quantize_bundle: bool = False
+
+    out_of_core_chunk_rows: int = 100000
+    max_bins: int = 256
+    bin_sample_rows: int = 200000
+
     @field_validator("loss")
     def allowed_loss_function(cls, value: str, values: ValidationInfo) -> str:
         """
@@ -73,12 +91,109 @@ class ModelConfig(BaseModel):
             f"is not in the allowed set: {allowed_loss_functions}"
         )
 
+    @field_validator("max_bins")
+    def max_bins_fit_in_uint8(cls, value: int) -> int:
+        """Pre-binned features are stored as uint8 bin indices."""
+        if 2 <= value <= 256:
+            return value
+        raise ValueError(f"max_bins must be between 2 and 256, got {value}")
+
+
+class ScoringConfig(BaseModel):
+    """
+    Configuration relevant to scoring
+    batches with a trained pipeline.
+    """
+
+    compact_dtypes: bool = False
+    n_threads: int = 1
+    chunk_rows: int = 10000
+    parallel_min_rows: int = 50000
+    dedup_rows: bool = False
+    what_if_max_points: int = 1000000
+    strict_validation: bool = False
+    validation_extra_fields: t.List[str] = ["Id"]
+
+
+class MonitoringConfig(BaseModel):
+    """
+    Configuration relevant to monitoring
+    a deployed model.
+    """
+
+    prediction_store_capacity: int = 1000000
+    retention_seconds: float = 7776000
+    window_seconds: float = 86400
+    max_windows: int = 90
+    capture_dir: t.Optional[str] = None
+    capture_chunk_rows: int = 100000
+    soak_duration_seconds: float = 3600
+    soak_sample_seconds: float = 10
+    soak_warmup_seconds: float = 120
+    soak_alpha: float = 0.01
+    soak_max_memory_growth: float = 0.05
+    soak_max_latency_growth: float = 0.2
+    trace_file: t.Optional[str] = None
+    trace_sample_ratio: float = 1.0
+    trace_buffer_spans: int = 1000
+
+
+class PerformanceConfig(BaseModel):
+    """
+    Configuration relevant to the performance
+    gate run when saving a pipeline.
+    """
+
+    perf_gate: str = "warn"
+    benchmark_batch_sizes: t.List[int] = [1, 1000, 100000]
+    max_single_row_seconds: float = 0.05
+    min_rows_per_second: float = 10000
+    max_model_bytes: int = 20000000
+    max_regression: float = 0.5
+
+    @field_validator("perf_gate")
+    def allowed_perf_gate(cls, value: str) -> str:
+        """
+        What to do when a model misses its performance budget.
+
+        `off` skips the benchmark, `warn` logs the violations
+        and `refuse` raises instead of saving the pipeline.
+        """
+        if value in ("off", "warn", "refuse"):
+            return value
+        raise ValueError(
+            f"the perf_gate specified: {value}, "
+            f"is not in the allowed set: off, warn, refuse"
+        )
+
+
+class ServingConfig(BaseModel):
+    """
+    Configuration relevant to the bundled
+    HTTP prediction server.
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 8000
+    serving_workers: int = 1
+    max_request_bytes: int = 10485760
+    keep_alive_seconds: float = 5.0
+    scoring_daemon: bool = False
+    daemon_slots: int = 16
+    daemon_slot_rows: int = 4096
+    daemon_string_length: int = 32
+    daemon_timeout_seconds: float = 30.0
+
 
 class Config(BaseModel):
     """Master config object."""
 
     app_config: AppConfig
     gradient_boosting_model_config: ModelConfig
+    scoring_config: ScoringConfig
+    monitoring_config: MonitoringConfig
+    performance_config: PerformanceConfig
+    serving_config: ServingConfig
 
 
 def find_config_file() -> Path:
@@ -124,6 +239,10 @@ def create_and_validate_config(parsed_config: t.Optional[YAML] = None) -> Config
     _config = Config(
         app_config=AppConfig(**parsed_config.data),
         gradient_boosting_model_config=ModelConfig(**parsed_config.data),
+        scoring_config=ScoringConfig(**parsed_config.data),
+        monitoring_config=MonitoringConfig(**parsed_config.data),
+        performance_config=PerformanceConfig(**parsed_config.data),
+        serving_config=ServingConfig(**parsed_config.data),
     )
 
     return _config
@@ -0,0 +1,71 @@
+import logging
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import get_pipeline, validation_fields
+from gradient_boosting_model.processing.adapters import InputData, to_dataframe
+from gradient_boosting_model.processing.tree_shap import TreeExplainer
+from gradient_boosting_model.processing.validation import validate_inputs
+
+_logger = logging.getLogger(__name__)
+
+_pipeline = get_pipeline()
+_explainer: t.Optional[TreeExplainer] = (
+    TreeExplainer(model=_pipeline[-1]) if _pipeline is not None else None
+)
+
+
+def explain(*, input_data: InputData) -> dict:
+    """Explain the predictions of the saved model pipeline.
+
+    Returns the validation `errors` and, for valid inputs, `contributions`:
+    a DataFrame with one column per variable in `config.features` holding
+    the exact Shapley value of that variable for each row (see
+    `TreeExplainer`). A model feature derived from raw variables is
+    credited to the variable it replaces, so the temporal `YearRemodAdd`
+    (years since remodelling) is credited to `YearRemodAdd`, and `YrSold`,
+    which is only used to derive it, gets zero. Each row's contributions
+    add up to its prediction minus `base_value`; the predictions are
+    returned too, computed as that sum.
+    """
+    data = to_dataframe(input_data=input_data)
+    validated_data, errors = validate_inputs(
+        input_data=data, fields=validation_fields()
+    )
+    results: t.Dict[str, t.Any] = {
+        "contributions": None,
+        "base_value": None,
+        "predictions": None,
+        "version": _version,
+        "errors": errors,
+    }
+    if _pipeline is None or _explainer is None or errors:
+        _logger.error(
+            "Model pipeline is None or errors in validation. "
+            "Explanations cannot be made."
+        )
+        return results
+
+    features = validated_data[config.gradient_boosting_model_config.features]
+    if len(features):
+        transformed = _pipeline[:-1].transform(features)[_explainer.feature_names]
+        X = np.ascontiguousarray(transformed.to_numpy(dtype=np.float32))
+        shap_values = _explainer.shap_values(X)
+    else:
+        # every row was dropped for missing values
+        shap_values = np.empty((0, len(_explainer.feature_names)))
+
+    contributions = pd.DataFrame(
+        0.0,
+        index=features.index,
+        columns=config.gradient_boosting_model_config.features,
+    )
+    contributions[_explainer.feature_names] = shap_values
+    results["contributions"] = contributions
+    results["base_value"] = _explainer.expected_value
+    results["predictions"] = _explainer.expected_value + shap_values.sum(axis=1)
+    return results
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.processing.columnar import write_columnar_chunk
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+CAPTURED_AT_COLUMN = "__captured_at_ns__"
+CAPTURE_FILE_PATTERN = "capture-*.npz"
+
+
+class TrafficRecorder:
+    """Capture the validated inputs of `make_prediction` for later replay.
+
+    Batches are copied (the caller may reuse its buffers), stamped with
+    the capture time and buffered until `chunk_rows` rows are pending;
+    each chunk is then written as one compressed columnar file (see
+    `write_columnar_chunk`) by a background thread, so requests do not
+    wait for compression. File names start with the capture time of the
+    chunk's first row, zero-padded so name order is time order, then
+    carry the process id, so several workers can share a directory.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: t.Union[str, Path],
+        chunk_rows: int = config.monitoring_config.capture_chunk_rows,
+        clock: t.Callable[[], int] = time.time_ns,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunk_rows = chunk_rows
+        self.clock = clock
+
+        self._buffer: t.List[pd.DataFrame] = []
+        self._buffered_rows = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gb-capture")
+        self._pending: t.List[Future] = []
+
+    def record(self, *, dataframe: pd.DataFrame) -> None:
+        captured = dataframe.copy()
+        captured[CAPTURED_AT_COLUMN] = self.clock()
+        with self._lock:
+            self._buffer.append(captured)
+            self._buffered_rows += len(captured)
+            if self._buffered_rows >= self.chunk_rows:
+                self._write_buffer()
+
+    def flush(self) -> None:
+        """Write any buffered rows and wait until every chunk is on disk."""
+        with self._lock:
+            self._write_buffer()
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.shutdown()
+
+    def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+        chunk = pd.concat(self._buffer, ignore_index=True)
+        first_captured_at = int(chunk[CAPTURED_AT_COLUMN].iloc[0])
+        path = self.directory / (
+            f"capture-{first_captured_at:020d}-{os.getpid()}-{self._sequence:06d}.npz"
+        )
+        self._buffer, self._buffered_rows = [], 0
+        self._sequence += 1
+        for future in self._pending:
+            if future.done() and future.exception() is not None:
+                _logger.error(f"Failed to write a capture chunk: {future.exception()}")
+        self._pending = [future for future in self._pending if not future.done()]
+        self._pending.append(
+            self._writer.submit(write_columnar_chunk, path=path, dataframe=chunk)
+        )
+        _logger.debug(f"Capturing {len(chunk)} rows to: {path}")
@@ -0,0 +1,204 @@
+import threading
+import time
+import typing as t
+
+import numpy as np
+
+from gradient_boosting_model.config.core import config
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# count, sum of errors, sum of absolute errors, sum of squared errors
+_N_STATS = 4
+
+
+class DelayedLabelEvaluator:
+    """Join late-arriving sale prices to earlier predictions by `Id`.
+
+    Predictions are kept in fixed-size arrays used as a ring buffer, so
+    memory is bounded by `capacity` whatever the traffic; entries also
+    expire after `retention_seconds`. When labels arrive they are joined
+    to the latest live prediction of each version for their `Id`, in one
+    vectorized pass per version,
+    and streaming error statistics are updated per model version and
+    per `window_seconds` window of prediction time, keeping at most
+    `max_windows` windows per version.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int = config.monitoring_config.prediction_store_capacity,
+        retention_seconds: float = config.monitoring_config.retention_seconds,
+        window_seconds: float = config.monitoring_config.window_seconds,
+        max_windows: int = config.monitoring_config.max_windows,
+        clock: t.Callable[[], float] = time.time,
+    ):
+        self.capacity = capacity
+        self.retention_seconds = retention_seconds
+        self.window_seconds = window_seconds
+        self.max_windows = max_windows
+        self.clock = clock
+
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._predictions = np.zeros(capacity, dtype=np.float64)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._versions = np.zeros(capacity, dtype=np.int16)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._next_slot = 0
+        # the unexpired entries, oldest first, are the `_size` slots
+        # ending before `_next_slot`
+        self._size = 0
+
+        self._version_codes: t.Dict[str, int] = {}
+        self._stats: t.Dict[str, t.Dict[float, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        *,
+        ids: t.Sequence[int],
+        predictions: t.Sequence[float],
+        version: str,
+        timestamp: t.Optional[float] = None,
+    ) -> None:
+        """Store a batch of predictions, overwriting the oldest when full.
+
+        Batches are expected in time order, as expiry only looks at the
+        oldest entries.
+        """
+        # only the newest `capacity` rows of an oversized batch can be kept
+        id_values = np.asarray(ids, dtype=np.int64)[-self.capacity:]
+        prediction_values = np.asarray(predictions, dtype=np.float64)[
+            -self.capacity:
+        ]
+        now = self.clock() if timestamp is None else timestamp
+
+        with self._lock:
+            code = self._version_codes.setdefault(version, len(self._version_codes))
+            slots = (self._next_slot + np.arange(id_values.size)) % self.capacity
+            self._ids[slots] = id_values
+            self._predictions[slots] = prediction_values
+            self._timestamps[slots] = now
+            self._versions[slots] = code
+            self._live[slots] = True
+            self._next_slot = int((self._next_slot + id_values.size) % self.capacity)
+            self._size = min(self._size + id_values.size, self.capacity)
+            self._evict(now=now)
+
+    def add_labels(self, *, ids: t.Sequence[int], labels: t.Sequence[float]) -> int:
+        """Join true prices to stored predictions and update the metrics.
+
+        The first label for an `Id` consumes the latest live prediction
+        for it of every model version, so versions scoring the same
+        traffic side by side are all evaluated. Labels without a live
+        prediction are ignored.
+
+        Returns:
+            The number of labels that were matched.
+        """
+        label_ids = np.asarray(ids, dtype=np.int64)
+        label_values = np.asarray(labels, dtype=np.float64)
+
+        with self._lock:
+            self._evict(now=self.clock())
+            live_slots = np.flatnonzero(self._live)
+            if not live_slots.size:
+                return 0
+            # a repeated label Id in the batch only counts once
+            _, first = np.unique(label_ids, return_index=True)
+            label_ids, label_values = label_ids[first], label_values[first]
+            labelled = np.zeros(label_ids.size, dtype=bool)
+
+            # every version that scored an Id is evaluated on its label
+            live_codes = self._versions[live_slots]
+            for code in np.unique(live_codes):
+                version_slots = live_slots[live_codes == code]
+                # sort by Id, then time, and keep the latest prediction per Id
+                order = version_slots[
+                    np.lexsort(
+                        (self._timestamps[version_slots], self._ids[version_slots])
+                    )
+                ]
+                sorted_ids = self._ids[order]
+                is_latest = np.append(sorted_ids[1:] != sorted_ids[:-1], True)
+                order, sorted_ids = order[is_latest], sorted_ids[is_latest]
+
+                positions = np.searchsorted(sorted_ids, label_ids)
+                positions[positions == sorted_ids.size] = 0
+                matched = sorted_ids[positions] == label_ids
+                slots = order[positions[matched]]
+                errors = self._predictions[slots] - label_values[matched]
+
+                self._update_stats(slots=slots, errors=errors)
+                self._live[slots] = False
+                labelled |= matched
+        return int(labelled.sum())
+
+    def metrics(self, *, version: t.Optional[str] = None) -> t.List[dict]:
+        """RMSE, MAE and bias per model version and prediction time window."""
+        rows = []
+        with self._lock:
+            for stats_version, windows in self._stats.items():
+                if version is not None and stats_version != version:
+                    continue
+                for window_start, stats in sorted(windows.items()):
+                    count, total, total_abs, total_sq = stats
+                    rows.append(
+                        {
+                            "version": stats_version,
+                            "window_start": window_start,
+                            "count": int(count),
+                            "rmse": float(np.sqrt(total_sq / count)),
+                            "mae": float(total_abs / count),
+                            "bias": float(total / count),
+                        }
+                    )
+        return rows
+
+    @property
+    def n_pending(self) -> int:
+        """Number of stored predictions still waiting for a label."""
+        return int(self._live.sum())
+
+    def _evict(self, *, now: float) -> None:
+        """Expire the oldest entries, in time order, up to the first live one."""
+        cutoff = now - self.retention_seconds
+        oldest = (self._next_slot - self._size) % self.capacity
+        # the stored entries are at most two sorted runs of the ring
+        while self._size and self._timestamps[oldest] < cutoff:
+            end = min(oldest + self._size, self.capacity)
+            expired = int(
+                np.searchsorted(self._timestamps[oldest:end], cutoff, side="left")
+            )
+            self._live[oldest:oldest + expired] = False
+            self._size -= expired
+            oldest = (oldest + expired) % self.capacity
+
+    def _update_stats(self, *, slots: np.ndarray, errors: np.ndarray) -> None:
+        if not slots.size:
+            return
+        codes = self._versions[slots]
+        windows = np.floor(self._timestamps[slots] / self.window_seconds)
+        groups, group_index = np.unique(
+            np.stack([codes, windows], axis=1), axis=0, return_inverse=True
+        )
+        group_index = group_index.ravel()
+        sums = np.zeros((len(groups), _N_STATS))
+        for column, values in enumerate(
+            (np.ones_like(errors), errors, np.abs(errors), errors**2)
+        ):
+            sums[:, column] = np.bincount(
+                group_index, weights=values, minlength=len(groups)
+            )
+
+        versions = {code: name for name, code in self._version_codes.items()}
+        for (code, window), group_sums in zip(groups, sums):
+            version_stats = self._stats.setdefault(versions[int(code)], {})
+            window_start = float(window * self.window_seconds)
+            version_stats.setdefault(window_start, np.zeros(_N_STATS))
+            version_stats[window_start] += group_sums
+            while len(version_stats) > self.max_windows:
+                del version_stats[min(version_stats)]
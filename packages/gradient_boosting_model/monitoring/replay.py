@@ -0,0 +1,200 @@
+import argparse
+import json
+import time
+import typing as t
+from pathlib import Path
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.pipeline import Pipeline
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.monitoring.capture import (
+    CAPTURE_FILE_PATTERN,
+    CAPTURED_AT_COLUMN,
+)
+from gradient_boosting_model.predict import validation_fields
+from gradient_boosting_model.processing.columnar import read_columnar_chunk
+from gradient_boosting_model.processing.data_management import load_pipeline
+from gradient_boosting_model.processing.validation import validate_inputs
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# pipelines loaded by this (worker) process, by file name
+_pipelines: t.Dict[str, Pipeline] = {}
+
+
+def _get_pipeline(file_name: str) -> Pipeline:
+    if file_name not in _pipelines:
+        _pipelines[file_name] = load_pipeline(file_name=file_name)
+    return _pipelines[file_name]
+
+
+def _replay_chunk(*, chunk_file: Path, pipeline_files: t.Mapping[str, str]) -> dict:
+    """Score one capture chunk with every version and summarise the outcome.
+
+    Only summary statistics leave the worker, so memory in the parent
+    does not grow with the amount of traffic replayed.
+    """
+    data = read_columnar_chunk(chunk_file).drop(columns=[CAPTURED_AT_COLUMN])
+    # the fields every replayed version reads
+    fields = validation_fields(
+        pipelines=[_get_pipeline(file_name) for file_name in pipeline_files.values()]
+    )
+    validated_data, errors = validate_inputs(input_data=data, fields=fields)
+    valid = np.ones(len(validated_data), dtype=bool)
+    if errors:
+        valid[list(errors)] = False
+    features = validated_data.loc[valid, config.gradient_boosting_model_config.features]
+    invalid_rows = len(data) - int(valid.sum())
+
+    summary: t.Dict[str, t.Any] = {
+        "rows": len(data),
+        "versions": {},
+        "deltas": {},
+        "baseline_failed": False,
+    }
+    baseline_name = next(iter(pipeline_files))
+    baseline: t.Optional[np.ndarray] = None
+    for name, file_name in pipeline_files.items():
+        pipeline = _get_pipeline(file_name)
+        start = time.perf_counter()
+        try:
+            predictions = pipeline.predict(features)
+            failed_rows = 0
+        except Exception as exc:
+            _logger.error(f"Version {name} failed on {chunk_file}: {exc}")
+            predictions, failed_rows = None, len(features)
+        summary["versions"][name] = {
+            "scored_rows": len(features) - failed_rows,
+            "error_rows": invalid_rows + failed_rows,
+            "seconds": time.perf_counter() - start,
+        }
+
+        if name == baseline_name:
+            # without baseline predictions this chunk has no deltas
+            baseline = predictions
+            summary["baseline_failed"] = predictions is None
+        elif predictions is not None and baseline is not None:
+            deltas = predictions - baseline
+            summary["deltas"][name] = {
+                "count": deltas.size,
+                "sum": float(deltas.sum()),
+                "sum_abs": float(np.abs(deltas).sum()),
+                "sum_squares": float((deltas**2).sum()),
+                "max_abs": float(np.abs(deltas).max(initial=0.0)),
+                "changed_rows": int(np.count_nonzero(deltas)),
+            }
+    return summary
+
+
+def replay(
+    *,
+    capture_dir: t.Union[str, Path],
+    pipeline_files: t.Mapping[str, str],
+    n_jobs: int = -1,
+) -> dict:
+    """Re-score captured traffic with one or more pipeline versions.
+
+    Every capture chunk is a task on a process pool, and each worker
+    loads every pipeline once. Predictions are compared with those of
+    the first version in `pipeline_files`, which maps a name to a
+    pipeline file (relative to the trained models dir, or absolute).
+
+    Returns:
+        Per version: scored and error rows, error rate, CPU-side scoring
+        seconds and throughput, and per-chunk latency percentiles. Per
+        other version: mean, mean absolute, RMS and max absolute
+        prediction delta from the first, and how many rows changed.
+        Chunks the first version fails on have no deltas; they are
+        counted as `baseline_failed_chunks`.
+    """
+    chunk_files = sorted(Path(capture_dir).glob(CAPTURE_FILE_PATTERN))
+    start = time.perf_counter()
+    summaries = Parallel(n_jobs=n_jobs)(
+        delayed(_replay_chunk)(chunk_file=chunk_file, pipeline_files=pipeline_files)
+        for chunk_file in chunk_files
+    )
+    wall_seconds = time.perf_counter() - start
+
+    rows = sum(summary["rows"] for summary in summaries)
+    report: t.Dict[str, t.Any] = {
+        "chunks": len(chunk_files),
+        "rows": rows,
+        "wall_seconds": wall_seconds,
+        "baseline_failed_chunks": sum(
+            summary["baseline_failed"] for summary in summaries
+        ),
+        "versions": {},
+        "deltas": {},
+    }
+    for name in pipeline_files:
+        versions = [summary["versions"][name] for summary in summaries]
+        scored = sum(version["scored_rows"] for version in versions)
+        error_rows = sum(version["error_rows"] for version in versions)
+        chunk_seconds = np.array([version["seconds"] for version in versions])
+        seconds = float(chunk_seconds.sum())
+        report["versions"][name] = {
+            "scored_rows": scored,
+            "error_rows": error_rows,
+            "error_rate": error_rows / rows if rows else 0.0,
+            "seconds": seconds,
+            "rows_per_second": scored / seconds if seconds else 0.0,
+            "chunk_seconds_p50": float(np.percentile(chunk_seconds, 50))
+            if chunk_seconds.size
+            else 0.0,
+            "chunk_seconds_p99": float(np.percentile(chunk_seconds, 99))
+            if chunk_seconds.size
+            else 0.0,
+        }
+
+        deltas = [
+            summary["deltas"][name]
+            for summary in summaries
+            if name in summary["deltas"]
+        ]
+        count = sum(delta["count"] for delta in deltas)
+        if count:
+            report["deltas"][name] = {
+                "baseline": next(iter(pipeline_files)),
+                "rows": count,
+                "mean": sum(delta["sum"] for delta in deltas) / count,
+                "mean_abs": sum(delta["sum_abs"] for delta in deltas) / count,
+                "rmse": float(
+                    np.sqrt(sum(delta["sum_squares"] for delta in deltas) / count)
+                ),
+                "max_abs": max(delta["max_abs"] for delta in deltas),
+                "changed_rows": sum(delta["changed_rows"] for delta in deltas),
+            }
+
+    _logger.info(f"Replayed {rows} rows in {wall_seconds:.1f}s")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay captured traffic through one or more pipeline versions."
+    )
+    parser.add_argument("capture_dir", type=Path)
+    parser.add_argument(
+        "--pipeline",
+        action="append",
+        required=True,
+        metavar="NAME=FILE",
+        help="pipeline version to score with; the first one is the baseline",
+    )
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    print(
+        json.dumps(
+            replay(
+                capture_dir=args.capture_dir,
+                pipeline_files=dict(item.split("=", 1) for item in args.pipeline),
+                n_jobs=args.n_jobs,
+            ),
+            indent=2,
+        )
+    )
@@ -0,0 +1,347 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import typing as t
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.multi_predict import MultiModelPredictor
+from gradient_boosting_model.predict import get_pipeline, make_prediction
+from gradient_boosting_model.synthetic import SyntheticDataGenerator
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# relative weight of each kind of request in the generated traffic
+TRAFFIC_MIX = {
+    "single_record": 0.5,
+    "batch_frame": 0.2,
+    "batch_columns": 0.1,
+    "invalid_batch": 0.1,
+    "deadline_batch": 0.05,
+    "multi_model": 0.05,
+}
+MEMORY_METRICS = ("rss_bytes", "traced_bytes", "gc_objects")
+LATENCY_METRICS = ("latency_p50", "latency_p99")
+
+
+def rss_bytes() -> t.Optional[int]:
+    """Resident set size of this process, None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def detect_trend(
+    *, elapsed: t.Sequence[float], values: t.Sequence[float], alpha: float
+) -> dict:
+    """Least squares trend of `values` over `elapsed` seconds.
+
+    `growth` is the increase the fitted line predicts over the whole
+    window relative to its starting value, and `significant` whether the
+    slope is positive with a p-value under `alpha`.
+    """
+    x, y = np.asarray(elapsed, dtype=np.float64), np.asarray(values, dtype=np.float64)
+    if len(y) < 3 or np.ptp(x) == 0 or np.ptp(y) == 0:
+        return {"slope": 0.0, "p_value": 1.0, "growth": 0.0, "significant": False}
+    fit = stats.linregress(x, y)
+    start = fit.intercept + fit.slope * x[0]
+    growth = fit.slope * np.ptp(x) / max(abs(start), np.finfo(np.float64).tiny)
+    return {
+        "slope": float(fit.slope),
+        "p_value": float(fit.pvalue),
+        "growth": float(growth),
+        "significant": bool(fit.slope > 0 and fit.pvalue < alpha),
+    }
+
+
+class _Traffic:
+    """Requests of every kind, cut from a fixed pool of synthetic rows.
+
+    The pool is generated once and every request gets its own copy of its
+    rows, so the harness itself allocates the same amount per request for
+    the whole run and does not mask or fake growth in the code under test.
+    """
+
+    def __init__(self, *, pool_rows: int, batch_rows: int, seed: int):
+        generator = SyntheticDataGenerator.from_csv(
+            file_name=config.app_config.test_data_file
+        )
+        self.valid = pd.concat(
+            generator.generate(n_rows=pool_rows, seed=seed), ignore_index=True
+        )
+        self.invalid = pd.concat(
+            generator.generate(n_rows=batch_rows, seed=seed + 1, invalid_rate=0.2),
+            ignore_index=True,
+        )
+        self.batch_rows = batch_rows
+        self.rng = np.random.default_rng(seed)
+        pipeline = get_pipeline()
+        self.multi_model = (
+            None
+            if pipeline is None
+            else MultiModelPredictor(pipelines={"a": pipeline, "b": pipeline})
+        )
+
+    def _rows(self, n_rows: int) -> pd.DataFrame:
+        start = int(self.rng.integers(0, len(self.valid) - n_rows + 1))
+        # a copy: every view of the pool would be tracked by its blocks
+        return self.valid.take(np.arange(start, start + n_rows)).reset_index(drop=True)
+
+    def request(self, kind: str) -> t.Tuple[t.Callable[[], dict], t.Any]:
+        """The call to time for a request of `kind`, and its input."""
+        if kind == "single_record":
+            data: t.Any = self._rows(1).to_dict(orient="records")
+        elif kind == "batch_frame":
+            data = self._rows(self.batch_rows)
+        elif kind == "batch_columns":
+            frame = self._rows(self.batch_rows)
+            data = {column: frame[column].to_numpy() for column in frame.columns}
+        elif kind == "invalid_batch":
+            data = self.invalid.copy()
+        elif kind == "deadline_batch":
+            data = self._rows(self.batch_rows)
+            return (lambda: make_prediction(input_data=data, deadline_seconds=1.0)), data
+        elif kind == "multi_model":
+            data = self._rows(self.batch_rows)
+            if self.multi_model is not None:
+                predictor = self.multi_model
+                return (lambda: predictor.predict(input_data=data)), data
+        else:
+            raise ValueError(f"Unknown kind of request: {kind}")
+        return (lambda: make_prediction(input_data=data)), data
+
+
+def _input_copy(data: t.Any) -> t.Any:
+    if isinstance(data, pd.DataFrame):
+        return data.copy(deep=True)
+    if isinstance(data, dict):
+        return {column: values.copy() for column, values in data.items()}
+    return [dict(record) for record in data]
+
+
+def _input_unchanged(data: t.Any, copy: t.Any) -> bool:
+    if isinstance(data, pd.DataFrame):
+        return data.equals(copy)
+    if isinstance(data, dict):
+        return data.keys() == copy.keys() and all(
+            pd.Series(data[column]).equals(pd.Series(copy[column])) for column in data
+        )
+    return data == copy
+
+
+def run_soak(
+    *,
+    duration_seconds: float = config.monitoring_config.soak_duration_seconds,
+    sample_seconds: float = config.monitoring_config.soak_sample_seconds,
+    warmup_seconds: float = config.monitoring_config.soak_warmup_seconds,
+    batch_rows: int = 200,
+    pool_rows: int = 20000,
+    mix: t.Optional[t.Mapping[str, float]] = None,
+    alpha: float = config.monitoring_config.soak_alpha,
+    max_memory_growth: float = config.monitoring_config.soak_max_memory_growth,
+    max_latency_growth: float = config.monitoring_config.soak_max_latency_growth,
+    seed: int = 0,
+    trace_allocations: bool = True,
+    top_allocations: int = 10,
+) -> dict:
+    """Drive the scoring paths with mixed synthetic traffic and look for drift.
+
+    Requests are drawn from `mix` (default `TRAFFIC_MIX`) back to back
+    for `duration_seconds`. Every `sample_seconds` the RSS, the memory
+    traced by tracemalloc, the number of objects tracked by the garbage
+    collector and the p50/p99 latency of the requests since the previous
+    sample are recorded, and the input of one request is checked to be
+    unchanged by the call.
+
+    Samples taken during the first `warmup_seconds` (caches, allocator
+    pools) are left out of the trend tests. A memory metric fails when its
+    linear trend is significant at `alpha` and grows by more than
+    `max_memory_growth` over the run, a latency metric likewise with
+    `max_latency_growth`; so does any mutated input. The report lists the
+    failures, the samples and the source lines whose allocations grew most
+    between the first sample after warmup and the end of the run.
+
+    Tracing allocations slows scoring down several times; without
+    `trace_allocations` only the RSS and object counts track memory.
+    """
+    mix = TRAFFIC_MIX if mix is None else mix
+    kinds, weights = list(mix), np.array(list(mix.values()), dtype=np.float64)
+    traffic = _Traffic(pool_rows=pool_rows, batch_rows=batch_rows, seed=seed)
+    started_tracing = trace_allocations and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    samples: t.List[dict] = []
+    counts: t.Counter[str] = t.Counter()
+    mutated: t.Counter[str] = t.Counter()
+    errors: t.Counter[str] = t.Counter()
+    baseline_snapshot: t.Optional[tracemalloc.Snapshot] = None
+    window: t.List[float] = []
+    try:
+        start = time.perf_counter()
+        next_sample = start + sample_seconds
+        check_input = True
+        while True:
+            now = time.perf_counter()
+            if now >= next_sample:
+                latency = np.array(window) if window else np.full(1, np.nan)
+                window = []
+                gc_counts = gc.get_count()
+                samples.append(
+                    {
+                        "elapsed_seconds": now - start,
+                        "rss_bytes": rss_bytes(),
+                        "traced_bytes": (
+                            tracemalloc.get_traced_memory()[0]
+                            if tracemalloc.is_tracing()
+                            else None
+                        ),
+                        "gc_objects": len(gc.get_objects()),
+                        "gc_counts": list(gc_counts),
+                        "gc_collections": [
+                            generation["collections"] for generation in gc.get_stats()
+                        ],
+                        "requests": sum(counts.values()),
+                        "latency_p50": float(np.percentile(latency, 50)),
+                        "latency_p99": float(np.percentile(latency, 99)),
+                    }
+                )
+                if (
+                    baseline_snapshot is None
+                    and tracemalloc.is_tracing()
+                    and now - start >= warmup_seconds
+                ):
+                    baseline_snapshot = tracemalloc.take_snapshot()
+                next_sample += sample_seconds
+                check_input = True
+                if now - start >= duration_seconds:
+                    break
+
+            kind = kinds[int(traffic.rng.choice(len(kinds), p=weights / weights.sum()))]
+            call, data = traffic.request(kind)
+            copy = _input_copy(data) if check_input else None
+            request_start = time.perf_counter()
+            try:
+                call()
+            except Exception:
+                _logger.exception(f"Soak request {kind} raised")
+                errors[kind] += 1
+            window.append(time.perf_counter() - request_start)
+            counts[kind] += 1
+            if copy is not None:
+                check_input = False
+                if not _input_unchanged(data, copy):
+                    mutated[kind] += 1
+
+        growth: t.List[dict] = []
+        if baseline_snapshot is not None:
+            ignored = [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+            final_snapshot = tracemalloc.take_snapshot().filter_traces(ignored)
+            for stat in final_snapshot.compare_to(
+                baseline_snapshot.filter_traces(ignored), "lineno"
+            )[:top_allocations]:
+                frame = stat.traceback[0]
+                growth.append(
+                    {
+                        "location": f"{frame.filename}:{frame.lineno}",
+                        "size_diff_bytes": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                    }
+                )
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    steady = [
+        sample for sample in samples if sample["elapsed_seconds"] >= warmup_seconds
+    ]
+    trends, failures = {}, []
+    for metric in MEMORY_METRICS + LATENCY_METRICS:
+        points = [
+            (sample["elapsed_seconds"], sample[metric])
+            for sample in steady
+            if sample[metric] is not None and not np.isnan(sample[metric])
+        ]
+        elapsed, values = zip(*points) if points else ((), ())
+        trend = detect_trend(elapsed=elapsed, values=values, alpha=alpha)
+        trends[metric] = trend
+        limit = max_memory_growth if metric in MEMORY_METRICS else max_latency_growth
+        if trend["significant"] and trend["growth"] > limit:
+            failures.append(
+                f"{metric} grew {trend['growth']:.1%} over the run "
+                f"(p={trend['p_value']:.2g}, limit {limit:.0%})"
+            )
+    for kind, count in mutated.items():
+        failures.append(f"{kind} requests changed their input ({count} times)")
+    if len(steady) < 3:
+        _logger.warning(
+            f"Only {len(steady)} samples after warmup, too few to test for trends."
+        )
+
+    report = {
+        "passed": not failures,
+        "failures": failures,
+        "duration_seconds": samples[-1]["elapsed_seconds"],
+        "requests": dict(counts),
+        "request_errors": dict(errors),
+        "trends": trends,
+        "allocation_growth": growth,
+        "samples": samples,
+    }
+    _logger.info(
+        f"Soak run of {report['duration_seconds']:.0f}s, "
+        f"{sum(counts.values())} requests: "
+        f"{'passed' if report['passed'] else 'failed'} {failures}"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Soak the scoring paths with synthetic traffic and test for drift."
+    )
+    parser.add_argument(
+        "--duration", type=float, default=config.monitoring_config.soak_duration_seconds
+    )
+    parser.add_argument(
+        "--sample", type=float, default=config.monitoring_config.soak_sample_seconds
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=config.monitoring_config.soak_warmup_seconds
+    )
+    parser.add_argument("--batch-rows", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-tracemalloc", action="store_true", help="do not trace allocations"
+    )
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run_soak(
+        duration_seconds=args.duration,
+        sample_seconds=args.sample,
+        warmup_seconds=args.warmup,
+        batch_rows=args.batch_rows,
+        seed=args.seed,
+        trace_allocations=not args.no_tracemalloc,
+    )
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    print(json.dumps({key: report[key] for key in report if key != "samples"}, indent=2))
+    sys.exit(0 if report["passed"] else 1)
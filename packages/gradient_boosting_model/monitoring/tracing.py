@@ -0,0 +1,308 @@
+import atexit
+import contextlib
+import contextvars
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import typing as t
+from pathlib import Path
+
+from gradient_boosting_model.config.core import config
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# OTLP enum values
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_UNSET = 0
+STATUS_CODE_ERROR = 2
+
+_TRACE_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+# the innermost open span of the current thread or task; _UNSAMPLED
+# inside a trace that head sampling dropped. Pool threads do not inherit
+# it, work submitted to one runs under `contextvars.copy_context()` to
+# stay in the caller's trace.
+_UNSAMPLED = object()
+_current: contextvars.ContextVar[t.Any] = contextvars.ContextVar(
+    "gb_current_span", default=None
+)
+_NO_SPAN: t.ContextManager[None] = contextlib.nullcontext()
+
+
+class Span:
+    """One timed operation of a trace, in the OpenTelemetry data model."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "attributes",
+        "start_time_unix_nano",
+        "end_time_unix_nano",
+        "error",
+        "_start_ns",
+    )
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        trace_id: str,
+        parent_span_id: t.Optional[str],
+        attributes: t.Dict[str, t.Any],
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes
+        self.error: t.Optional[str] = None
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano = self.start_time_unix_nano
+        self._start_ns = time.perf_counter_ns()
+
+    def set_attribute(self, key: str, value: t.Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        # wall clock start, monotonic duration
+        self.end_time_unix_nano = self.start_time_unix_nano + (
+            time.perf_counter_ns() - self._start_ns
+        )
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.end_time_unix_nano - self.start_time_unix_nano) / 1e9
+
+    def to_dict(self) -> dict:
+        """The span as an OTLP/JSON span object."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_time_unix_nano),
+            "endTimeUnixNano": str(self.end_time_unix_nano),
+            "attributes": [
+                {"key": key, "value": _any_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": (
+                {"code": STATUS_CODE_ERROR, "message": self.error}
+                if self.error is not None
+                else {"code": STATUS_CODE_UNSET}
+            ),
+        }
+
+
+def _any_value(value: t.Any) -> dict:
+    # bool before int, it is one; OTLP/JSON encodes 64-bit ints as strings
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Exporter(t.Protocol):
+    """Receives the spans of sampled traces as they end."""
+
+    def export(self, spans: t.Sequence[Span]) -> None:
+        ...
+
+    def flush(self) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class JsonLinesExporter:
+    """Append spans to a file, one OTLP/JSON span object per line.
+
+    Spans are buffered and written `buffer_spans` at a time, so a
+    request only pays for the file write once in that many spans; call
+    `flush` (done at exit for the default tracer) to write the rest.
+    """
+
+    def __init__(
+        self,
+        *,
+        path: t.Union[str, Path],
+        buffer_spans: int = config.monitoring_config.trace_buffer_spans,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.buffer_spans = buffer_spans
+        self._buffer: t.List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: t.Sequence[Span]) -> None:
+        with self._lock:
+            self._buffer.extend(spans)
+            if len(self._buffer) >= self.buffer_spans:
+                self._write_buffer()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write_buffer()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+        lines = "".join(
+            json.dumps(span.to_dict(), separators=(",", ":")) + "\n"
+            for span in self._buffer
+        )
+        self._buffer = []
+        with open(self.path, "a") as file:
+            file.write(lines)
+
+
+class InMemoryExporter:
+    """Keep ended spans in `spans`, e.g. for tests."""
+
+    def __init__(self) -> None:
+        self.spans: t.List[Span] = []
+
+    def export(self, spans: t.Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def as_trace_id(request_id: str) -> str:
+    """`request_id` if it is already a trace id (32 lowercase hex digits),
+    else a trace id derived from it."""
+    if _TRACE_ID_PATTERN.fullmatch(request_id):
+        return request_id
+    return hashlib.sha256(request_id.encode()).hexdigest()[:32]
+
+
+class Tracer:
+    """Record nested spans and hand the sampled ones to an exporter.
+
+    Sampling is decided once per trace, when its root span starts, from
+    the trace id as in OpenTelemetry's `TraceIdRatioBased` sampler: the
+    same share `sample_ratio` of traces is kept by every process seeing
+    the same ids, and the spans nested in a dropped trace cost a context
+    variable lookup.
+    """
+
+    def __init__(
+        self,
+        *,
+        exporter: Exporter,
+        sample_ratio: float = config.monitoring_config.trace_sample_ratio,
+    ):
+        if not 0 <= sample_ratio <= 1:
+            raise ValueError(f"sample_ratio must be in [0, 1], got {sample_ratio}")
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self._threshold = int(sample_ratio * (1 << 64))
+
+    def is_sampled(self, trace_id: str) -> bool:
+        return int(trace_id[16:], 16) < self._threshold
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, *, trace_id: t.Optional[str] = None, **attributes: t.Any
+    ) -> t.Iterator[t.Optional[Span]]:
+        """Time the enclosed block as a span named `name`.
+
+        Inside another span, the new one is its child; otherwise it
+        starts a trace, with the id (or request id, see `as_trace_id`)
+        `trace_id` given by the caller or a random one. Yields None when
+        the trace is not sampled.
+        """
+        parent = _current.get()
+        if parent is _UNSAMPLED:
+            yield None
+            return
+        if parent is None:
+            trace_id = (
+                f"{random.getrandbits(128):032x}"
+                if trace_id is None
+                else as_trace_id(trace_id)
+            )
+            if not self.is_sampled(trace_id):
+                token = _current.set(_UNSAMPLED)
+                try:
+                    yield None
+                finally:
+                    _current.reset(token)
+                return
+            span = Span(
+                name=name, trace_id=trace_id, parent_span_id=None, attributes=attributes
+            )
+        else:
+            span = Span(
+                name=name,
+                trace_id=parent.trace_id,
+                parent_span_id=parent.span_id,
+                attributes=attributes,
+            )
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+            self.exporter.export([span])
+
+
+_tracer: t.Optional[Tracer] = None
+
+
+def set_tracer(tracer: t.Optional[Tracer]) -> t.Optional[Tracer]:
+    """Install `tracer` (None turns tracing off) and return the previous one."""
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+
+def get_tracer() -> t.Optional[Tracer]:
+    return _tracer
+
+
+def span(
+    name: str, *, trace_id: t.Optional[str] = None, **attributes: t.Any
+) -> t.ContextManager[t.Optional[Span]]:
+    """A span of the installed tracer, or a shared no-op when tracing is off."""
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.span(name, trace_id=trace_id, **attributes)
+
+
+def is_recording() -> bool:
+    """Whether a sampled span is open, i.e. nested spans would be kept."""
+    return _tracer is not None and isinstance(_current.get(), Span)
+
+
+def current_span() -> t.Optional[Span]:
+    current = _current.get()
+    return current if isinstance(current, Span) else None
+
+
+if config.monitoring_config.trace_file:
+    _default_exporter = JsonLinesExporter(path=config.monitoring_config.trace_file)
+    set_tracer(Tracer(exporter=_default_exporter))
+    atexit.register(_default_exporter.close)
@@ -0,0 +1,99 @@
+import logging
+import typing as t
+
+import joblib
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.processing.adapters import InputData, to_dataframe
+from gradient_boosting_model.processing.data_management import load_pipeline
+from gradient_boosting_model.processing.validation import model_fields, validate_inputs
+
+_logger = logging.getLogger(__name__)
+
+
+class MultiModelPredictor:
+    """Score a batch with several pipeline variants in one pass.
+
+    Variants whose fitted preprocessing is identical (same `joblib.hash`
+    of every step before `gb_model`) share one preprocessing group, so the
+    batch is validated once and transformed once per group, and only the
+    model heads run per variant. Variants that differ in preprocessing
+    still work, they just get a group of their own. As in
+    `make_prediction`, only the fields some variant reads (and the
+    configured extras) are validated, unless `strict_validation` is set.
+    """
+
+    def __init__(self, *, pipelines: t.Mapping[str, Pipeline]):
+        if not pipelines:
+            raise ValueError("At least one pipeline is required.")
+        groups: t.Dict[str, t.Tuple[Pipeline, t.Dict[str, t.Any]]] = {}
+        for name, pipeline in pipelines.items():
+            preprocessing = pipeline[:-1]
+            key = joblib.hash(preprocessing)
+            groups.setdefault(key, (preprocessing, {}))[1][name] = pipeline[-1]
+        self.variants = list(pipelines)
+        self.fields = (
+            None
+            if config.scoring_config.strict_validation
+            else model_fields(
+                pipelines=list(pipelines.values()),
+                extras=config.scoring_config.validation_extra_fields,
+            )
+        )
+        self._groups = list(groups.values())
+        _logger.info(
+            f"Loaded {len(self.variants)} variants in "
+            f"{len(self._groups)} preprocessing groups."
+        )
+
+    @classmethod
+    def from_files(cls, *, file_names: t.Mapping[str, str]) -> "MultiModelPredictor":
+        """Load each variant from a saved pipeline in the trained models dir."""
+        return cls(
+            pipelines={
+                name: load_pipeline(file_name=file_name)
+                for name, file_name in file_names.items()
+            }
+        )
+
+    @property
+    def n_groups(self) -> int:
+        return len(self._groups)
+
+    def predict(self, *, input_data: InputData) -> dict:
+        """Make predictions with every variant.
+
+        Returns the same keys as `make_prediction`, with the predictions
+        as a DataFrame holding one column per variant.
+        """
+        data = to_dataframe(input_data=input_data)
+        validated_data, errors = validate_inputs(input_data=data, fields=self.fields)
+        results: t.Dict[str, t.Any] = {
+            "predictions": None,
+            "version": _version,
+            "errors": errors,
+            "metadata": {"preprocessing_groups": self.n_groups},
+        }
+        if errors:
+            _logger.error("Errors in validation. Predictions cannot be made.")
+            return results
+
+        features = validated_data[config.gradient_boosting_model_config.features]
+        columns = {}
+        for preprocessing, models in self._groups:
+            transformed = preprocessing.transform(features)
+            for name, model in models.items():
+                columns[name] = model.predict(transformed[model.feature_names_in_])
+
+        predictions = pd.DataFrame(columns, index=features.index)[self.variants]
+        # counts only, formatting the frame would cost more than scoring it
+        _logger.info(
+            "Made predictions for %d rows with variants: %s",
+            len(predictions),
+            self.variants,
+        )
+        results["predictions"] = predictions
+        return results
@@ -3,9 +3,10 @@ from sklearn.preprocessing import OrdinalEncoder
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.pipeline import Pipeline
 from feature_engine.encoding import RareLabelEncoder
-from typing import cast
+from typing import cast, Optional
+from joblib import Memory
 from gradient_boosting_model.processing import preprocessors as pp
-from gradient_boosting_model.config.core import config
+from gradient_boosting_model.config.core import config, ModelConfig
 
 import logging
 
@@ -13,60 +14,72 @@ import logging
 _logger = logging.getLogger(__name__)
 
 
-price_pipe = Pipeline(
-    [
-        (
-            "numerical_imputer",
-            pp.SklearnTransformerWrapper(
-                variables=config.gradient_boosting_model_config.numerical_vars,
-                transformer=SimpleImputer(strategy="most_frequent"),
+def build_price_pipe(
+    *,
+    model_config: ModelConfig = config.gradient_boosting_model_config,
+    memory: Optional[Memory] = None,
+) -> Pipeline:
+    """Build an unfitted price pipeline from a model config.
+
+    Pass a joblib `Memory` to cache the fitted preprocessing steps, so
+    identical fits are reused across folds and tuning candidates.
+    """
+    return Pipeline(
+        [
+            (
+                "numerical_imputer",
+                pp.SklearnTransformerWrapper(
+                    variables=model_config.numerical_vars,
+                    transformer=SimpleImputer(strategy="most_frequent"),
+                ),
             ),
-        ),
-        (
-            "categorical_imputer",
-            pp.SklearnTransformerWrapper(
-                variables=config.gradient_boosting_model_config.categorical_vars,
-                transformer=SimpleImputer(strategy="constant", fill_value="missing"),
+            (
+                "categorical_imputer",
+                pp.SklearnTransformerWrapper(
+                    variables=model_config.categorical_vars,
+                    transformer=SimpleImputer(strategy="constant", fill_value="missing"),
+                ),
             ),
-        ),
-        (
-            "temporal_variable",
-            pp.TemporalVariableEstimator(
-                variables=config.gradient_boosting_model_config.temporal_vars,
-                reference_variable=config.gradient_boosting_model_config.drop_features,
+            (
+                "temporal_variable",
+                pp.TemporalVariableEstimator(
+                    variables=model_config.temporal_vars,
+                    reference_variable=model_config.drop_features,
+                ),
             ),
-        ),
-        (
-            "rare_label_encoder",
-            RareLabelEncoder(
-                tol=config.gradient_boosting_model_config.rare_label_tol,
-                n_categories=(
-                    config.gradient_boosting_model_config.rare_label_n_categories
+            (
+                "rare_label_encoder",
+                RareLabelEncoder(
+                    tol=model_config.rare_label_tol,
+                    n_categories=model_config.rare_label_n_categories,
+                    variables=cast(str | list[str | int] | None,
+                                   model_config.categorical_vars,)
                 ),
-                variables=cast(str | list[str | int] | None,
-                               config.gradient_boosting_model_config.categorical_vars,)
             ),
-        ),
-        (
-            "categorical_encoder",
-            pp.SklearnTransformerWrapper(
-                variables=config.gradient_boosting_model_config.categorical_vars,
-                transformer=OrdinalEncoder(),
+            (
+                "categorical_encoder",
+                pp.SklearnTransformerWrapper(
+                    variables=model_config.categorical_vars,
+                    transformer=OrdinalEncoder(),
+                ),
             ),
-        ),
-        (
-            "drop_features",
-            pp.DropUnnecessaryFeatures(
-                variables_to_drop=config.gradient_boosting_model_config.drop_features,
+            (
+                "drop_features",
+                pp.DropUnnecessaryFeatures(
+                    variables_to_drop=model_config.drop_features,
+                ),
             ),
-        ),
-        (
-            "gb_model",
-            GradientBoostingRegressor(
-                loss=config.gradient_boosting_model_config.loss,
-                random_state=config.gradient_boosting_model_config.random_state,
-                n_estimators=config.gradient_boosting_model_config.n_estimators,
+            (
+                "gb_model",
+                GradientBoostingRegressor(
+                    loss=model_config.loss,
+                    random_state=model_config.random_state,
+                    n_estimators=model_config.n_estimators,
+                ),
             ),
-        ),
-    ]
-)
+        ],
+        memory=memory,
+    )
+
+
+price_pipe = build_price_pipe()
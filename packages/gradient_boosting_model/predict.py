@@ -1,40 +1,325 @@
+import atexit
+import collections
 import logging
+import threading
+import time
 import typing as t
+import weakref
+import numpy as np
 import pandas as pd
 from sklearn.pipeline import Pipeline
 
 from gradient_boosting_model import __version__ as _version
 from gradient_boosting_model.config.core import config
+from gradient_boosting_model.monitoring import tracing
+from gradient_boosting_model.monitoring.capture import TrafficRecorder
+from gradient_boosting_model.processing.adapters import InputData, to_dataframe
 from gradient_boosting_model.processing.data_management import load_pipeline
-from gradient_boosting_model.processing.validation import validate_inputs
+from gradient_boosting_model.processing.dedup import find_unique_rows
+from gradient_boosting_model.processing.dtypes import downcast_dtypes
+from gradient_boosting_model.processing.parallel import (
+    add_stage_predictions,
+    predict_in_chunks,
+    resolve_n_threads,
+)
+from gradient_boosting_model.processing.staged import StageCostModel
+from gradient_boosting_model.processing.validation import (
+    dropped_rows,
+    model_fields,
+    validate_inputs,
+)
 
 _logger = logging.getLogger(__name__)
 
 # Explicitly define the type to show _price_pipe can be None
 pipeline_file_name = f"{config.app_config.pipeline_save_file}{_version}.pkl"
-_price_pipe: t.Optional[Pipeline] = load_pipeline(file_name=pipeline_file_name)
+_price_pipe: t.Optional[Pipeline] = load_pipeline(
+    file_name=pipeline_file_name, model_dir=config.app_config.model_dir
+)
+_stage_cost = StageCostModel()
+if _price_pipe is not None:
+    # before any request, so no deadline pays for it
+    _stage_cost.calibrate(model=_price_pipe[-1])
+# validation fields by weak references to the pipelines, extras and model
+# config; least recently used entries are evicted past FIELDS_CACHE_SIZE
+FIELDS_CACHE_SIZE = 32
+_fields_cache: "collections.OrderedDict[tuple, t.List[str]]" = (
+    collections.OrderedDict()
+)
+_fields_lock = threading.Lock()
+_recorder: t.Optional[TrafficRecorder] = None
+if config.monitoring_config.capture_dir:
+    _recorder = TrafficRecorder(directory=config.monitoring_config.capture_dir)
+    atexit.register(_recorder.close)
 
 
-def make_prediction(*, input_data: t.Union[pd.DataFrame, dict]) -> dict:
-    """Make a prediction using a saved model pipeline."""
+def get_pipeline() -> t.Optional[Pipeline]:
+    """The loaded model pipeline, None if no trained one was found."""
+    return _price_pipe
 
-    data = pd.DataFrame(input_data)
-    validated_data, errors = validate_inputs(input_data=data)
-    results = {"predictions": None, "version": _version, "errors": errors}
 
-    if _price_pipe is not None and not errors:
-        predictions = _price_pipe.predict(
-            X=validated_data[config.gradient_boosting_model_config.features]
-        )
-        _logger.info(
-            f"Making predictions with model version: {_version} "
-            f"Predictions: {predictions}"
+def validation_fields(
+    *,
+    strict: t.Optional[bool] = None,
+    extras: t.Sequence[str] = (),
+    pipelines: t.Optional[t.Sequence[Pipeline]] = None,
+) -> t.Optional[t.List[str]]:
+    """The fields to validate, None (all of them) in strict mode.
+
+    `strict` defaults to `strict_validation` in the scoring config, and
+    `pipelines` to the loaded one. The fields are computed once per
+    pipelines, extras and model config, and cached without keeping the
+    pipelines alive.
+    """
+    scoring_config = config.scoring_config
+    if scoring_config.strict_validation if strict is None else strict:
+        return None
+    if pipelines is None:
+        pipelines = [] if _price_pipe is None else [_price_pipe]
+    model_config = config.gradient_boosting_model_config
+    extras = (*scoring_config.validation_extra_fields, *extras)
+    # a reference to a collected pipeline only equals itself, so a new
+    # pipeline reusing its id misses
+    key = (
+        tuple(weakref.ref(pipeline) for pipeline in pipelines),
+        extras,
+        tuple(model_config.features),
+        tuple(model_config.numerical_na_not_allowed),
+    )
+    with _fields_lock:
+        fields = _fields_cache.get(key)
+        if fields is not None:
+            _fields_cache.move_to_end(key)
+            return list(fields)
+    fields = model_fields(pipelines=pipelines, extras=extras)
+    with _fields_lock:
+        _fields_cache[key] = fields
+        if len(_fields_cache) > FIELDS_CACHE_SIZE:
+            _fields_cache.popitem(last=False)
+    return list(fields)
+
+
+def make_prediction(
+    *,
+    input_data: InputData,
+    n_threads: t.Optional[int] = None,
+    chunk_rows: t.Optional[int] = None,
+    dedup: t.Optional[bool] = None,
+    max_stages: t.Optional[int] = None,
+    deadline_seconds: t.Optional[float] = None,
+    strict: t.Optional[bool] = None,
+    trace_id: t.Optional[str] = None,
+) -> dict:
+    """Make a prediction using a saved model pipeline.
+
+    `input_data` can be a DataFrame, a mapping of column name to values,
+    a NumPy structured array or a list of records; columnar inputs are
+    wrapped without copying (see `to_dataframe`).
+
+    Batches with at least `parallel_min_rows` rows are scored in chunks of
+    `chunk_rows` rows on `n_threads` threads (0 means one per core). Both
+    default to the scoring config; smaller batches are scored serially.
+
+    With `dedup` (default `dedup_rows` in the scoring config), rows with
+    identical model features are scored once and the predictions are
+    scattered back. Validation still runs on every row, so errors are
+    reported against the original rows.
+
+    Under load, `max_stages` caps the number of boosting stages used, and
+    `deadline_seconds` (counted from the call) lets the model use only as
+    many of its first stages as the measured per-stage cost allows, so a
+    slightly less accurate price is returned in time. At least one stage
+    is always used; the count is reported as `stages_used` in the result
+    metadata. The accuracy of every stage count is in the `staged_accuracy`
+    section of the model metadata.
+
+    Rows with a missing value in a `numerical_na_not_allowed` field are
+    not scored; their input positions are reported as `dropped_rows` in
+    the result metadata.
+
+    Only the fields the model reads and `validation_extra_fields` are
+    validated and carried through, the other columns are dropped; with
+    `strict` (default `strict_validation` in the scoring config) the
+    whole input schema is validated instead.
+
+    When `capture_dir` is set in the monitoring config, the validated
+    inputs are also captured there for replay (see `monitoring.replay`).
+
+    When tracing is on (`trace_file` in the monitoring config, or a
+    tracer installed with `monitoring.tracing.set_tracer`), the call is
+    recorded as a `make_prediction` span with nested spans for
+    validation, deduplication and each `price_pipe` step, in the trace
+    `trace_id` (e.g. the caller's request id; a new trace by default).
+    """
+    start = time.perf_counter()
+    deadline = None if deadline_seconds is None else start + deadline_seconds
+
+    with tracing.span(
+        "make_prediction", trace_id=trace_id, model_version=_version
+    ) as span:
+        data = to_dataframe(input_data=input_data)
+        if span is not None:
+            span.set_attribute("rows", len(data))
+        with tracing.span("validate_inputs", rows=len(data)):
+            validated_data, errors = validate_inputs(
+                input_data=data, fields=validation_fields(strict=strict)
+            )
+        if _recorder is not None:
+            _recorder.record(dataframe=validated_data)
+        results: t.Dict[str, t.Any] = {
+            "predictions": None,
+            "version": _version,
+            "errors": errors,
+            "metadata": {},
+        }
+        dropped = dropped_rows(input_data=data, validated_data=validated_data)
+        if dropped:
+            results["metadata"]["dropped_rows"] = dropped
+
+        if _price_pipe is not None and not errors:
+            features = validated_data[config.gradient_boosting_model_config.features]
+            if config.scoring_config.compact_dtypes:
+                features = downcast_dtypes(dataframe=features)
+            if dedup is None:
+                dedup = config.scoring_config.dedup_rows
+            unique_positions, inverse = None, None
+            if dedup and len(features) > 1:
+                hash_start = time.perf_counter()
+                with tracing.span("find_unique_rows", rows=len(features)):
+                    unique_positions, inverse = find_unique_rows(dataframe=features)
+                hash_seconds = time.perf_counter() - hash_start
+                features = features.iloc[unique_positions]
+
+            score_start = time.perf_counter()
+            predictions, stages_used = score_features(
+                pipeline=_price_pipe,
+                features=features,
+                n_threads=n_threads,
+                chunk_rows=chunk_rows,
+                max_stages=max_stages,
+                deadline=deadline,
+            )
+            results["metadata"]["stages_used"] = stages_used
+            if span is not None:
+                span.set_attribute("stages_used", stages_used)
+            score_seconds = time.perf_counter() - score_start
+
+            if inverse is not None:
+                n_rows, n_unique = len(inverse), len(predictions)
+                predictions = predictions[inverse]
+                # assume the collapsed rows would have cost as much as the scored ones
+                seconds_saved = score_seconds / n_unique * (n_rows - n_unique)
+                results["metadata"]["dedup"] = {
+                    "rows": n_rows,
+                    "unique_rows": n_unique,
+                    "dedup_ratio": 1 - n_unique / n_rows,
+                    "hash_seconds": hash_seconds,
+                    "estimated_seconds_saved": seconds_saved - hash_seconds,
+                }
+
+            _logger.info(
+                f"Making predictions with model version: {_version} "
+                f"Predictions: {predictions}"
+            )
+            results["predictions"] = predictions
+        else:
+            if span is not None:
+                span.set_attribute("validation_errors", len(errors or {}))
+            _logger.error(
+                "Model pipeline is None or errors in validation. "
+                "Predictions cannot be made."
+            )
+
+    return results
+
+
+def score_features(
+    *,
+    pipeline: Pipeline,
+    features: pd.DataFrame,
+    n_threads: t.Optional[int],
+    chunk_rows: t.Optional[int],
+    max_stages: t.Optional[int] = None,
+    deadline: t.Optional[float] = None,
+) -> t.Tuple[np.ndarray, int]:
+    """Score serially, or in parallel chunks for large enough batches.
+
+    With `max_stages` or a `deadline` (a `time.perf_counter` value), only
+    the first boosting stages are evaluated. Returns the predictions and
+    the number of stages used.
+    """
+    scoring_config = config.scoring_config
+    n_threads = resolve_n_threads(
+        scoring_config.n_threads if n_threads is None else n_threads
+    )
+    parallel = n_threads > 1 and len(features) >= scoring_config.parallel_min_rows
+    model = pipeline[-1]
+    if not len(features):
+        # every row was dropped for missing values
+        return np.empty(0, dtype=np.float64), model.n_estimators_
+    if not parallel and max_stages is None and deadline is None:
+        if not tracing.is_recording():
+            return pipeline.predict(X=features), model.n_estimators_
+        transformed = _transform(pipeline=pipeline, features=features)
+        with tracing.span(f"price_pipe.{pipeline.steps[-1][0]}", rows=len(features)):
+            return model.predict(transformed), model.n_estimators_
+
+    transformed = _transform(pipeline=pipeline, features=features)
+    transformed = transformed[model.feature_names_in_]
+    X = np.ascontiguousarray(transformed.to_numpy(dtype=np.float32))
+    n_stages = model.n_estimators_
+    chunk_rows = chunk_rows or scoring_config.chunk_rows
+    # how the rows are spread over threads, for the stage cost model
+    layout = {"n_threads": n_threads, "chunk_rows": chunk_rows} if parallel else {}
+    if max_stages is not None:
+        n_stages = max(min(max_stages, n_stages), 1)
+    if deadline is not None:
+        if not _stage_cost.is_calibrated:
+            _stage_cost.calibrate(model=model, X=X)
+        n_stages = _stage_cost.affordable_stages(
+            rows=len(X),
+            seconds=deadline - time.perf_counter(),
+            max_stages=n_stages,
+            **layout,
         )
-        results = {"predictions": predictions, "version": _version, "errors": errors}
-    else:
-        _logger.error(
-            "Model pipeline is None or errors in validation. "
-            "Predictions cannot be made."
+
+    score_start = time.perf_counter()
+    with tracing.span(
+        f"price_pipe.{pipeline.steps[-1][0]}",
+        rows=len(X),
+        n_stages=n_stages,
+        n_threads=n_threads if parallel else 1,
+    ):
+        if parallel:
+            predictions = predict_in_chunks(
+                model=model,
+                X=X,
+                n_threads=n_threads,
+                chunk_rows=chunk_rows,
+                n_stages=n_stages,
+            )
+        else:
+            predictions = np.empty(len(X), dtype=np.float64)
+            if len(X):
+                predictions[:] = model.init_.predict(X[:1])[0]
+                add_stage_predictions(
+                    model=model, X=X, out=predictions, n_stages=n_stages
+                )
+    if _stage_cost.is_calibrated and len(X):
+        _stage_cost.update(
+            rows=len(X),
+            n_stages=n_stages,
+            seconds=time.perf_counter() - score_start,
+            **layout,
         )
+    return predictions, n_stages
 
-    return results
+
+def _transform(*, pipeline: Pipeline, features: pd.DataFrame) -> pd.DataFrame:
+    """Run the preprocessing steps, each in its own span when tracing."""
+    if not tracing.is_recording():
+        return pipeline[:-1].transform(features)
+    for name, step in pipeline.steps[:-1]:
+        with tracing.span(f"price_pipe.{name}", rows=len(features)):
+            features = step.transform(features)
+    return features
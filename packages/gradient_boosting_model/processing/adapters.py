@@ -0,0 +1,68 @@
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model.config.core import config
+
+# A DataFrame, a mapping of column name to 1-D array, a NumPy
+# structured/record array, or a list of records.
+InputData = t.Union[
+    pd.DataFrame, t.Mapping[str, t.Any], np.ndarray, t.Sequence[t.Mapping[str, t.Any]]
+]
+
+
+def _rename(name: str) -> str:
+    return config.gradient_boosting_model_config.variables_to_rename.get(name, name)
+
+
+def _none_to_nan(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Replace `None` in object columns with NaN, which the imputers expect."""
+    for column in dataframe.columns[dataframe.dtypes == object]:
+        values = dataframe[column].to_numpy()
+        missing = pd.isnull(values)
+        if missing.any():
+            # a new array, so the caller's one is left untouched
+            values = values.copy()
+            values[missing] = np.nan
+            dataframe[column] = values
+    return dataframe
+
+
+def to_dataframe(*, input_data: InputData) -> pd.DataFrame:
+    """Adapt supported input layouts to a DataFrame with model column names.
+
+    Columnar inputs are wrapped without copying: NumPy arrays in a
+    mapping and the fields of a structured array are referenced as they
+    are, as long as pandas can hold their dtype natively (numbers and
+    booleans; fixed width strings become Python objects). The caller's
+    data is never modified, renaming from `variables_to_rename`
+    included.
+
+    In mappings and records, `None` (e.g. a JSON null) is read as a
+    missing value, like an empty field in the training CSV.
+    """
+    if isinstance(input_data, pd.DataFrame):
+        return input_data.rename(columns=_rename, copy=False)
+
+    if isinstance(input_data, np.ndarray):
+        if input_data.dtype.names is None:
+            raise TypeError("Only structured or record NumPy arrays are supported.")
+        # field access returns strided views into the caller's buffer
+        columns = {
+            _rename(name): input_data[name].reshape(-1)
+            for name in input_data.dtype.names
+        }
+        return pd.DataFrame(columns, copy=False)
+
+    if isinstance(input_data, t.Mapping):
+        # plain sequences are left for pandas to infer, as before
+        columns = {_rename(name): values for name, values in input_data.items()}
+        return _none_to_nan(pd.DataFrame(columns, copy=False))
+
+    if isinstance(input_data, t.Sequence):
+        return _none_to_nan(
+            pd.DataFrame.from_records(input_data).rename(columns=_rename, copy=False)
+        )
+
+    raise TypeError(f"Unsupported input type: {type(input_data).__name__}")
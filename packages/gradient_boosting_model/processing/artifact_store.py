@@ -0,0 +1,376 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import typing as t
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from gradient_boosting_model.config.core import config, TRAINED_MODEL_DIR
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+CHUNK_PREFIX = "chunks"
+MANIFEST_PREFIX = "manifests"
+CACHE_DIR_NAME = ".chunks"
+# block size for hashing and copying
+BLOCK_BYTES = 1 << 20
+_DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReadableBackend(t.Protocol):
+    """A store that artifacts can be pulled from."""
+
+    def read(self, key: str) -> bytes:
+        ...
+
+    def fetch(self, key: str, part: Path) -> None:
+        """Append the bytes of `key` that `part` does not hold yet."""
+        ...
+
+
+class WritableBackend(ReadableBackend, t.Protocol):
+    """A store that artifacts can also be published to."""
+
+    def exists(self, key: str) -> bool:
+        ...
+
+    def write(self, key: str, data: bytes) -> None:
+        ...
+
+
+class LocalBackend:
+    """A store in a local (or mounted) directory; the only writable backend."""
+
+    def __init__(self, *, root: t.Union[str, Path]):
+        self.root = Path(root)
+
+    def read(self, key: str) -> bytes:
+        return (self.root / key).read_bytes()
+
+    def fetch(self, key: str, part: Path) -> None:
+        """Append the bytes of `key` that `part` does not hold yet."""
+        with open(self.root / key, "rb") as source, open(part, "ab") as target:
+            source.seek(target.tell())
+            shutil.copyfileobj(source, target, BLOCK_BYTES)
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    def write(self, key: str, data: bytes) -> None:
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        temporary.write_bytes(data)
+        # readers never see a partial object
+        os.replace(temporary, path)
+
+
+class HttpBackend:
+    """A read-only store served over HTTP, e.g. a directory behind any web server.
+
+    It implements `ReadableBackend` only, so it can be pulled from but
+    not passed to `publish`. Interrupted chunk downloads are resumed
+    with a `Range` request; a server that ignores it sends the whole
+    chunk, which then replaces the partial one.
+    """
+
+    def __init__(self, *, base_url: str, timeout_seconds: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_seconds = timeout_seconds
+
+    def read(self, key: str) -> bytes:
+        url = f"{self.base_url}/{key}"
+        with urllib.request.urlopen(url, timeout=self.timeout_seconds) as response:
+            return response.read()
+
+    def fetch(self, key: str, part: Path) -> None:
+        offset = part.stat().st_size if part.exists() else 0
+        request = urllib.request.Request(f"{self.base_url}/{key}")
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout_seconds)
+        except urllib.error.HTTPError as exc:
+            if exc.code != 416:
+                raise
+            # nothing left to send, the part is complete (or wrong, see the hash)
+            return
+        with response, open(part, "ab" if response.status == 206 else "wb") as target:
+            shutil.copyfileobj(response, target, BLOCK_BYTES)
+
+
+def backend_from_url(url: str) -> ReadableBackend:
+    """An HTTP backend for http(s) URLs, else a local one for a path or file URL."""
+    if url.startswith(("http://", "https://")):
+        return HttpBackend(base_url=url)
+    return LocalBackend(root=url[len("file://"):] if url.startswith("file://") else url)
+
+
+def publish(
+    *,
+    backend: WritableBackend,
+    name: str,
+    source_dir: t.Union[str, Path] = TRAINED_MODEL_DIR,
+    files: t.Optional[t.Sequence[str]] = None,
+    chunk_bytes: int = config.app_config.artifact_chunk_bytes,
+) -> dict:
+    """Upload the artifacts in `source_dir` as manifest `name`.
+
+    Each file (by default every file under `source_dir`, e.g. the
+    pipeline pickle, its metadata and scoring bundle) is cut into chunks
+    of `chunk_bytes` stored under their SHA-256, so chunks already in the
+    store, from this or any earlier version, are not uploaded again. The
+    manifest, listing the chunks of every file, is written last: a
+    manifest in the store only refers to chunks that are there.
+    """
+    start = time.perf_counter()
+    source_dir = Path(source_dir)
+    if files is None:
+        files = sorted(
+            str(path.relative_to(source_dir))
+            for path in source_dir.rglob("*")
+            if path.is_file()
+            and "__pycache__" not in path.parts
+            and path.name != "__init__.py"
+        )
+    entries, uploaded, reused, uploaded_bytes = [], 0, 0, 0
+    for relative in files:
+        path, chunks, file_digest = source_dir / relative, [], hashlib.sha256()
+        with open(path, "rb") as file:
+            for data in iter(lambda: file.read(chunk_bytes), b""):
+                digest = hashlib.sha256(data).hexdigest()
+                file_digest.update(data)
+                chunks.append(digest)
+                if backend.exists(f"{CHUNK_PREFIX}/{digest}"):
+                    reused += 1
+                    continue
+                backend.write(f"{CHUNK_PREFIX}/{digest}", data)
+                uploaded += 1
+                uploaded_bytes += len(data)
+        entries.append(
+            {
+                "path": relative,
+                "size": path.stat().st_size,
+                "sha256": file_digest.hexdigest(),
+                "chunks": chunks,
+            }
+        )
+    manifest = {
+        "name": name,
+        "created_at": time.time(),
+        "chunk_bytes": chunk_bytes,
+        "files": entries,
+    }
+    manifest_bytes = json.dumps(manifest, indent=2).encode()
+    backend.write(f"{MANIFEST_PREFIX}/{name}.json", manifest_bytes)
+    report = {
+        "name": name,
+        "manifest_sha256": hashlib.sha256(manifest_bytes).hexdigest(),
+        "files": len(entries),
+        "uploaded_chunks": uploaded,
+        "reused_chunks": reused,
+        "uploaded_bytes": uploaded_bytes,
+        "seconds": time.perf_counter() - start,
+    }
+    _logger.info(f"Published artifacts: {report}")
+    return report
+
+
+def _fetch_chunk(
+    *, backend: ReadableBackend, digest: str, cache_dir: Path, retries: int
+) -> int:
+    """Download one chunk into the cache, resuming a partial one.
+
+    Returns the number of bytes this call added, without those of the
+    partial download it resumed.
+    """
+    path, part = cache_dir / digest, cache_dir / f"{digest}.part"
+    resumed = part.stat().st_size if part.exists() else 0
+    for attempt in range(retries + 1):
+        try:
+            backend.fetch(f"{CHUNK_PREFIX}/{digest}", part)
+        except OSError as exc:
+            _logger.warning(f"Fetching chunk {digest} failed: {exc}")
+            continue
+        if sha256_file(part) == digest:
+            size = part.stat().st_size
+            os.replace(part, path)
+            return max(size - resumed, 0)
+        # a corrupt part cannot be resumed, start over
+        _logger.warning(f"Chunk {digest} failed its checksum (attempt {attempt + 1}).")
+        part.unlink()
+        resumed = 0
+    raise ValueError(f"Could not fetch a valid copy of chunk {digest}.")
+
+
+def _check_manifest(*, manifest: dict, model_dir: Path) -> t.List[Path]:
+    """Reject a malformed manifest, return where each of its files goes.
+
+    File paths must be relative and stay inside `model_dir` (outside its
+    chunk cache), and digests must be SHA-256 hex strings, so a manifest
+    cannot make a pull write anywhere else.
+    """
+    root = model_dir.resolve()
+    targets = []
+    for entry in manifest["files"]:
+        relative = Path(entry["path"])
+        target = (root / relative).resolve()
+        if (
+            relative.is_absolute()
+            or not target.is_relative_to(root)
+            or target == root
+            or relative.parts[0] == CACHE_DIR_NAME
+        ):
+            raise ValueError(f"Manifest path {entry['path']!r} leaves the model dir.")
+        for digest in [entry["sha256"], *entry["chunks"]]:
+            if not isinstance(digest, str) or not _DIGEST_PATTERN.fullmatch(digest):
+                raise ValueError(f"Manifest digest {digest!r} is not a SHA-256.")
+        targets.append(target)
+    return targets
+
+
+def pull(
+    *,
+    backend: ReadableBackend,
+    name: str,
+    model_dir: t.Union[str, Path],
+    manifest_sha256: t.Optional[str] = None,
+    n_threads: int = config.app_config.artifact_download_threads,
+    retries: int = config.app_config.artifact_retries,
+    prune: bool = True,
+) -> dict:
+    """Make `model_dir` hold the artifacts of manifest `name`.
+
+    Chunks are cached in `model_dir/.chunks`. Those already there (e.g.
+    from the previous version) are reused after checking their hash, the
+    others are downloaded on `n_threads` threads; an interrupted download
+    leaves a `.part` file that the next pull resumes, and a chunk that
+    fails its checksum is fetched again up to `retries` times. Files are
+    then assembled from the chunks, checked against their own hash and
+    moved into place one by one, so `load_pipeline(model_dir=...)` never
+    reads a partial file. With `prune`, cached chunks that `name` does
+    not use are deleted afterwards.
+
+    Manifests are checked before anything is written (see
+    `_check_manifest`); with `manifest_sha256` (as reported by
+    `publish`), the manifest must also match that hash.
+    """
+    start = time.perf_counter()
+    model_dir = Path(model_dir)
+    cache_dir = model_dir / CACHE_DIR_NAME
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_bytes = backend.read(f"{MANIFEST_PREFIX}/{name}.json")
+    if (
+        manifest_sha256 is not None
+        and hashlib.sha256(manifest_bytes).hexdigest() != manifest_sha256
+    ):
+        raise ValueError(f"Manifest {name} does not match its expected hash.")
+    manifest = json.loads(manifest_bytes)
+    targets = _check_manifest(manifest=manifest, model_dir=model_dir)
+
+    wanted = list(
+        dict.fromkeys(
+            digest for entry in manifest["files"] for digest in entry["chunks"]
+        )
+    )
+    cached = {
+        digest
+        for digest in wanted
+        if (cache_dir / digest).is_file() and sha256_file(cache_dir / digest) == digest
+    }
+    missing = [digest for digest in wanted if digest not in cached]
+    with ThreadPoolExecutor(max_workers=max(n_threads, 1)) as executor:
+        downloaded_bytes = sum(
+            executor.map(
+                lambda digest: _fetch_chunk(
+                    backend=backend, digest=digest, cache_dir=cache_dir, retries=retries
+                ),
+                missing,
+            )
+        )
+
+    unchanged = 0
+    for entry, target in zip(manifest["files"], targets):
+        if (
+            target.is_file()
+            and target.stat().st_size == entry["size"]
+            and sha256_file(target) == entry["sha256"]
+        ):
+            unchanged += 1
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+        with open(temporary, "wb") as file:
+            for digest in entry["chunks"]:
+                with open(cache_dir / digest, "rb") as chunk:
+                    shutil.copyfileobj(chunk, file, BLOCK_BYTES)
+        if sha256_file(temporary) != entry["sha256"]:
+            temporary.unlink()
+            raise ValueError(f"Assembled {entry['path']} does not match its hash.")
+        os.replace(temporary, target)
+
+    if prune:
+        for path in cache_dir.iterdir():
+            if path.name not in wanted and not path.name.endswith(".part"):
+                path.unlink()
+
+    report = {
+        "name": name,
+        "files": len(manifest["files"]),
+        "unchanged_files": unchanged,
+        "chunks": len(wanted),
+        "reused_chunks": len(cached),
+        "downloaded_chunks": len(missing),
+        "downloaded_bytes": downloaded_bytes,
+        "seconds": time.perf_counter() - start,
+    }
+    _logger.info(f"Pulled artifacts: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Publish model artifacts to, or pull them from, an artifact store."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish_parser = commands.add_parser("publish")
+    publish_parser.add_argument("store", help="store directory")
+    publish_parser.add_argument("name")
+    publish_parser.add_argument("--source-dir", default=str(TRAINED_MODEL_DIR))
+    pull_parser = commands.add_parser("pull")
+    pull_parser.add_argument("store", help="store directory or http(s) URL")
+    pull_parser.add_argument("name")
+    pull_parser.add_argument("model_dir")
+    pull_parser.add_argument("--manifest-sha256")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        report = publish(
+            backend=LocalBackend(root=args.store),
+            name=args.name,
+            source_dir=args.source_dir,
+        )
+    else:
+        report = pull(
+            backend=backend_from_url(args.store),
+            name=args.name,
+            model_dir=args.model_dir,
+            manifest_sha256=args.manifest_sha256,
+        )
+    print(json.dumps(report, indent=2))
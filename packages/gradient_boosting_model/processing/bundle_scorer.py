@@ -0,0 +1,119 @@
+"""NumPy-only evaluator for scoring bundles.
+
+This module is copied verbatim into every bundle written by
+`gradient_boosting_model.processing.scoring_bundle`, so it must only
+ever import NumPy and the standard library.
+
+Usage from inside a bundle directory:
+
+    import bundle_scorer
+    scorer = bundle_scorer.load()
+    scorer.predict({"LotArea": [8450], "OverallQual": [7], ...})
+"""
+import typing as t
+from pathlib import Path
+
+import numpy as np
+
+BUNDLE_FILE_NAME = "model.npz"
+
+
+class BundleScorer:
+    """Apply exported preprocessing constants and evaluate the trees."""
+
+    def __init__(self, arrays: t.Mapping[str, np.ndarray]):
+        self.version = str(arrays["version"])
+        self.rename = dict(zip(arrays["rename_from"], arrays["rename_to"]))
+        self.model_features = list(arrays["model_features"])
+        self.numerical_fill = dict(
+            zip(arrays["numerical_fill_vars"], arrays["numerical_fill_values"])
+        )
+        self.temporal = list(
+            zip(arrays["temporal_vars"], arrays["temporal_reference_vars"])
+        )
+        self.categorical = {
+            str(var): (
+                str(arrays[f"fill__{var}"]),
+                set(arrays[f"frequent__{var}"]),
+                {label: code for code, label in enumerate(arrays[f"categories__{var}"])},
+            )
+            for var in arrays["categorical_vars"]
+        }
+        self.rare_label = str(arrays["rare_label"])
+
+        self.init_value = float(arrays["init_value"])
+        self.learning_rate = float(arrays["learning_rate"])
+        self.max_depth = int(arrays["max_depth"])
+        self.roots = arrays["roots"]
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+
+    def transform(self, data: t.Mapping[str, t.Sequence]) -> np.ndarray:
+        """Build the float32 model matrix from a mapping of columns."""
+        columns = {self.rename.get(name, name): values for name, values in data.items()}
+
+        encoded: t.Dict[str, np.ndarray] = {}
+        for var, (fill, frequent, categories) in self.categorical.items():
+            labels = []
+            for value in columns[var]:
+                if value is None or value != value:
+                    value = fill
+                labels.append(value if value in frequent else self.rare_label)
+            unknown = {label for label in labels if label not in categories}
+            if unknown:
+                raise ValueError(f"Found unknown categories {unknown} in {var}")
+            encoded[var] = np.array([categories[label] for label in labels], float)
+
+        for var, fill in self.numerical_fill.items():
+            values = np.array(columns[var], dtype=np.float64)
+            values[np.isnan(values)] = float(fill)
+            encoded[var] = values
+
+        def numeric(var: str) -> np.ndarray:
+            if var not in encoded:
+                encoded[var] = np.array(columns[var], dtype=np.float64)
+            return encoded[var]
+
+        for var, reference in self.temporal:
+            encoded[var] = numeric(reference) - numeric(var)
+
+        # the trees compare float32 features against float64 thresholds
+        return np.ascontiguousarray(
+            np.column_stack([numeric(var) for var in self.model_features]),
+            dtype=np.float32,
+        )
+
+    def predict(self, data: t.Mapping[str, t.Sequence]) -> np.ndarray:
+        """Predict from a mapping of column name to values."""
+        return self.predict_matrix(self.transform(data))
+
+    def predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Predict from an already transformed float32 matrix."""
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.size)).copy()
+        for _ in range(self.max_depth):
+            left = self.children_left[nodes]
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(
+                left == -1,
+                nodes,
+                np.where(go_left, left, self.children_right[nodes]),
+            )
+
+        leaf_values = self.value[nodes]
+        predictions = np.full(X.shape[0], self.init_value)
+        # accumulate stage by stage, in the same order as sklearn
+        for stage in range(leaf_values.shape[1]):
+            predictions += self.learning_rate * leaf_values[:, stage]
+        return predictions
+
+
+def load(path: t.Optional[t.Union[str, Path]] = None) -> BundleScorer:
+    """Load the bundle next to this file, or the one at `path`."""
+    if path is None:
+        path = Path(__file__).resolve().parent / BUNDLE_FILE_NAME
+    with np.load(path, allow_pickle=False) as arrays:
+        return BundleScorer({name: arrays[name] for name in arrays.files})
@@ -0,0 +1,77 @@
+import typing as t
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+NULL_MASK_SUFFIX = "__null"
+DTYPES_KEY = "__dtypes__"
+
+
+def _compact_numbers(values: np.ndarray) -> np.ndarray:
+    """Store numbers in the smallest dtype that round-trips exactly."""
+    if values.dtype == np.float64:
+        compact = values.astype(np.float32)
+        if np.array_equal(compact, values, equal_nan=True):
+            return compact
+    elif values.dtype == np.int64 and values.size:
+        if np.iinfo(np.int32).min <= values.min() and values.max() <= np.iinfo(
+            np.int32
+        ).max:
+            return values.astype(np.int32)
+    return values
+
+
+def write_columnar_chunk(
+    *, path: t.Union[str, Path], dataframe: pd.DataFrame, compress: bool = True
+) -> None:
+    """Write a DataFrame as one `.npz` file with an array per column.
+
+    Numbers keep their values exactly, in the smallest dtype that holds
+    them, and strings are stored as fixed width unicode arrays plus a
+    boolean null mask, so the file loads with `allow_pickle=False`. The
+    original dtypes are restored by `read_columnar_chunk`, with string
+    nulls read back as NaN like `pd.read_csv` does.
+    """
+    arrays: t.Dict[str, np.ndarray] = {}
+    dtypes = []
+    for column in dataframe.columns:
+        series = dataframe[column]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(
+            series.dtype, pd.CategoricalDtype
+        ):
+            arrays[column] = _compact_numbers(series.to_numpy())
+            dtypes.append(f"{column}:{series.dtype.str}")
+        else:
+            nulls = series.isnull().to_numpy()
+            arrays[column] = series.astype(object).where(~nulls, "").to_numpy(dtype=str)
+            arrays[column + NULL_MASK_SUFFIX] = nulls
+            dtypes.append(f"{column}:object")
+    arrays[DTYPES_KEY] = np.array(dtypes)
+
+    save = np.savez_compressed if compress else np.savez
+    save(path, **arrays)
+
+
+def read_columnar_chunk(path: t.Union[str, Path]) -> pd.DataFrame:
+    """Read a file written by `write_columnar_chunk`."""
+    with np.load(path, allow_pickle=False) as arrays:
+        columns = {}
+        for entry in arrays[DTYPES_KEY]:
+            column, _, dtype = str(entry).rpartition(":")
+            values = arrays[column]
+            if dtype == "object":
+                values = values.astype(object)
+                values[arrays[column + NULL_MASK_SUFFIX]] = np.nan
+            else:
+                values = values.astype(np.dtype(dtype), copy=False)
+            columns[column] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_columnar_chunks(
+    directory: t.Union[str, Path], pattern: str = "*.npz"
+) -> t.Iterator[pd.DataFrame]:
+    """Yield the chunk files of a directory in name order."""
+    for chunk_file in sorted(Path(directory).glob(pattern)):
+        yield read_columnar_chunk(chunk_file)
@@ -0,0 +1,207 @@
+import copy
+import io
+import time
+import typing as t
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.metrics import mean_squared_error
+from sklearn.pipeline import Pipeline
+
+from gradient_boosting_model.processing import bundle_scorer
+from gradient_boosting_model.processing.scoring_bundle import export_pipeline_arrays
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def truncate_stages(
+    *,
+    model: GradientBoostingRegressor,
+    X_holdout: pd.DataFrame,
+    y_holdout: pd.Series,
+    mse_tolerance: float,
+) -> int:
+    """Drop trailing boosting stages that barely improve the holdout MSE.
+
+    Keeps the smallest number of stages whose holdout MSE is within
+    `mse_tolerance` (relative) of the full ensemble, and returns it.
+    """
+    staged_mse = np.array(
+        [
+            mean_squared_error(y_holdout, predictions)
+            for predictions in model.staged_predict(X_holdout)
+        ]
+    )
+    n_stages = int(np.argmax(staged_mse <= staged_mse[-1] * (1 + mse_tolerance))) + 1
+
+    model.estimators_ = model.estimators_[:n_stages]
+    model.train_score_ = model.train_score_[:n_stages]
+    model.n_estimators_ = n_stages
+    model.n_estimators = n_stages
+    return n_stages
+
+
+def merge_leaves(*, model: GradientBoostingRegressor, leaf_tolerance: float) -> int:
+    """Collapse sibling leaves whose contributions differ by at most `leaf_tolerance`.
+
+    The parent becomes a leaf holding the sample-weighted mean of the two
+    leaf values. Nodes are visited bottom up, so merges can cascade, and
+    the nodes no longer reachable are then removed from the tree (see
+    `_prune`). Returns the number of merged leaf pairs.
+    """
+    merged = 0
+    for stage in model.estimators_[:, 0]:
+        state = stage.tree_.__getstate__()
+        nodes, values = state["nodes"].copy(), state["values"].copy()
+        left, right = nodes["left_child"], nodes["right_child"]
+        weights = nodes["weighted_n_node_samples"]
+
+        for node in range(len(nodes) - 1, -1, -1):
+            lchild, rchild = left[node], right[node]
+            if lchild == -1 or left[lchild] != -1 or left[rchild] != -1:
+                continue
+            spread = abs(values[lchild, 0, 0] - values[rchild, 0, 0])
+            if model.learning_rate * spread > leaf_tolerance:
+                continue
+            values[node] = (
+                weights[lchild] * values[lchild] + weights[rchild] * values[rchild]
+            ) / (weights[lchild] + weights[rchild])
+            left[node] = right[node] = -1
+            nodes["feature"][node] = -2
+            nodes["threshold"][node] = -2.0
+            merged += 1
+
+        nodes, values, max_depth = _prune(nodes=nodes, values=values)
+        state.update(
+            nodes=nodes, values=values, node_count=len(nodes), max_depth=max_depth
+        )
+        stage.tree_.__setstate__(state)
+    return merged
+
+
+def _prune(
+    *, nodes: np.ndarray, values: np.ndarray
+) -> t.Tuple[np.ndarray, np.ndarray, int]:
+    """Keep the nodes reachable from the root, renumbered in depth-first order.
+
+    Returns the node and value arrays and the depth of the pruned tree.
+    """
+    order, depths, stack = [], [], [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        order.append(node)
+        depths.append(depth)
+        if nodes["left_child"][node] != -1:
+            stack.append((nodes["right_child"][node], depth + 1))
+            stack.append((nodes["left_child"][node], depth + 1))
+    kept = np.array(order)
+    new_index = np.full(len(nodes), -1, dtype=np.intp)
+    new_index[kept] = np.arange(len(kept))
+    pruned = nodes[kept].copy()
+    for child in ("left_child", "right_child"):
+        internal = pruned[child] != -1
+        pruned[child][internal] = new_index[pruned[child][internal]]
+    return pruned, values[kept].copy(), max(depths)
+
+
+def pickle_size(obj: t.Any) -> int:
+    """Size in bytes of `obj` saved with joblib, as the pipeline is."""
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer)
+    return buffer.getbuffer().nbytes
+
+
+def _bundle_size(arrays: t.Mapping[str, np.ndarray]) -> int:
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getbuffer().nbytes
+
+
+def _best_time(func: t.Callable[[], t.Any], repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compact_pipeline(
+    *,
+    pipeline: Pipeline,
+    X_holdout: pd.DataFrame,
+    y_holdout: pd.Series,
+    mse_tolerance: float,
+    leaf_tolerance: float,
+) -> t.Tuple[Pipeline, dict]:
+    """Return a shrunk copy of the fitted pipeline and a report of what it cost.
+
+    `pipeline` itself is left unchanged. Trailing stages are truncated
+    and near-identical sibling leaves are merged, each only as far as the
+    holdout MSE stays within `mse_tolerance` of the original. The report
+    compares pickle size, NumPy bundle size, holdout MSE and holdout
+    scoring time before and after, with the bundle also measured with
+    float32 quantization.
+    """
+    original = pipeline[-1]
+    pipeline = copy.deepcopy(pipeline)
+    model = pipeline[-1]
+    X_transformed = pipeline[:-1].transform(X_holdout)
+    original_mse = mean_squared_error(y_holdout, original.predict(X_transformed))
+    original_bundle = export_pipeline_arrays(pipeline=pipeline)
+    original_seconds = _best_time(lambda: original.predict(X_transformed))
+
+    n_stages = truncate_stages(
+        model=model,
+        X_holdout=X_transformed,
+        y_holdout=y_holdout,
+        mse_tolerance=mse_tolerance,
+    )
+
+    leaves_merged = 0
+    if leaf_tolerance > 0:
+        truncated = copy.deepcopy(model.estimators_)
+        leaves_merged = merge_leaves(model=model, leaf_tolerance=leaf_tolerance)
+        merged_mse = mean_squared_error(y_holdout, model.predict(X_transformed))
+        if merged_mse > original_mse * (1 + mse_tolerance):
+            _logger.warning("Leaf merging exceeds the MSE tolerance, skipping it.")
+            model.estimators_ = truncated
+            leaves_merged = 0
+
+    compact_mse = mean_squared_error(y_holdout, model.predict(X_transformed))
+    compact_bundle = export_pipeline_arrays(pipeline=pipeline, quantize=True)
+    scorer = bundle_scorer.BundleScorer(compact_bundle)
+    bundle_mse = mean_squared_error(
+        y_holdout,
+        scorer.predict_matrix(
+            np.ascontiguousarray(X_transformed.to_numpy(dtype=np.float32))
+        ),
+    )
+
+    report = {
+        "stages": {"before": int(original.n_estimators_), "after": n_stages},
+        "leaves_merged": leaves_merged,
+        "holdout_mse": {
+            "before": float(original_mse),
+            "after": float(compact_mse),
+            "quantized_bundle": float(bundle_mse),
+        },
+        "pickle_bytes": {
+            "before": pickle_size(original),
+            "after": pickle_size(model),
+        },
+        "bundle_bytes": {
+            "before": _bundle_size(original_bundle),
+            "after": _bundle_size(compact_bundle),
+        },
+        "holdout_predict_seconds": {
+            "before": original_seconds,
+            "after": _best_time(lambda: model.predict(X_transformed)),
+        },
+    }
+    _logger.info(f"Compacted model: {report}")
+    return pipeline, report
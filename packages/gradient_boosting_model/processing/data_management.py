@@ -1,11 +1,23 @@
+import json
+import shutil
+from pathlib import Path
+
 import pandas as pd
 import joblib
 from sklearn.pipeline import Pipeline
 from gradient_boosting_model.config.core import config, DATASET_DIR, TRAINED_MODEL_DIR
 from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.processing.compaction import compact_pipeline
+from gradient_boosting_model.processing.dtypes import downcast_dtypes
+from gradient_boosting_model.processing.perf_gate import (
+    benchmark_pipeline,
+    check_performance,
+)
+from gradient_boosting_model.processing.scoring_bundle import save_scoring_bundle
+from gradient_boosting_model.processing.staged import staged_accuracy_curve
 
 import logging
-from typing import List
+from typing import List, Optional, Tuple, Union
 
 _logger = logging.getLogger(__name__)
 
@@ -18,30 +30,136 @@ def load_dataset(*, file_name: str) -> pd.DataFrame:
     transformed = dataframe.rename(
         columns=config.gradient_boosting_model_config.variables_to_rename
     )
+    if config.scoring_config.compact_dtypes:
+        transformed = downcast_dtypes(dataframe=transformed)
     return transformed  # return type: pd.DataFrame
 
 
-def save_pipeline(*, pipeline_to_persist: Pipeline) -> None:
+def save_pipeline(
+    *,
+    pipeline_to_persist: Pipeline,
+    holdout: Optional[Tuple[pd.DataFrame, pd.Series]] = None,
+) -> None:
     """Persist the pipeline.
 
     Saves the versioned model, and overwrites any previous
     saved models. This ensures that when the package is
     published, there is only one trained model that can be
     called, and we know exactly how it was built.
+
+    If enabled in the config, the model is first compacted
+    against the `holdout` set, and a NumPy-only scoring bundle
+    is written next to the pickle for fast cold starts. Reports,
+    including the holdout accuracy of the model truncated to each
+    number of stages, are kept in a JSON metadata file next to the
+    pickle.
+
+    Unless `perf_gate` is off, the pipeline is benchmarked on the test
+    data first, and budget misses or regressions from the previously
+    saved metadata are logged, or raise a ValueError with `refuse`, in
+    which case nothing is written or removed.
     """
 
     # Prepare versioned save file name
     save_file_name = f"{config.app_config.pipeline_save_file}{_version}.pkl"
     save_path = TRAINED_MODEL_DIR / save_file_name
+    bundle_name = f"{config.app_config.pipeline_save_file}{_version}_bundle"
+    metadata_name = metadata_file_name()
+    model_config = config.gradient_boosting_model_config
+
+    metadata: dict = {"version": _version}
+    if model_config.compact_model and holdout is not None:
+        # a compacted copy, the caller's pipeline is left as it is
+        pipeline_to_persist, metadata["compaction"] = compact_pipeline(
+            pipeline=pipeline_to_persist,
+            X_holdout=holdout[0],
+            y_holdout=holdout[1],
+            mse_tolerance=model_config.compaction_mse_tolerance,
+            leaf_tolerance=model_config.compaction_leaf_tolerance,
+        )
+
+    if holdout is not None:
+        metadata["staged_accuracy"] = staged_accuracy_curve(
+            model=pipeline_to_persist[-1],
+            X=pipeline_to_persist[:-1].transform(holdout[0]),
+            y=holdout[1],
+        )
 
-    remove_old_pipelines(files_to_keep=[save_file_name])
+    performance_config = config.performance_config
+    if performance_config.perf_gate != "off":
+        benchmark = benchmark_pipeline(
+            pipeline=pipeline_to_persist,
+            data=load_dataset(file_name=config.app_config.test_data_file),
+        )
+        previous = _load_previous_metadata()
+        benchmark["violations"] = check_performance(
+            benchmark=benchmark,
+            previous=previous.get("performance") if previous else None,
+        )
+        metadata["performance"] = benchmark
+        if benchmark["violations"]:
+            message = f"Performance gate: {'; '.join(benchmark['violations'])}"
+            if performance_config.perf_gate == "refuse":
+                raise ValueError(message)
+            _logger.warning(message)
+
+    remove_old_pipelines(
+        files_to_keep=[
+            save_file_name,
+            bundle_name,
+            metadata_name,
+            run_report_file_name(),
+        ]
+    )
     joblib.dump(pipeline_to_persist, save_path)
-    _logger.info(f"Saved pipeline: {save_file_name}")  # return type: None
+    _logger.info(f"Saved pipeline: {save_file_name}")
+
+    if config.app_config.emit_scoring_bundle:
+        save_scoring_bundle(
+            pipeline=pipeline_to_persist,
+            bundle_dir=TRAINED_MODEL_DIR / bundle_name,
+            quantize=model_config.quantize_bundle,
+        )
+
+    with open(TRAINED_MODEL_DIR / metadata_name, "w") as metadata_file:
+        json.dump(metadata, metadata_file, indent=2)  # return type: None
+
+
+def metadata_file_name(*, version: str = _version) -> str:
+    """Name of the JSON metadata saved next to a pipeline version."""
+    return f"{config.app_config.pipeline_save_file}{version}_metadata.json"
+
+
+def run_report_file_name(*, version: str = _version) -> str:
+    """Name of the JSON training run report saved next to a pipeline version."""
+    return f"{config.app_config.pipeline_save_file}{version}_run_report.json"
+
+
+def save_run_report(*, report: dict) -> None:
+    """Save a training run report next to the current pipeline version."""
+    with open(TRAINED_MODEL_DIR / run_report_file_name(), "w") as report_file:
+        json.dump(report, report_file, indent=2)
+
+
+def load_artifact_metadata(*, file_name: str) -> dict:
+    """Load the JSON metadata saved next to a pipeline."""
+    with open(TRAINED_MODEL_DIR / file_name) as metadata_file:
+        return json.load(metadata_file)
+
+
+def _load_previous_metadata() -> Optional[dict]:
+    """Metadata of the pipeline currently saved, if there is any."""
+    pattern = f"{config.app_config.pipeline_save_file}*_metadata.json"
+    for metadata_file in sorted(TRAINED_MODEL_DIR.glob(pattern)):
+        return load_artifact_metadata(file_name=metadata_file.name)
+    return None
 
 
-def load_pipeline(*, file_name: str) -> Pipeline:
-    """Load a persisted pipeline."""
-    file_path = TRAINED_MODEL_DIR / file_name
+def load_pipeline(
+    *, file_name: str, model_dir: Optional[Union[str, Path]] = None
+) -> Pipeline:
+    """Load a persisted pipeline, from `model_dir` or the trained models dir."""
+    file_path = Path(model_dir or TRAINED_MODEL_DIR) / file_name
     trained_model = joblib.load(filename=file_path)
     return trained_model  # return type: Pipeline
 
@@ -57,4 +175,7 @@ def remove_old_pipelines(*, files_to_keep: List[str]) -> None:
     do_not_delete = files_to_keep + ["__init__.py"]
     for model_file in TRAINED_MODEL_DIR.iterdir():
         if model_file.name not in do_not_delete:
-            model_file.unlink()  # return type: None
+            if model_file.is_dir():
+                shutil.rmtree(model_file)
+            else:
+                model_file.unlink()  # return type: None
@@ -0,0 +1,35 @@
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+
+def find_unique_rows(*, dataframe: pd.DataFrame) -> t.Tuple[np.ndarray, np.ndarray]:
+    """Group identical rows using one vectorized 64 bit hash per row.
+
+    Rows are grouped by hash, then compared column by column with the
+    representative of their group, so a hash collision never merges
+    different rows: a row that differs from its representative keeps a
+    group of its own.
+
+    Returns the positions of one representative per distinct row and,
+    for every original row, the index of its representative, so that
+    `dataframe.iloc[unique_positions].iloc[inverse]` rebuilds the rows.
+    """
+    hashes = pd.util.hash_pandas_object(dataframe, index=False).to_numpy()
+    _, unique_positions, inverse = np.unique(
+        hashes, return_index=True, return_inverse=True
+    )
+    inverse = inverse.ravel()
+
+    representatives = unique_positions[inverse]
+    same = np.ones(len(dataframe), dtype=bool)
+    for column in range(dataframe.shape[1]):
+        values = dataframe.iloc[:, column].to_numpy()
+        other = values[representatives]
+        same &= (values == other) | (pd.isna(values) & pd.isna(other))
+    collided = np.flatnonzero(~same)
+    if collided.size:
+        inverse[collided] = len(unique_positions) + np.arange(collided.size)
+        unique_positions = np.concatenate([unique_positions, collided])
+    return unique_positions, inverse
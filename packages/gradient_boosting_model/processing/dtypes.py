@@ -0,0 +1,54 @@
+import typing as t
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+_INT32 = np.iinfo(np.int32)
+
+
+def downcast_dtypes(*, dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Downcast numeric columns to 32 bit types and strings to `category`.
+
+    A numeric column is only downcast when the conversion is lossless,
+    so the pipeline sees exactly the same values as with the pandas
+    defaults and only the memory footprint changes.
+    """
+    dtypes: dict[str, t.Any] = {}
+    for name, column in dataframe.items():
+        kind = column.dtype.kind
+        if kind == "f" and column.dtype.itemsize > 4:
+            downcast = column.to_numpy().astype(np.float32)
+            if np.array_equal(downcast, column.to_numpy(), equal_nan=True):
+                dtypes[name] = np.float32
+        elif kind in "iu" and column.dtype.itemsize > 4:
+            if column.empty or (
+                column.min() >= _INT32.min and column.max() <= _INT32.max
+            ):
+                dtypes[name] = np.int32
+        elif kind == "O":
+            dtypes[name] = "category"
+
+    return dataframe.astype(dtypes) if dtypes else dataframe
+
+
+def check_split_parity(*, pipeline: Pipeline, data: pd.DataFrame) -> bool:
+    """Check that downcasting `data` leaves the pipeline's predictions unchanged.
+
+    `data` is scored once as it is, on the float64 path, and once after
+    `downcast_dtypes`, and the two predictions must agree exactly for
+    every row.
+    """
+    predictions = pipeline.predict(data)
+    compact_predictions = pipeline.predict(downcast_dtypes(dataframe=data))
+
+    mismatched = int((predictions != compact_predictions).sum())
+    if mismatched:
+        _logger.warning(
+            f"{mismatched} rows get different predictions with compact dtypes."
+        )
+    return mismatched == 0
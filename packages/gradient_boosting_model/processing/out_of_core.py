@@ -0,0 +1,478 @@
+import collections
+import typing as t
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.config.core import config, DATASET_DIR, ModelConfig
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+RARE_LABEL = "Rare"
+MISSING_LABEL = "missing"
+FEATURES_FILE_NAME = "features.npy"
+TARGET_FILE_NAME = "target.npy"
+
+
+def _as_list(value: t.Union[str, t.List[str]]) -> t.List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+def read_training_chunks(
+    *,
+    file_name: str,
+    chunk_rows: int,
+    model_config: ModelConfig = config.gradient_boosting_model_config,
+) -> t.Iterator[pd.DataFrame]:
+    """Stream the features and target of a dataset file, renamed as in `load_dataset`."""
+    rename = model_config.variables_to_rename
+    wanted = set(_as_list(model_config.features)) | {model_config.target}
+    for chunk in pd.read_csv(
+        f"{DATASET_DIR}/{file_name}",
+        usecols=lambda name: rename.get(name, name) in wanted,
+        chunksize=chunk_rows,
+    ):
+        yield chunk.rename(columns=rename)
+
+
+def _most_frequent(counts: t.Counter) -> t.Any:
+    """The most frequent value, the smallest one on ties, as `SimpleImputer` does."""
+    top = max(counts.values())
+    return min(value for value, count in counts.items() if count == top)
+
+
+def _bin_thresholds(values: np.ndarray, max_bins: int) -> np.ndarray:
+    """Split points giving at most `max_bins` bins of about equal counts.
+
+    With few distinct values every gap between them gets a split at its
+    midpoint; otherwise the splits are quantiles of `values`.
+    """
+    distinct = np.unique(values.astype(np.float64))
+    if distinct.size <= max_bins:
+        return (distinct[:-1] + distinct[1:]) / 2
+    return np.unique(
+        np.quantile(values.astype(np.float64), np.linspace(0, 1, max_bins + 1)[1:-1])
+    )
+
+
+class StreamingPreprocessor:
+    """Fit the preprocessing of the price pipeline from chunks of data.
+
+    Every step is reduced to statistics that merge across chunks: value
+    counts for the most frequent imputer (memory grows with the number of
+    distinct values, not rows), label counts for the rare label encoder,
+    which sees the labels after imputation, and the set of labels left
+    for the ordinal encoder. A uniform reservoir sample of
+    `sample_rows` rows is kept alongside to pick the bin thresholds of
+    each model feature once the statistics are final.
+    """
+
+    def __init__(
+        self,
+        *,
+        model_config: ModelConfig = config.gradient_boosting_model_config,
+        sample_rows: int = config.gradient_boosting_model_config.bin_sample_rows,
+        seed: int = 0,
+    ):
+        self.model_config = model_config
+        self.sample_rows = sample_rows
+        self.features = _as_list(model_config.features)
+        self.numerical_vars = list(model_config.numerical_vars)
+        self.categorical_vars = _as_list(model_config.categorical_vars)
+        self.temporal_vars = _as_list(model_config.temporal_vars)
+        self.drop_features = _as_list(model_config.drop_features)
+        self.model_features = [
+            var for var in self.features if var not in self.drop_features
+        ]
+
+        imputed = dict.fromkeys(self.numerical_vars + self.categorical_vars)
+        self.counts: t.Dict[str, t.Counter] = {
+            var: collections.Counter() for var in imputed
+        }
+        self.missing: t.Counter[str] = collections.Counter()
+        self.n_rows = 0
+        self._rng = np.random.default_rng(seed)
+        self._sample: t.Dict[str, np.ndarray] = {}
+
+        self.fills: t.Dict[str, t.Any] = {}
+        self.frequent: t.Dict[str, t.List[str]] = {}
+        self.categories: t.Dict[str, t.List[str]] = {}
+        self.thresholds: t.List[np.ndarray] = []
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Merge the statistics of one chunk of training data."""
+        for var, counts in self.counts.items():
+            counts.update(chunk[var].value_counts(dropna=True).to_dict())
+            self.missing[var] += int(chunk[var].isna().sum())
+
+        # Algorithm R: row i replaces a random slot with probability k / (i + 1)
+        positions = self.n_rows + np.arange(len(chunk))
+        slots = np.where(
+            positions < self.sample_rows,
+            positions,
+            self._rng.integers(0, positions + 1),
+        )
+        keep = slots < self.sample_rows
+        for var in self.features:
+            if var not in self._sample:
+                dtype = object if var in self.categorical_vars else np.float64
+                self._sample[var] = np.empty(self.sample_rows, dtype=dtype)
+            self._sample[var][slots[keep]] = chunk[var].to_numpy()[keep]
+        self.n_rows += len(chunk)
+
+    def finalize(
+        self, *, max_bins: int = config.gradient_boosting_model_config.max_bins
+    ) -> "StreamingPreprocessor":
+        """Turn the merged statistics into fitted constants and bin thresholds."""
+        for var in self.numerical_vars:
+            if not self.counts[var]:
+                raise ValueError(f"No values of {var} to impute it with.")
+            self.fills[var] = _most_frequent(self.counts[var])
+        for var in self.categorical_vars:
+            # the first imputer to see a variable is the one that fills it
+            fill = self.fills.setdefault(var, MISSING_LABEL)
+            labels = self.counts[var].copy()
+            labels[fill] += self.missing[var]
+            labels = collections.Counter({k: v for k, v in labels.items() if v})
+            if len(labels) > self.model_config.rare_label_n_categories:
+                self.frequent[var] = [
+                    label
+                    for label, count in labels.items()
+                    if count / self.n_rows >= self.model_config.rare_label_tol
+                ]
+            else:
+                self.frequent[var] = list(labels)
+            self.categories[var] = sorted(
+                {label if label in self.frequent[var] else RARE_LABEL for label in labels}
+            )
+
+        size = min(self.n_rows, self.sample_rows)
+        sample = self.transform(
+            pd.DataFrame({var: values[:size] for var, values in self._sample.items()})
+        )
+        self.thresholds = [
+            _bin_thresholds(sample[:, column], max_bins)
+            for column in range(sample.shape[1])
+        ]
+        self._sample = {}
+        return self
+
+    def transform(self, chunk: pd.DataFrame) -> np.ndarray:
+        """Build the float32 model matrix of a chunk with the fitted constants."""
+        columns: t.Dict[str, np.ndarray] = {}
+        for var in self.categorical_vars:
+            labels = chunk[var].where(chunk[var].notna(), self.fills[var])
+            labels = labels.where(labels.isin(self.frequent[var]), RARE_LABEL)
+            codes = pd.Categorical(labels, categories=self.categories[var]).codes
+            if (codes == -1).any():
+                raise ValueError(f"Found unknown categories in {var}")
+            columns[var] = codes.astype(np.float64)
+        for var in self.numerical_vars:
+            if var not in columns:
+                values = chunk[var].to_numpy(dtype=np.float64, copy=True)
+                values[np.isnan(values)] = self.fills[var]
+                columns[var] = values
+
+        def numeric(var: str) -> np.ndarray:
+            if var not in columns:
+                columns[var] = chunk[var].to_numpy(dtype=np.float64)
+            return columns[var]
+
+        for var in self.temporal_vars:
+            columns[var] = numeric(self.drop_features[0]) - numeric(var)
+        return np.ascontiguousarray(
+            np.column_stack([numeric(var) for var in self.model_features]),
+            dtype=np.float32,
+        )
+
+    def bin(self, X: np.ndarray) -> np.ndarray:
+        """Map a transformed matrix onto uint8 bin indices.
+
+        A value falls in bin `b` when exactly `b` thresholds are below it,
+        so `bin <= b` holds exactly when `value <= thresholds[b]`.
+        """
+        binned = np.empty(X.shape, dtype=np.uint8)
+        for column, thresholds in enumerate(self.thresholds):
+            binned[:, column] = np.searchsorted(
+                thresholds, X[:, column].astype(np.float64), side="left"
+            )
+        return binned
+
+    def to_arrays(self) -> t.Dict[str, np.ndarray]:
+        """The preprocessing constants in the format of `export_pipeline_arrays`."""
+        numerical_vars = [var for var in self.fills if var not in self.categories]
+        arrays = {
+            "version": np.array(_version),
+            "rename_from": np.array(
+                list(self.model_config.variables_to_rename), dtype=str
+            ),
+            "rename_to": np.array(
+                list(self.model_config.variables_to_rename.values()), dtype=str
+            ),
+            "numerical_fill_vars": np.array(numerical_vars, dtype=str),
+            "numerical_fill_values": np.array(
+                [self.fills[var] for var in numerical_vars], dtype=np.float64
+            ),
+            "temporal_vars": np.array(self.temporal_vars, dtype=str),
+            "temporal_reference_vars": np.array(
+                [self.drop_features[0]] * len(self.temporal_vars), dtype=str
+            ),
+            "categorical_vars": np.array(self.categorical_vars, dtype=str),
+            "rare_label": np.array(RARE_LABEL),
+            "model_features": np.array(self.model_features, dtype=str),
+        }
+        for var in self.categorical_vars:
+            arrays[f"fill__{var}"] = np.array(str(self.fills[var]))
+            arrays[f"frequent__{var}"] = np.array(self.frequent[var], dtype=str)
+            arrays[f"categories__{var}"] = np.array(self.categories[var], dtype=str)
+        return arrays
+
+
+def write_binned_dataset(
+    *,
+    chunks: t.Iterable[pd.DataFrame],
+    preprocessor: StreamingPreprocessor,
+    directory: Path,
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """Write the binned features and the target of `chunks` to .npy memmaps.
+
+    Returns both files opened read-only as memory maps.
+    """
+    n_rows, n_features = preprocessor.n_rows, len(preprocessor.model_features)
+    bins = open_memmap(
+        directory / FEATURES_FILE_NAME,
+        mode="w+",
+        dtype=np.uint8,
+        shape=(n_rows, n_features),
+    )
+    target = open_memmap(
+        directory / TARGET_FILE_NAME, mode="w+", dtype=np.float64, shape=(n_rows,)
+    )
+    start = 0
+    for chunk in chunks:
+        stop = start + len(chunk)
+        if stop > n_rows:
+            raise ValueError("The data has more rows than when it was first read.")
+        bins[start:stop] = preprocessor.bin(preprocessor.transform(chunk))
+        target[start:stop] = chunk[preprocessor.model_config.target].to_numpy()
+        start = stop
+    if start != n_rows:
+        raise ValueError("The data has fewer rows than when it was first read.")
+    bins.flush()
+    target.flush()
+    del bins, target
+    return (
+        np.load(directory / FEATURES_FILE_NAME, mmap_mode="r"),
+        np.load(directory / TARGET_FILE_NAME, mmap_mode="r"),
+    )
+
+
+def _route(
+    nodes: np.ndarray,
+    bins: np.ndarray,
+    split_feature: np.ndarray,
+    split_bin: np.ndarray,
+) -> np.ndarray:
+    """Move rows at split nodes to their left (2k + 1) or right (2k + 2) child."""
+    feature = split_feature[nodes]
+    moving = np.flatnonzero(feature >= 0)
+    if moving.size:
+        at = nodes[moving]
+        go_right = bins[moving, feature[moving]] > split_bin[at]
+        nodes[moving] = 2 * at + 1 + go_right
+    return nodes
+
+
+def _flatten_tree(
+    *,
+    split_feature: np.ndarray,
+    split_bin: np.ndarray,
+    value: np.ndarray,
+    thresholds: t.Sequence[np.ndarray],
+    offset: int,
+) -> t.Tuple[t.List[np.ndarray], int]:
+    """Lay a heap-indexed tree out like `export_tree_arrays`, depth first."""
+    order, stack = [], [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if split_feature[node] >= 0:
+            stack.extend((2 * node + 2, 2 * node + 1))
+    new_index = {node: offset + position for position, node in enumerate(order)}
+
+    left, right, feature, threshold = [], [], [], []
+    for node in order:
+        if split_feature[node] >= 0:
+            left.append(new_index[2 * node + 1])
+            right.append(new_index[2 * node + 2])
+            feature.append(split_feature[node])
+            threshold.append(thresholds[split_feature[node]][split_bin[node]])
+        else:
+            # leaves never read their feature, point them at a valid column
+            left.append(-1)
+            right.append(-1)
+            feature.append(0)
+            threshold.append(-2.0)
+    depth = max(int(np.log2(node + 1)) for node in order)
+    arrays = [
+        np.array(left),
+        np.array(right),
+        np.array(feature),
+        np.array(threshold, dtype=np.float64),
+        value[order],
+    ]
+    return arrays, depth
+
+
+def fit_binned_booster(
+    *,
+    bins: np.ndarray,
+    target: np.ndarray,
+    thresholds: t.Sequence[np.ndarray],
+    work_dir: Path,
+    n_estimators: int,
+    learning_rate: float = 0.1,
+    max_depth: int = 3,
+    min_samples_leaf: int = 1,
+    chunk_rows: int = config.gradient_boosting_model_config.out_of_core_chunk_rows,
+) -> t.Dict[str, np.ndarray]:
+    """Fit a least squares gradient boosting model on pre-binned features.
+
+    Trees grow level by level: one pass over the rows, `chunk_rows` at a
+    time, routes them one level down and accumulates the residual sums
+    and counts of every (node, feature, bin), from which each node takes
+    the split with the largest decrease in squared error. A last pass
+    adds the leaf values to the raw predictions. The per-row state (raw
+    predictions and current node) lives in memory-mapped files in
+    `work_dir`, so memory is bounded by the chunk and histogram sizes.
+
+    Returns the tree arrays in the format of `export_tree_arrays`, with
+    split thresholds taken from `thresholds`.
+    """
+    n_rows, n_features = bins.shape
+    n_bins = max(len(column) for column in thresholds) + 1
+    n_nodes = 2 ** (max_depth + 1) - 1
+    slices = [
+        slice(start, min(start + chunk_rows, n_rows))
+        for start in range(0, n_rows, chunk_rows)
+    ]
+
+    init_value = sum(float(target[rows].sum()) for rows in slices) / n_rows
+    raw = open_memmap(
+        work_dir / "raw_predictions.npy", mode="w+", dtype=np.float64, shape=(n_rows,)
+    )
+    raw[:] = init_value
+    node = open_memmap(
+        work_dir / "nodes.npy", mode="w+", dtype=np.int16, shape=(n_rows,)
+    )
+
+    trees = []
+    for _ in range(n_estimators):
+        split_feature = np.full(n_nodes, -1)
+        split_bin = np.zeros(n_nodes, dtype=np.int64)
+        node_sum, node_count = np.zeros(n_nodes), np.zeros(n_nodes)
+        for level in range(max_depth + 1):
+            first, width = 2**level - 1, 2**level
+            if level == max_depth:
+                leaf_value = node_sum / np.maximum(node_count, 1)
+            else:
+                residual_hist = np.zeros(width * n_features * n_bins)
+                count_hist = np.zeros(width * n_features * n_bins)
+
+            for rows in slices:
+                chunk_bins = np.asarray(bins[rows])
+                chunk_nodes = np.array(node[rows], dtype=np.int64)
+                if level:
+                    chunk_nodes = _route(
+                        chunk_nodes, chunk_bins, split_feature, split_bin
+                    )
+                if level == max_depth:
+                    raw[rows] += learning_rate * leaf_value[chunk_nodes]
+                    node[rows] = 0
+                    continue
+                node[rows] = chunk_nodes
+
+                active = np.flatnonzero(chunk_nodes >= first)
+                residual = target[rows][active] - raw[rows][active]
+                index = (
+                    (chunk_nodes[active, None] - first) * n_features
+                    + np.arange(n_features)
+                ) * n_bins + chunk_bins[active]
+                residual_hist += np.bincount(
+                    index.ravel(),
+                    weights=np.repeat(residual, n_features),
+                    minlength=residual_hist.size,
+                )
+                count_hist += np.bincount(index.ravel(), minlength=count_hist.size)
+            if level == max_depth:
+                break
+
+            residual_hist = residual_hist.reshape(width, n_features, n_bins)
+            count_hist = count_hist.reshape(width, n_features, n_bins)
+            if level == 0:
+                node_sum[0] = residual_hist[0, 0].sum()
+                node_count[0] = count_hist[0, 0].sum()
+            for local in range(width):
+                current = first + local
+                total, count = node_sum[current], node_count[current]
+                if count < 2 * min_samples_leaf:
+                    continue
+                left_sum = residual_hist[local].cumsum(axis=1)
+                left_count = count_hist[local].cumsum(axis=1)
+                right_sum, right_count = total - left_sum, count - left_count
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    gain = (
+                        left_sum**2 / left_count
+                        + right_sum**2 / right_count
+                        - total**2 / count
+                    )
+                too_small = np.minimum(left_count, right_count) < min_samples_leaf
+                gain[too_small] = -np.inf
+                best = int(np.argmax(gain))
+                if not gain.flat[best] > 0:
+                    continue
+                feature, bin_ = divmod(best, n_bins)
+                split_feature[current], split_bin[current] = feature, bin_
+                children = 2 * current + 1, 2 * current + 2
+                node_sum[children[0]] = left_sum[feature, bin_]
+                node_count[children[0]] = left_count[feature, bin_]
+                node_sum[children[1]] = right_sum[feature, bin_]
+                node_count[children[1]] = right_count[feature, bin_]
+        trees.append((split_feature, split_bin, leaf_value))
+    raw.flush()
+
+    columns: t.List[t.List[np.ndarray]] = [[], [], [], [], []]
+    roots, offset, depth = [], 0, 0
+    for split_feature, split_bin, leaf_value in trees:
+        arrays, tree_depth = _flatten_tree(
+            split_feature=split_feature,
+            split_bin=split_bin,
+            value=leaf_value,
+            thresholds=thresholds,
+            offset=offset,
+        )
+        for column, array in zip(columns, arrays):
+            column.append(array)
+        roots.append(offset)
+        offset += arrays[0].size
+        depth = max(depth, tree_depth)
+
+    children_left, children_right, feature, threshold, value = (
+        np.concatenate(column) for column in columns
+    )
+    return {
+        "init_value": np.array(init_value, dtype=np.float64),
+        "learning_rate": np.array(learning_rate, dtype=np.float64),
+        "max_depth": np.array(depth),
+        "roots": np.array(roots, dtype=np.int32),
+        "children_left": children_left.astype(np.int32),
+        "children_right": children_right.astype(np.int32),
+        "feature": feature.astype(np.int16),
+        "threshold": threshold,
+        "value": value,
+    }
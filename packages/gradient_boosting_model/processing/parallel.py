@@ -0,0 +1,121 @@
+import contextvars
+import os
+import threading
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.monitoring import tracing
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+_executor: t.Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def resolve_n_threads(n_threads: int) -> int:
+    """Map the configured thread count to a concrete one (0 means all cores)."""
+    if n_threads > 0:
+        return n_threads
+    return os.cpu_count() or 1
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the shared scoring pool.
+
+    The pool is created once, with a thread per core (or `n_threads` in
+    the scoring config, if more), and kept for the life of the process,
+    so requests do not pay for starting threads. Callers limit their own
+    concurrency on it, see `predict_in_chunks`.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(
+                    resolve_n_threads(0),
+                    resolve_n_threads(config.scoring_config.n_threads),
+                ),
+                thread_name_prefix="gb-scoring",
+            )
+        return _executor
+
+
+def add_stage_predictions(
+    *,
+    model: GradientBoostingRegressor,
+    X: np.ndarray,
+    out: np.ndarray,
+    n_stages: t.Optional[int] = None,
+) -> None:
+    """Add the scaled leaf value of every boosting stage to `out` in place.
+
+    `Tree.apply` releases the GIL while it walks the tree, and the
+    stages are accumulated in the same order as
+    `GradientBoostingRegressor.predict`, so the result is bit-identical.
+    With `n_stages`, only the first `n_stages` stages are added.
+    """
+    for stage in model.estimators_[:n_stages, 0]:
+        tree = stage.tree_
+        out += model.learning_rate * tree.value[:, 0, 0][tree.apply(X)]
+
+
+def predict_in_chunks(
+    *,
+    model: GradientBoostingRegressor,
+    X: np.ndarray,
+    n_threads: int,
+    chunk_rows: int,
+    n_stages: t.Optional[int] = None,
+) -> np.ndarray:
+    """Score row chunks of a float32 matrix on the shared thread pool.
+
+    At most `n_threads` chunks of this call are scored at once, however
+    many other calls share the pool. Every chunk writes into its own
+    slice of one preallocated result array. The workers run in copies of
+    the caller's context, so each chunk's span is a child of the
+    caller's open span.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    predictions = np.empty(X.shape[0], dtype=np.float64)
+    if X.shape[0] == 0:
+        return predictions
+    predictions[:] = model.init_.predict(X[:1])[0]
+
+    starts = iter(range(0, X.shape[0], chunk_rows))
+    starts_lock = threading.Lock()
+
+    def score_chunks() -> None:
+        # each worker takes the next chunk until none is left
+        while True:
+            with starts_lock:
+                start = next(starts, None)
+            if start is None:
+                return
+            with tracing.span("predict_in_chunks.chunk", start=start):
+                add_stage_predictions(
+                    model=model,
+                    X=X[start:start + chunk_rows],
+                    out=predictions[start:start + chunk_rows],
+                    n_stages=n_stages,
+                )
+
+    n_chunks = -(-X.shape[0] // chunk_rows)
+    executor = get_executor()
+    # one copy per worker, a context can only be entered by one thread at a time
+    futures = [
+        executor.submit(contextvars.copy_context().run, score_chunks)
+        for _ in range(min(n_threads, n_chunks))
+    ]
+    for future in futures:
+        future.result()
+
+    _logger.debug(
+        f"Scored {X.shape[0]} rows in {n_chunks} chunks on {len(futures)} threads."
+    )
+    return predictions
@@ -0,0 +1,121 @@
+import time
+import typing as t
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from gradient_boosting_model.config.core import config, PerformanceConfig
+from gradient_boosting_model.processing.compaction import pickle_size
+from gradient_boosting_model.processing.profiling import untraced
+from gradient_boosting_model.processing.validation import validate_inputs
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def benchmark_pipeline(
+    *,
+    pipeline: Pipeline,
+    data: pd.DataFrame,
+    batch_sizes: t.Optional[t.Sequence[int]] = None,
+    min_seconds: float = 0.2,
+    max_repeats: int = 50,
+) -> dict:
+    """Time `pipeline.predict` on batches built from `data`, and size the model.
+
+    `batch_sizes` defaults to `benchmark_batch_sizes` in the performance
+    config, read at call time. Batches larger than the validated data
+    repeat its rows. Each batch size is scored at least three times, and
+    until `min_seconds` have been spent on it or `max_repeats` is reached.
+    Timing pauses `tracemalloc`, e.g. when run inside a profiled training
+    run, so the latencies are those of an untraced process.
+    """
+    if batch_sizes is None:
+        batch_sizes = config.performance_config.benchmark_batch_sizes
+    validated_data, _ = validate_inputs(input_data=data)
+    features = validated_data[config.gradient_boosting_model_config.features]
+    model = pipeline[-1]
+
+    batches = []
+    for batch_size in batch_sizes:
+        batch = features.iloc[np.arange(batch_size) % len(features)]
+        timings: t.List[float] = []
+        with untraced():
+            while len(timings) < max_repeats:
+                start = time.perf_counter()
+                pipeline.predict(batch)
+                timings.append(time.perf_counter() - start)
+                if len(timings) >= 3 and sum(timings) >= min_seconds:
+                    break
+        median_seconds = float(np.median(timings))
+        batches.append(
+            {
+                "batch_size": batch_size,
+                "repeats": len(timings),
+                "median_seconds": median_seconds,
+                "min_seconds": min(timings),
+                "rows_per_second": batch_size / median_seconds,
+            }
+        )
+
+    return {
+        "batches": batches,
+        "pickle_bytes": pickle_size(pipeline),
+        "stages": int(model.n_estimators_),
+        "nodes": int(sum(stage.tree_.node_count for stage in model.estimators_[:, 0])),
+    }
+
+
+def check_performance(
+    *,
+    benchmark: dict,
+    previous: t.Optional[dict] = None,
+    performance_config: t.Optional[PerformanceConfig] = None,
+) -> t.List[str]:
+    """List the budgets a benchmark misses and its regressions from `previous`.
+
+    `performance_config` defaults to the one in the config, read at call time.
+    """
+    if performance_config is None:
+        performance_config = config.performance_config
+    violations = []
+    batches = {batch["batch_size"]: batch for batch in benchmark["batches"]}
+    if 1 in batches and (
+        batches[1]["median_seconds"] > performance_config.max_single_row_seconds
+    ):
+        violations.append(
+            f"single row latency {batches[1]['median_seconds']:.4f}s exceeds "
+            f"{performance_config.max_single_row_seconds}s"
+        )
+    if batches:
+        largest = batches[max(batches)]
+        if largest["rows_per_second"] < performance_config.min_rows_per_second:
+            violations.append(
+                f"throughput {largest['rows_per_second']:.0f} rows/s at batch size "
+                f"{largest['batch_size']} is below "
+                f"{performance_config.min_rows_per_second}"
+            )
+    if benchmark["pickle_bytes"] > performance_config.max_model_bytes:
+        violations.append(
+            f"model size {benchmark['pickle_bytes']} bytes exceeds "
+            f"{performance_config.max_model_bytes}"
+        )
+
+    if previous is None:
+        return violations
+    limit = 1 + performance_config.max_regression
+    for batch in previous.get("batches", []):
+        current = batches.get(batch["batch_size"])
+        if current and current["median_seconds"] > batch["median_seconds"] * limit:
+            violations.append(
+                f"latency at batch size {batch['batch_size']} regressed from "
+                f"{batch['median_seconds']:.4f}s to {current['median_seconds']:.4f}s"
+            )
+    if benchmark["pickle_bytes"] > previous.get("pickle_bytes", np.inf) * limit:
+        violations.append(
+            f"model size regressed from {previous['pickle_bytes']} "
+            f"to {benchmark['pickle_bytes']} bytes"
+        )
+    return violations
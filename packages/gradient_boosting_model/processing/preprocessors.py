@@ -159,6 +159,7 @@ class DropUnnecessaryFeatures(BaseEstimator, TransformerMixin):
     def __init__(self, variables_to_drop: Optional[Union[List[str], str]] = None):
         if not variables_to_drop:
             raise ValueError("'variables_to_drop' must be provided.")
+        self.variables_to_drop = variables_to_drop
         self.variables = (
             variables_to_drop
             if isinstance(variables_to_drop, list)
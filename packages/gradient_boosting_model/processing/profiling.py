@@ -0,0 +1,122 @@
+import contextlib
+import time
+import tracemalloc
+import typing as t
+
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# the highest traced peak seen by `untraced` since the current section
+# started, as stopping tracing forgets it
+_paused_peak = 0
+
+
+@contextlib.contextmanager
+def untraced() -> t.Iterator[None]:
+    """Pause `tracemalloc`, if it is on, for the enclosed block.
+
+    For timings that tracing would inflate several times over. The peak
+    traced so far still counts towards the current `RunProfiler`
+    section; allocations made before the pause and still alive are not
+    traced after it.
+    """
+    global _paused_peak
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    n_frames = tracemalloc.get_traceback_limit()
+    _paused_peak = max(_paused_peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    try:
+        yield
+    finally:
+        tracemalloc.start(n_frames)
+
+
+class RunProfiler:
+    """Record wall time, CPU time and peak traced memory of named sections.
+
+    Sections are measured one after another, not nested: the peak is
+    reset when a section starts, so it covers that section alone. Memory
+    is what `tracemalloc` sees, i.e. Python allocations including NumPy
+    buffers, and tracing is started on first use if it is not already on
+    (and paused inside `untraced` blocks, e.g. for benchmarks).
+    `close` (or leaving the profiler's `with` block) stops tracing again
+    if the profiler started it, so later code does not pay for it.
+    """
+
+    def __init__(self) -> None:
+        self.sections: t.List[dict] = []
+        self._started_tracing = False
+
+    def __enter__(self) -> "RunProfiler":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def measure(self, name: str) -> t.Iterator[None]:
+        global _paused_peak
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        _paused_peak = 0
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            section = {
+                "name": name,
+                "wall_seconds": time.perf_counter() - wall_start,
+                "cpu_seconds": time.process_time() - cpu_start,
+                "peak_memory_bytes": max(
+                    tracemalloc.get_traced_memory()[1], _paused_peak
+                ),
+            }
+            self.sections.append(section)
+            _logger.info(f"Profiled section: {section}")
+
+    def report(self) -> dict:
+        return {
+            "sections": self.sections,
+            "total": {
+                "wall_seconds": sum(s["wall_seconds"] for s in self.sections),
+                "cpu_seconds": sum(s["cpu_seconds"] for s in self.sections),
+                "peak_memory_bytes": max(
+                    (s["peak_memory_bytes"] for s in self.sections), default=0
+                ),
+            },
+        }
+
+
+def fit_with_profile(
+    *, pipeline: Pipeline, X: pd.DataFrame, y: pd.Series, profiler: RunProfiler
+) -> Pipeline:
+    """Fit a pipeline step by step, profiling each `fit` and `transform`.
+
+    Equivalent to `pipeline.fit(X, y)` for a pipeline without a memory
+    cache: every transformer is fitted, then transforms the data for the
+    next step, and the final estimator is fitted on the result.
+    """
+    X_transformed = X
+    for name, step in pipeline.steps[:-1]:
+        with profiler.measure(f"{name}.fit"):
+            step.fit(X_transformed, y)
+        with profiler.measure(f"{name}.transform"):
+            X_transformed = step.transform(X_transformed)
+
+    name, estimator = pipeline.steps[-1]
+    with profiler.measure(f"{name}.fit"):
+        estimator.fit(X_transformed, y)
+    return pipeline
@@ -0,0 +1,181 @@
+import shutil
+import typing as t
+from pathlib import Path
+
+import numpy as np
+from feature_engine.encoding import RareLabelEncoder
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+
+from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.processing import bundle_scorer
+from gradient_boosting_model.processing import preprocessors as pp
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def export_pipeline_arrays(
+    *, pipeline: Pipeline, quantize: bool = False
+) -> t.Dict[str, np.ndarray]:
+    """Flatten a fitted price pipeline into plain NumPy arrays.
+
+    Each step is mapped onto the constants `bundle_scorer` needs to
+    reproduce it: imputation fill values, temporal differences, frequent
+    labels, ordinal categories and the tree arrays of the final model.
+    """
+    fills: t.Dict[str, t.Any] = {}
+    temporal: t.List[t.Tuple[str, str]] = []
+    frequent: t.Dict[str, t.List[str]] = {}
+    categories: t.Dict[str, t.List[str]] = {}
+    rare_label = "Rare"
+
+    for name, step in pipeline.steps[:-1]:
+        if isinstance(step, pp.SklearnTransformerWrapper) and isinstance(
+            step.transformer, SimpleImputer
+        ):
+            for var, fill in zip(step.variables, step.transformer.statistics_):
+                # the first imputer to see a variable is the one that fills it
+                fills.setdefault(var, fill)
+        elif isinstance(step, pp.SklearnTransformerWrapper) and isinstance(
+            step.transformer, OrdinalEncoder
+        ):
+            for var, labels in zip(step.variables, step.transformer.categories_):
+                categories[var] = [str(label) for label in labels]
+        elif isinstance(step, pp.TemporalVariableEstimator):
+            temporal.extend((var, step.reference_variable) for var in step.variables)
+        elif isinstance(step, RareLabelEncoder):
+            frequent.update(step.encoder_dict_)
+            rare_label = str(step.replace_with)
+        elif not isinstance(step, pp.DropUnnecessaryFeatures):
+            raise ValueError(f"Cannot export pipeline step {name!r} to a bundle.")
+
+    categorical_vars = list(categories)
+    numerical_vars = [var for var in fills if var not in categories]
+    arrays = {
+        "version": np.array(_version),
+        "rename_from": np.array(
+            list(config.gradient_boosting_model_config.variables_to_rename), dtype=str
+        ),
+        "rename_to": np.array(
+            list(config.gradient_boosting_model_config.variables_to_rename.values()),
+            dtype=str,
+        ),
+        "numerical_fill_vars": np.array(numerical_vars, dtype=str),
+        "numerical_fill_values": np.array(
+            [fills[var] for var in numerical_vars], dtype=np.float64
+        ),
+        "temporal_vars": np.array([var for var, _ in temporal], dtype=str),
+        "temporal_reference_vars": np.array([ref for _, ref in temporal], dtype=str),
+        "categorical_vars": np.array(categorical_vars, dtype=str),
+        "rare_label": np.array(rare_label),
+    }
+    for var in categorical_vars:
+        arrays[f"fill__{var}"] = np.array(str(fills.get(var, "missing")))
+        arrays[f"frequent__{var}"] = np.array(
+            frequent.get(var, categories[var]), dtype=str
+        )
+        arrays[f"categories__{var}"] = np.array(categories[var], dtype=str)
+
+    arrays.update(export_tree_arrays(model=pipeline[-1], quantize=quantize))
+    return arrays
+
+
+def quantize_thresholds(threshold: np.ndarray) -> np.ndarray:
+    """Round split thresholds down to the nearest float32.
+
+    The trees compare float32 features against the thresholds, and for
+    any float32 `x`, `x <= t` holds exactly when `x <= floor32(t)`, so
+    the rounded thresholds give identical splits.
+    """
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def _reachable_nodes(tree: t.Any) -> np.ndarray:
+    """Nodes reachable from the root, in depth-first order."""
+    reachable, stack = [], [0]
+    while stack:
+        node = stack.pop()
+        reachable.append(node)
+        if tree.children_left[node] != -1:
+            stack.extend((tree.children_right[node], tree.children_left[node]))
+    return np.array(reachable)
+
+
+def export_tree_arrays(
+    *, model: GradientBoostingRegressor, quantize: bool = False
+) -> t.Dict[str, np.ndarray]:
+    """Concatenate the reachable nodes of every boosting stage into flat arrays.
+
+    With `quantize`, thresholds are rounded down to float32 (lossless for
+    float32 inputs) and leaf values are stored as float32 (lossy).
+    """
+    children_left, children_right, feature, threshold, value = [], [], [], [], []
+    roots, offset, max_depth = [], 0, 0
+    for stage in model.estimators_[:, 0]:
+        tree = stage.tree_
+        nodes = _reachable_nodes(tree)
+        new_index = np.full(tree.node_count, -1)
+        new_index[nodes] = np.arange(nodes.size) + offset
+
+        is_leaf = tree.children_left[nodes] == -1
+        children_left.append(np.where(is_leaf, -1, new_index[tree.children_left[nodes]]))
+        children_right.append(
+            np.where(is_leaf, -1, new_index[tree.children_right[nodes]])
+        )
+        # leaves never read their feature, point them at a valid column
+        feature.append(np.where(is_leaf, 0, tree.feature[nodes]))
+        threshold.append(tree.threshold[nodes])
+        value.append(tree.value[nodes, 0, 0])
+
+        roots.append(offset)
+        offset += nodes.size
+        max_depth = max(max_depth, tree.max_depth)
+
+    thresholds = np.concatenate(threshold)
+    values = np.concatenate(value)
+    return {
+        "model_features": np.array(model.feature_names_in_, dtype=str),
+        "init_value": np.array(
+            float(np.ravel(model.init_.constant_)[0]), dtype=np.float64
+        ),
+        "learning_rate": np.array(model.learning_rate, dtype=np.float64),
+        "max_depth": np.array(max_depth),
+        "roots": np.array(roots, dtype=np.int32),
+        "children_left": np.concatenate(children_left).astype(np.int32),
+        "children_right": np.concatenate(children_right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int16),
+        "threshold": quantize_thresholds(thresholds) if quantize else thresholds,
+        "value": values.astype(np.float32) if quantize else values,
+    }
+
+
+def save_scoring_bundle(
+    *, pipeline: Pipeline, bundle_dir: Path, quantize: bool = False
+) -> Path:
+    """Write a self-contained scoring bundle for a fitted pipeline.
+
+    The bundle directory holds `model.npz` with the exported constants
+    and a copy of `bundle_scorer.py`, so it can be loaded with nothing
+    but NumPy installed.
+    """
+    return write_bundle(
+        arrays=export_pipeline_arrays(pipeline=pipeline, quantize=quantize),
+        bundle_dir=bundle_dir,
+    )
+
+
+def write_bundle(*, arrays: t.Mapping[str, np.ndarray], bundle_dir: Path) -> Path:
+    """Write exported bundle arrays and the NumPy-only scorer to `bundle_dir`."""
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    np.savez(bundle_dir / bundle_scorer.BUNDLE_FILE_NAME, **arrays)
+    shutil.copyfile(bundle_scorer.__file__, bundle_dir / "bundle_scorer.py")
+    _logger.info(f"Saved scoring bundle: {bundle_dir.name}")
+    return bundle_dir
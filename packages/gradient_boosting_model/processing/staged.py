@@ -0,0 +1,157 @@
+import threading
+import time
+import typing as t
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.metrics import mean_squared_error
+
+from gradient_boosting_model.processing.parallel import add_stage_predictions
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# batch size used to separate per-stage overhead from per-row cost
+_CALIBRATION_ROWS = 256
+
+
+def staged_accuracy_curve(
+    *, model: GradientBoostingRegressor, X: pd.DataFrame, y: pd.Series
+) -> dict:
+    """Holdout MSE of the model truncated to its first k stages, for every k."""
+    staged_mse = [
+        float(mean_squared_error(y, predictions))
+        for predictions in model.staged_predict(X)
+    ]
+    return {
+        "stages": list(range(1, len(staged_mse) + 1)),
+        "holdout_mse": staged_mse,
+        "relative_mse": [mse / staged_mse[-1] for mse in staged_mse],
+    }
+
+
+def _best_time(func: t.Callable[[], t.Any], repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibration_row(*, model: GradientBoostingRegressor) -> np.ndarray:
+    """A typical input row: each feature at the median of its split thresholds."""
+    row = np.zeros((1, model.n_features_in_), dtype=np.float32)
+    trees = [stage.tree_ for stage in model.estimators_[:, 0]]
+    features = np.concatenate([tree.feature for tree in trees])
+    thresholds = np.concatenate([tree.threshold for tree in trees])
+    for feature in np.unique(features[features >= 0]):
+        row[0, feature] = np.median(thresholds[features == feature])
+    return row
+
+
+class StageCostModel:
+    """Predict how long scoring k boosting stages of a batch takes.
+
+    The cost of one stage is a fixed overhead plus a per-row cost, paid
+    once per chunk; chunks scored in parallel (see `predict_in_chunks`)
+    are spread over the threads. Both costs are calibrated once on the
+    model being served, then scaled after every scored batch by an
+    exponential moving average of the measured over predicted time, so
+    the estimate follows the actual load and speedup.
+    """
+
+    def __init__(self, *, smoothing: float = 0.2):
+        self.smoothing = smoothing
+        self.stage_overhead_seconds: t.Optional[float] = None
+        self.stage_row_seconds: t.Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_calibrated(self) -> bool:
+        return self.stage_overhead_seconds is not None
+
+    def calibrate(
+        self, *, model: GradientBoostingRegressor, X: t.Optional[np.ndarray] = None
+    ) -> None:
+        """Time the model on copies of the first row of `X`.
+
+        Without `X`, a typical row is used (see `calibration_row`), so the
+        model can be calibrated when it is loaded, before any request.
+        """
+        n_stages = model.n_estimators_
+        row = calibration_row(model=model) if X is None else X[:1]
+        batch = np.repeat(row, _CALIBRATION_ROWS, axis=0)
+        single_seconds = _best_time(
+            lambda: add_stage_predictions(model=model, X=row, out=np.zeros(1))
+        )
+        batch_seconds = _best_time(
+            lambda: add_stage_predictions(
+                model=model, X=batch, out=np.zeros(_CALIBRATION_ROWS)
+            )
+        )
+        with self._lock:
+            self.stage_overhead_seconds = single_seconds / n_stages
+            self.stage_row_seconds = max(batch_seconds - single_seconds, 0.0) / (
+                (_CALIBRATION_ROWS - 1) * n_stages
+            )
+        _logger.info(
+            f"Calibrated stage cost: {self.stage_overhead_seconds:.2e}s per stage "
+            f"plus {self.stage_row_seconds:.2e}s per row"
+        )
+
+    def stage_seconds(
+        self, *, rows: int, n_threads: int = 1, chunk_rows: t.Optional[int] = None
+    ) -> float:
+        """Expected seconds per stage for `rows` rows.
+
+        With `n_threads` above one, the rows are scored in chunks of
+        `chunk_rows` and each thread pays for its share of the chunks.
+        """
+        if self.stage_overhead_seconds is None or self.stage_row_seconds is None:
+            raise ValueError("The stage cost model has not been calibrated.")
+        if n_threads <= 1 or not chunk_rows or rows <= chunk_rows:
+            return self.stage_overhead_seconds + self.stage_row_seconds * rows
+        n_chunks = -(-rows // chunk_rows)
+        chunks_per_thread = -(-n_chunks // n_threads)
+        return chunks_per_thread * (
+            self.stage_overhead_seconds + self.stage_row_seconds * chunk_rows
+        )
+
+    def affordable_stages(
+        self,
+        *,
+        rows: int,
+        seconds: float,
+        max_stages: int,
+        n_threads: int = 1,
+        chunk_rows: t.Optional[int] = None,
+    ) -> int:
+        """Largest number of stages expected to finish in `seconds`, at least one."""
+        stage_seconds = self.stage_seconds(
+            rows=rows, n_threads=n_threads, chunk_rows=chunk_rows
+        )
+        return min(max(int(seconds / stage_seconds), 1), max_stages)
+
+    def update(
+        self,
+        *,
+        rows: int,
+        n_stages: int,
+        seconds: float,
+        n_threads: int = 1,
+        chunk_rows: t.Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            if self.stage_overhead_seconds is None or self.stage_row_seconds is None:
+                return
+            predicted = n_stages * self.stage_seconds(
+                rows=rows, n_threads=n_threads, chunk_rows=chunk_rows
+            )
+            if predicted <= 0:
+                return
+            factor = 1 + self.smoothing * (seconds / predicted - 1)
+            self.stage_overhead_seconds *= factor
+            self.stage_row_seconds *= factor
@@ -1,8 +1,11 @@
+import typing as t
+
 from gradient_boosting_model.config.core import config
 
 import numpy as np
 import pandas as pd
 from marshmallow import fields, Schema, ValidationError
+from sklearn.pipeline import Pipeline
 
 
 class HouseDataInputSchema(Schema):
@@ -88,9 +91,46 @@ class HouseDataInputSchema(Schema):
     ThreeSsnPortch = fields.Integer()
 
 
+# fitted step attributes naming the input columns a step reads
+_STEP_VARIABLE_ATTRIBUTES = (
+    "variables",
+    "variables_",
+    "reference_variable",
+    "variables_to_drop",
+    "feature_names_in_",
+)
+
+
+def model_fields(
+    *, pipelines: t.Sequence[Pipeline] = (), extras: t.Sequence[str] = ()
+) -> t.List[str]:
+    """The schema fields the model needs, in schema order.
+
+    These are the configured features and the fields whose missing
+    values drop a row, every input variable the steps of `pipelines`
+    read (derived columns, which are not schema fields, are skipped), and
+    `extras`, e.g. an Id to carry through.
+    """
+    model_config = config.gradient_boosting_model_config
+    names = {*model_config.features, *model_config.numerical_na_not_allowed}
+    for pipeline in pipelines:
+        for _, step in pipeline.steps:
+            for attribute in _STEP_VARIABLE_ATTRIBUTES:
+                variables = getattr(step, attribute, None)
+                if variables is not None:
+                    names.update([variables] if isinstance(variables, str) else variables)
+    schema_fields = HouseDataInputSchema().fields
+    unknown = set(extras) - set(schema_fields)
+    if unknown:
+        raise ValueError(f"Extra fields not in the input schema: {sorted(unknown)}")
+    names.update(extras)
+    return [name for name in schema_fields if name in names]
+
+
 def drop_na_inputs(*, input_data: pd.DataFrame) -> pd.DataFrame:
     """Check model inputs for na values and filter."""
-    validated_data = input_data.copy()
+    # a shallow copy keeps referencing the caller's column buffers
+    validated_data = input_data.copy(deep=False)
     if input_data[
         config.gradient_boosting_model_config.numerical_na_not_allowed
     ].isnull().any().any():
@@ -102,20 +142,43 @@ def drop_na_inputs(*, input_data: pd.DataFrame) -> pd.DataFrame:
     return validated_data
 
 
+def dropped_rows(
+    *, input_data: pd.DataFrame, validated_data: pd.DataFrame
+) -> t.List[int]:
+    """Positions of the `input_data` rows that `drop_na_inputs` dropped."""
+    if len(validated_data) == len(input_data):
+        return []
+    na_not_allowed = config.gradient_boosting_model_config.numerical_na_not_allowed
+    renamed = input_data.rename(
+        columns=config.gradient_boosting_model_config.variables_to_rename, copy=False
+    )
+    return np.flatnonzero(renamed[na_not_allowed].isnull().any(axis=1)).tolist()
+
+
 def validate_inputs(
-    *, input_data: pd.DataFrame
+    *, input_data: pd.DataFrame, fields: t.Optional[t.Sequence[str]] = None
 ) -> tuple[pd.DataFrame, dict | None]:
-    """Check model inputs for unprocessable values."""
+    """Check model inputs for unprocessable values.
+
+    With `fields` (see `model_fields`), the other columns are dropped
+    first and only those fields are validated and returned; by default
+    the whole schema is.
+    """
 
-    # Convert syntax error field names (beginning with numbers)
-    input_data.rename(
+    # Convert syntax error field names (beginning with numbers),
+    # without modifying the caller's DataFrame
+    input_data = input_data.rename(
         columns=config.gradient_boosting_model_config.variables_to_rename,
-        inplace=True
+        copy=False,
     )
+    if fields is not None:
+        input_data = input_data[
+            [field for field in fields if field in input_data.columns]
+        ]
     validated_data = drop_na_inputs(input_data=input_data)
 
     # Set many=True to allow passing in a list
-    schema = HouseDataInputSchema(many=True)
+    schema = HouseDataInputSchema(many=True, only=fields)
     errors = None
 
     try:
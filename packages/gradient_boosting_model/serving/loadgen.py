@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import json
+import time
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.processing.data_management import load_dataset
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def build_payloads(
+    *, data: pd.DataFrame, batch_size: int = 1, n_payloads: int = 100
+) -> t.List[bytes]:
+    """JSON bodies from dataset rows: records for batch size 1, else columns."""
+    data = data.drop(
+        columns=[config.gradient_boosting_model_config.target], errors="ignore"
+    )
+    # JSON has no NaN, send nulls instead
+    data = data.astype(object).where(data.notnull(), None)
+    payloads = []
+    for index in range(n_payloads):
+        rows = np.arange(index * batch_size, (index + 1) * batch_size) % len(data)
+        batch = data.iloc[rows]
+        if batch_size == 1:
+            payload: t.Any = batch.iloc[0].to_dict()
+        else:
+            payload = batch.to_dict(orient="list")
+        payloads.append(json.dumps(payload).encode())
+    return payloads
+
+
+def build_request(*, host: str, path: str, body: bytes) -> bytes:
+    """An HTTP/1.1 POST of the JSON `body` to `path`."""
+    return (
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+async def read_response(reader: asyncio.StreamReader) -> t.Tuple[int, bytes]:
+    """Read one HTTP/1.1 response with a Content-Length body."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head[:-4].decode("latin-1").split("\r\n")
+    length = 0
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return int(status_line.split(" ")[1]), await reader.readexactly(length)
+
+
+async def _connection_worker(
+    *,
+    host: str,
+    port: int,
+    requests: t.List[bytes],
+    deadline: float,
+    remaining: t.List[int],
+    latencies: t.List[float],
+    statuses: t.Counter[int],
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        index = 0
+        while time.perf_counter() < deadline and remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            writer.write(requests[index % len(requests)])
+            status, _ = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+            index += 1
+    finally:
+        writer.close()
+
+
+async def run_load(
+    *,
+    host: str = config.serving_config.host,
+    port: int = config.serving_config.port,
+    path: str = "/predict",
+    payloads: t.Sequence[bytes],
+    concurrency: int = 8,
+    duration_seconds: float = 10.0,
+    max_requests: t.Optional[int] = None,
+) -> dict:
+    """Drive the server from `concurrency` keep-alive connections.
+
+    Each connection sends its next request as soon as the previous
+    response arrives (a closed loop), until `duration_seconds` have passed
+    or `max_requests` requests have been sent in total.
+    """
+    requests = [build_request(host=host, path=path, body=body) for body in payloads]
+    latencies: t.List[float] = []
+    statuses: t.Counter[int] = t.Counter()
+    remaining = [max_requests if max_requests is not None else np.iinfo(np.int64).max]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _connection_worker(
+                host=host,
+                port=port,
+                requests=requests[worker::concurrency] or requests,
+                deadline=start + duration_seconds,
+                remaining=remaining,
+                latencies=latencies,
+                statuses=statuses,
+            )
+            for worker in range(concurrency)
+        )
+    )
+    wall_seconds = time.perf_counter() - start
+
+    latency = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "wall_seconds": wall_seconds,
+        "requests_per_second": len(latencies) / wall_seconds,
+        "latency_seconds": {
+            "mean": float(latency.mean()),
+            "p50": float(np.percentile(latency, 50)),
+            "p90": float(np.percentile(latency, 90)),
+            "p99": float(np.percentile(latency, 99)),
+            "max": float(latency.max()),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Closed-loop load test of the prediction server."
+    )
+    parser.add_argument("--host", default=config.serving_config.host)
+    parser.add_argument("--port", type=int, default=config.serving_config.port)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run_load(
+            host=args.host,
+            port=args.port,
+            path="/predict" if args.batch_size == 1 else "/predict/batch",
+            payloads=build_payloads(
+                data=load_dataset(file_name=config.app_config.test_data_file),
+                batch_size=args.batch_size,
+            ),
+            concurrency=args.concurrency,
+            duration_seconds=args.duration,
+        )
+    )
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,553 @@
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import csv
+import json
+import math
+import time
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.multi_predict import MultiModelPredictor
+from gradient_boosting_model.predict import get_pipeline, make_prediction
+from gradient_boosting_model.processing.data_management import load_dataset
+from gradient_boosting_model.serving.loadgen import (
+    build_payloads,
+    build_request,
+    read_response,
+)
+from gradient_boosting_model.serving.shm_daemon import ScoringDaemon
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+TARGETS = ("make_prediction", "multi_model", "daemon", "server")
+ARRIVALS = ("poisson", "constant")
+REPORTED_PERCENTILES = (50.0, 90.0, 99.0, 99.9, 99.99, 100.0)
+
+
+class LatencyHistogram:
+    """Latencies in log-linear buckets with a bounded relative error.
+
+    The layout is that of an HDR histogram: values are integer
+    microseconds, the first bucket counts every value below
+    `sub_bucket_count` exactly and each next bucket covers twice the range
+    with half as many sub-buckets, so every recorded value is off by at
+    most one part in `10 ** significant_figures`, from a microsecond to
+    `highest_seconds`, in a few thousand counters.
+    """
+
+    def __init__(self, *, significant_figures: int = 3, highest_seconds: float = 3600):
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures must be between 1 and 5.")
+        self.significant_figures = significant_figures
+        self.highest_seconds = highest_seconds
+        self._magnitude = math.ceil(math.log2(2 * 10**significant_figures))
+        self._half_count = 2 ** (self._magnitude - 1)
+        self._mask = 2**self._magnitude - 1
+        highest = int(highest_seconds * 1e6)
+        n_buckets = max(highest.bit_length() - self._magnitude + 1, 1)
+        self.counts = np.zeros((n_buckets + 1) * self._half_count, dtype=np.int64)
+        self.total_count = 0
+        self.max_seconds = 0.0
+        self._sum_seconds = 0.0
+
+    def _index(self, micros: np.ndarray) -> np.ndarray:
+        # frexp's exponent is the bit length, exact below 2**53
+        _, bit_length = np.frexp((micros | self._mask).astype(np.float64))
+        bucket = bit_length - self._magnitude
+        sub_bucket = micros >> bucket
+        return (bucket + 1) * self._half_count + sub_bucket - self._half_count
+
+    def _value(self, index: np.ndarray) -> np.ndarray:
+        """The highest value counted at `index`, in microseconds."""
+        bucket = np.maximum(index // self._half_count - 1, 0)
+        first = index < 2 * self._half_count
+        sub_bucket = np.where(first, index, index % self._half_count + self._half_count)
+        return (sub_bucket << bucket) + (1 << bucket) - 1
+
+    def record(self, seconds: t.Union[float, t.Sequence[float], np.ndarray]) -> None:
+        """Count latencies given in seconds; larger than the highest are clipped."""
+        values = np.atleast_1d(np.asarray(seconds, dtype=np.float64))
+        if not values.size:
+            return
+        micros = np.clip(
+            np.rint(values * 1e6), 0, self.highest_seconds * 1e6
+        ).astype(np.int64)
+        np.add.at(self.counts, self._index(micros), 1)
+        self.total_count += values.size
+        self.max_seconds = max(self.max_seconds, float(values.max()))
+        self._sum_seconds += float(values.sum())
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if (other.significant_figures, other.counts.size) != (
+            self.significant_figures,
+            self.counts.size,
+        ):
+            raise ValueError("Cannot merge histograms with different layouts.")
+        self.counts += other.counts
+        self.total_count += other.total_count
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self._sum_seconds += other._sum_seconds
+
+    @property
+    def mean_seconds(self) -> float:
+        return self._sum_seconds / self.total_count if self.total_count else 0.0
+
+    def value_at_percentile(self, percentile: float) -> float:
+        """The latency in seconds that `percentile` percent of values do not exceed."""
+        if not self.total_count:
+            return 0.0
+        if percentile >= 100:
+            return self.max_seconds
+        rank = max(math.ceil(percentile / 100 * self.total_count), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(float(self._value(np.array(index))) / 1e6, self.max_seconds)
+
+    def percentiles(
+        self, percentiles: t.Sequence[float] = REPORTED_PERCENTILES
+    ) -> t.Dict[str, float]:
+        return {f"p{p:g}": self.value_at_percentile(p) for p in percentiles}
+
+    def to_dict(self) -> dict:
+        """Summary and the non-empty buckets, as `[upper bound seconds, count]`."""
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            "count": self.total_count,
+            "mean": self.mean_seconds,
+            "max": self.max_seconds,
+            "percentiles": self.percentiles(),
+            "significant_figures": self.significant_figures,
+            "buckets": [
+                [float(value) / 1e6, int(count)]
+                for value, count in zip(self._value(nonzero), self.counts[nonzero])
+            ],
+        }
+
+
+def arrival_offsets(
+    *, rate: float, duration_seconds: float, arrival: str = "poisson", seed: int = 0
+) -> np.ndarray:
+    """Intended send times, in seconds from the start, for `rate` requests/s.
+
+    `poisson` draws exponential gaps (independent arrivals, as from many
+    clients), `constant` spaces requests exactly `1 / rate` apart.
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive.")
+    expected = int(math.ceil(rate * duration_seconds))
+    if arrival == "constant":
+        offsets = np.arange(expected) / rate
+    elif arrival == "poisson":
+        rng = np.random.default_rng(seed)
+        # draw with some margin, then cut at the duration
+        margin = 10 * int(math.sqrt(expected)) + 10
+        gaps = rng.exponential(1 / rate, size=expected + margin)
+        offsets = np.cumsum(gaps) - gaps[0]
+    else:
+        raise ValueError(f"arrival must be one of {ARRIVALS}, got {arrival}")
+    return offsets[offsets < duration_seconds]
+
+
+class Sender(t.Protocol):
+    """What `run_open_loop` sends requests to.
+
+    `send(i)` performs request `i` and returns its outcome, e.g. "ok" or
+    an HTTP status, and its service time: the seconds from when it got a
+    thread or connection to its response, so without any queueing.
+    `close` is awaited at the end of each run, on the same event loop.
+    """
+
+    async def send(self, index: int) -> t.Tuple[str, float]:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+class LocalSender(Sender):
+    """Calls a predictor with batches of rows, on a pool of `threads` threads.
+
+    Requests arriving while every thread is busy wait in the pool's
+    queue, as they would in a server's.
+    """
+
+    def __init__(
+        self,
+        *,
+        predictor: t.Callable[..., dict],
+        batches: t.Sequence[t.Any],
+        threads: int = 8,
+    ):
+        self.predictor = predictor
+        self.batches = batches
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+
+    def _call(self, index: int) -> t.Tuple[str, float]:
+        start = time.perf_counter()
+        results = self.predictor(input_data=self.batches[index % len(self.batches)])
+        outcome = "ok" if results["errors"] is None else "invalid"
+        return outcome, time.perf_counter() - start
+
+    async def send(self, index: int) -> t.Tuple[str, float]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._call, index
+        )
+
+    async def close(self) -> None:
+        # the pool outlives a run, see `shutdown`
+        pass
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
+
+
+class ServerSender(Sender):
+    """Posts JSON bodies to the server over keep-alive connections.
+
+    A request that finds no idle connection opens a new one, up to
+    `max_connections`, and otherwise waits for one to be released; the
+    wait is part of its latency.
+    """
+
+    def __init__(
+        self,
+        *,
+        payloads: t.Sequence[bytes],
+        host: str = config.serving_config.host,
+        port: int = config.serving_config.port,
+        path: str = "/predict",
+        max_connections: int = 256,
+    ):
+        self.requests = [
+            build_request(host=host, path=path, body=body) for body in payloads
+        ]
+        self.host, self.port = host, port
+        self.max_connections = max_connections
+        self._idle: t.List[t.Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        # created on the loop of the current run
+        self._slots: t.Optional[asyncio.Semaphore] = None
+
+    async def send(self, index: int) -> t.Tuple[str, float]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        async with self._slots:
+            if self._idle:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            start = time.perf_counter()
+            try:
+                writer.write(self.requests[index % len(self.requests)])
+                status, _ = await read_response(reader)
+            except BaseException:
+                writer.close()
+                raise
+            self._idle.append((reader, writer))
+            return str(status), time.perf_counter() - start
+
+    async def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+            await writer.wait_closed()
+        self._idle, self._slots = [], None
+
+
+async def _run_schedule(
+    *,
+    offsets: np.ndarray,
+    sender: Sender,
+    latency: LatencyHistogram,
+    service: LatencyHistogram,
+    outcomes: t.Counter[str],
+) -> t.Tuple[float, float]:
+    """Send request `i` at `offsets[i]` without waiting for earlier requests."""
+    loop = asyncio.get_running_loop()
+    max_lag = 0.0
+
+    async def fire(index: int, intended: float) -> None:
+        try:
+            outcome, service_seconds = await sender.send(index)
+            service.record(service_seconds)
+        except Exception as exc:
+            outcome = type(exc).__name__
+        # from when the request should have gone out, queueing included
+        latency.record(time.perf_counter() - intended)
+        outcomes[outcome] += 1
+
+    start = time.perf_counter()
+    tasks = []
+    for index, offset in enumerate(offsets):
+        intended = start + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        max_lag = max(max_lag, time.perf_counter() - intended)
+        tasks.append(loop.create_task(fire(index, intended)))
+    await asyncio.gather(*tasks)
+    wall_seconds = time.perf_counter() - start
+    await sender.close()
+    return wall_seconds, max_lag
+
+
+def run_open_loop(
+    *,
+    sender: Sender,
+    rate: float,
+    duration_seconds: float,
+    arrival: str = "poisson",
+    seed: int = 0,
+    significant_figures: int = 3,
+) -> dict:
+    """Send requests on a fixed arrival schedule and measure their latency.
+
+    Unlike the closed loop of `loadgen.run_load`, a slow response does not
+    delay the next request: each is sent at its scheduled time whatever
+    is still outstanding, and its latency is counted from that intended
+    time, so time spent queueing behind earlier requests is not omitted.
+    The service times reported by the sender, which leave queueing out
+    like a closed loop would, are reported next to them for comparison.
+    """
+    offsets = arrival_offsets(
+        rate=rate, duration_seconds=duration_seconds, arrival=arrival, seed=seed
+    )
+    latency = LatencyHistogram(significant_figures=significant_figures)
+    service = LatencyHistogram(significant_figures=significant_figures)
+    outcomes: t.Counter[str] = t.Counter()
+    wall_seconds, max_lag = asyncio.run(
+        _run_schedule(
+            offsets=offsets,
+            sender=sender,
+            latency=latency,
+            service=service,
+            outcomes=outcomes,
+        )
+    )
+    return {
+        "offered_rate": rate,
+        "arrival": arrival,
+        # Poisson arrivals send about, not exactly, the offered rate
+        "scheduled_rate": len(offsets) / duration_seconds,
+        "requests": latency.total_count,
+        "achieved_rate": latency.total_count / wall_seconds if wall_seconds else 0.0,
+        "wall_seconds": wall_seconds,
+        "max_send_lag_seconds": max_lag,
+        "outcomes": dict(outcomes),
+        "latency": latency.to_dict(),
+        "service_latency": service.to_dict(),
+    }
+
+
+def find_knee(
+    *,
+    results: t.Sequence[dict],
+    latency_factor: float = 5.0,
+    min_throughput: float = 0.95,
+) -> t.Optional[float]:
+    """The highest rate before the target saturates.
+
+    A rate saturates the target when it completes less than
+    `min_throughput` of the requests scheduled per second, or when its p99 latency is more
+    than `latency_factor` times the p99 at the lowest rate. Returns None
+    when even the lowest rate saturates.
+    """
+    ordered = sorted(results, key=lambda result: result["offered_rate"])
+    if not ordered:
+        return None
+    baseline = ordered[0]["latency"]["percentiles"]["p99"]
+    knee = None
+    for result in ordered:
+        p99 = result["latency"]["percentiles"]["p99"]
+        if (
+            result["achieved_rate"] < min_throughput * result["scheduled_rate"]
+            or p99 > latency_factor * baseline
+        ):
+            break
+        knee = result["offered_rate"]
+    return knee
+
+
+@contextlib.contextmanager
+def target_sender(
+    *,
+    target: str,
+    data: pd.DataFrame,
+    batch_size: int = 1,
+    n_payloads: int = 100,
+    threads: int = 8,
+    host: str = config.serving_config.host,
+    port: int = config.serving_config.port,
+) -> t.Iterator[Sender]:
+    """A sender of batches of `batch_size` rows of `data` to `target`.
+
+    `make_prediction`, `multi_model` (a `MultiModelPredictor` with two
+    copies of the current pipeline) and `daemon` (a `ScoringDaemon`,
+    started for the duration) are called on `threads` threads; `server`
+    is the prediction server at `host:port`.
+    """
+    if target == "server":
+        yield ServerSender(
+            payloads=build_payloads(
+                data=data, batch_size=batch_size, n_payloads=n_payloads
+            ),
+            host=host,
+            port=port,
+            path="/predict" if batch_size == 1 else "/predict/batch",
+        )
+        return
+
+    data = data.drop(
+        columns=[config.gradient_boosting_model_config.target], errors="ignore"
+    )
+    batches = [
+        data.take(np.arange(index * batch_size, (index + 1) * batch_size) % len(data))
+        for index in range(n_payloads)
+    ]
+    with contextlib.ExitStack() as stack:
+        predictor: t.Callable[..., dict]
+        if target == "make_prediction":
+            predictor = make_prediction
+        elif target == "multi_model":
+            pipeline = get_pipeline()
+            if pipeline is None:
+                raise ValueError("No trained pipeline to load the variants from.")
+            predictor = MultiModelPredictor(
+                pipelines={"a": pipeline, "b": pipeline}
+            ).predict
+        elif target == "daemon":
+            predictor = stack.enter_context(ScoringDaemon()).predict
+        else:
+            raise ValueError(f"target must be one of {TARGETS}, got {target}")
+        sender = LocalSender(predictor=predictor, batches=batches, threads=threads)
+        stack.callback(sender.shutdown)
+        yield sender
+
+
+def sweep(
+    *,
+    sender: Sender,
+    rates: t.Sequence[float],
+    duration_seconds: float,
+    arrival: str = "poisson",
+    seed: int = 0,
+    latency_factor: float = 5.0,
+    stop_after_knee: bool = True,
+) -> dict:
+    """Run the open loop at each of `rates` in turn and locate the knee.
+
+    With `stop_after_knee`, the sweep ends at the first saturated rate,
+    as higher rates only build longer queues.
+    """
+    results = []
+    for rate in sorted(rates):
+        result = run_open_loop(
+            sender=sender,
+            rate=rate,
+            duration_seconds=duration_seconds,
+            arrival=arrival,
+            seed=seed,
+        )
+        results.append(result)
+        _logger.info(
+            f"Offered {rate:g}/s, achieved {result['achieved_rate']:.1f}/s, "
+            f"p99 {result['latency']['percentiles']['p99'] * 1000:.1f}ms"
+        )
+        if stop_after_knee and find_knee(
+            results=results, latency_factor=latency_factor
+        ) != rate:
+            break
+    return {
+        "knee_rate": find_knee(results=results, latency_factor=latency_factor),
+        "results": results,
+    }
+
+
+def write_csv(*, results: t.Sequence[dict], file_name: str) -> None:
+    """One row per rate: throughput and latency percentiles in seconds."""
+    percentile_names = [f"p{p:g}" for p in REPORTED_PERCENTILES]
+    with open(file_name, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(
+            [
+                "offered_rate",
+                "scheduled_rate",
+                "achieved_rate",
+                "requests",
+                "mean",
+                *percentile_names,
+                *(f"service_{name}" for name in percentile_names),
+            ]
+        )
+        for result in results:
+            writer.writerow(
+                [
+                    result["offered_rate"],
+                    result["scheduled_rate"],
+                    result["achieved_rate"],
+                    result["requests"],
+                    result["latency"]["mean"],
+                    *result["latency"]["percentiles"].values(),
+                    *result["service_latency"]["percentiles"].values(),
+                ]
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Open-loop load test, sweeping the arrival rate to find the knee."
+    )
+    parser.add_argument("--target", choices=TARGETS, default="make_prediction")
+    parser.add_argument(
+        "--rates", default="5,10,20,40,80", help="comma separated requests per second"
+    )
+    parser.add_argument("--arrival", choices=ARRIVALS, default="poisson")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per rate")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--host", default=config.serving_config.host)
+    parser.add_argument("--port", type=int, default=config.serving_config.port)
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--csv", help="write one row per rate to this file")
+    args = parser.parse_args()
+
+    with target_sender(
+        target=args.target,
+        data=load_dataset(file_name=config.app_config.test_data_file),
+        batch_size=args.batch_size,
+        threads=args.threads,
+        host=args.host,
+        port=args.port,
+    ) as sender:
+        report = sweep(
+            sender=sender,
+            rates=[float(rate) for rate in args.rates.split(",")],
+            duration_seconds=args.duration,
+            arrival=args.arrival,
+        )
+    report.update(target=args.target, batch_size=args.batch_size)
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+    if args.csv:
+        write_csv(results=report["results"], file_name=args.csv)
+    print(
+        json.dumps(
+            {
+                "knee_rate": report["knee_rate"],
+                "results": [
+                    {
+                        "offered_rate": result["offered_rate"],
+                        "achieved_rate": result["achieved_rate"],
+                        **result["latency"]["percentiles"],
+                    }
+                    for result in report["results"]
+                ],
+            },
+            indent=2,
+        )
+    )
@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import typing as t
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import (
+    get_pipeline,
+    score_features,
+    validation_fields,
+)
+from gradient_boosting_model.processing.adapters import InputData, to_dataframe
+from gradient_boosting_model.processing.data_management import load_dataset
+from gradient_boosting_model.processing.validation import validate_inputs
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "manifest.json"
+TABLE_ARRAYS = ("ids", "hashes", "predictions")
+
+
+class PredictionTable:
+    """Read-only view of a materialized prediction table.
+
+    The table is a generation directory of three .npy files, the Ids in
+    ascending order and the feature hash and prediction of each, opened as
+    memory maps; lookups are binary searches over the Ids. The manifest
+    names the current generation, so a table opened before a refresh
+    keeps reading the generation it opened.
+    """
+
+    def __init__(self, *, directory: t.Union[str, Path]):
+        self.directory = Path(directory)
+        with open(self.directory / MANIFEST_FILE_NAME) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        self.version = self.manifest["version"]
+        generation = self.directory / self.manifest["generation"]
+        # empty files cannot be memory mapped
+        mmap_mode: t.Optional[t.Literal["r"]] = "r" if self.manifest["rows"] else None
+        self.ids, self.hashes, self.predictions = (
+            np.load(generation / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in TABLE_ARRAYS
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get(self, id_: int) -> t.Optional[float]:
+        """The prediction for one Id, or None if it is not in the table."""
+        position = int(np.searchsorted(self.ids, id_))
+        if position < len(self.ids) and self.ids[position] == id_:
+            return float(self.predictions[position])
+        return None
+
+    def lookup(self, ids: t.Sequence[int]) -> np.ndarray:
+        """Predictions for many Ids, NaN for those not in the table."""
+        wanted = np.asarray(ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(wanted.shape, np.nan)
+        positions = np.minimum(np.searchsorted(self.ids, wanted), len(self.ids) - 1)
+        found = self.ids[positions] == wanted
+        return np.where(found, self.predictions[positions], np.nan)
+
+
+def feature_hashes(features: pd.DataFrame) -> np.ndarray:
+    """One 64 bit hash per row, independent of integer or float column dtypes.
+
+    Numeric columns are hashed as float64, so a column read as float in
+    one snapshot (because of a missing value elsewhere) and as integer in
+    the next does not change the hash of every row.
+    """
+    numeric = features.select_dtypes(include="number").columns
+    normalized = features.astype(dict.fromkeys(numeric, np.float64))
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def _open_current(directory: Path) -> t.Optional[PredictionTable]:
+    if not (directory / MANIFEST_FILE_NAME).is_file():
+        return None
+    return PredictionTable(directory=directory)
+
+
+def refresh_prediction_table(
+    *,
+    directory: t.Union[str, Path],
+    input_data: InputData,
+    id_column: str = "Id",
+    remove_missing: bool = True,
+) -> dict:
+    """Bring the prediction table in `directory` up to date with `input_data`.
+
+    Rows are validated like in `make_prediction`; invalid rows and rows
+    dropped for missing values are left out. Each remaining row gets a
+    64 bit hash of its model features, and only rows that are new or whose
+    hash changed are scored, the others keep their stored prediction. A
+    table written by another model version is rebuilt from scratch.
+
+    With `remove_missing`, `input_data` is taken as the full inventory
+    and Ids absent from it are dropped; otherwise it is an update and
+    they are kept.
+
+    The new generation is written next to the current one and the
+    manifest is replaced atomically, before older generations are
+    deleted. Returns counts of what was scored, reused and removed.
+    """
+    start = time.perf_counter()
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    pipeline = get_pipeline()
+    if pipeline is None:
+        raise ValueError("No trained pipeline to score the inventory with.")
+
+    validated_data, errors = validate_inputs(
+        input_data=to_dataframe(input_data=input_data),
+        fields=validation_fields(extras=[id_column]),
+    )
+    if errors:
+        invalid = np.zeros(len(validated_data), dtype=bool)
+        invalid[[int(position) for position in errors]] = True
+        validated_data = validated_data[~invalid]
+    features = validated_data[config.gradient_boosting_model_config.features]
+    ids = validated_data[id_column].to_numpy(dtype=np.int64)
+    hashes = feature_hashes(features)
+
+    order = np.argsort(ids, kind="stable")
+    ids, hashes = ids[order], hashes[order]
+    if np.any(ids[1:] == ids[:-1]):
+        raise ValueError(f"Duplicate values in {id_column}.")
+
+    current = _open_current(directory)
+    rebuilt = current is None or current.version != _version
+    if current is not None and (rebuilt or not len(current)):
+        # nothing to reuse
+        current = None
+    predictions = np.empty(len(ids))
+    to_score = np.ones(len(ids), dtype=bool)
+    if current is not None:
+        positions = np.minimum(np.searchsorted(current.ids, ids), len(current) - 1)
+        unchanged = (current.ids[positions] == ids) & (
+            current.hashes[positions] == hashes
+        )
+        predictions[unchanged] = current.predictions[positions[unchanged]]
+        to_score = ~unchanged
+    if to_score.any():
+        predictions[to_score], _ = score_features(
+            pipeline=pipeline,
+            features=features.iloc[order[to_score]],
+            n_threads=None,
+            chunk_rows=None,
+        )
+
+    removed = 0
+    if current is not None:
+        missing = ~np.isin(current.ids, ids)
+        if remove_missing:
+            removed = int(missing.sum())
+        elif missing.any():
+            ids = np.concatenate([ids, current.ids[missing]])
+            hashes = np.concatenate([hashes, current.hashes[missing]])
+            predictions = np.concatenate([predictions, current.predictions[missing]])
+            merged = np.argsort(ids, kind="stable")
+            ids, hashes, predictions = ids[merged], hashes[merged], predictions[merged]
+
+    generation = f"generation-{time.time_ns()}"
+    (directory / generation).mkdir()
+    for name, values in zip(TABLE_ARRAYS, (ids, hashes, predictions)):
+        np.save(directory / generation / f"{name}.npy", values)
+    manifest = {
+        "version": _version,
+        "generation": generation,
+        "rows": len(ids),
+        "refreshed_at": time.time(),
+    }
+    with open(directory / f"{MANIFEST_FILE_NAME}.tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(
+        directory / f"{MANIFEST_FILE_NAME}.tmp", directory / MANIFEST_FILE_NAME
+    )
+    # open memory maps keep reading the unlinked files
+    for old in directory.glob("generation-*"):
+        if old.name != generation:
+            shutil.rmtree(old)
+
+    report = {
+        "version": _version,
+        "rows": len(ids),
+        "scored": int(to_score.sum()),
+        "reused": int((~to_score).sum()),
+        "removed": removed,
+        "invalid_rows": len(errors) if errors else 0,
+        "rebuilt": rebuilt,
+        "seconds": time.perf_counter() - start,
+    }
+    _logger.info(f"Refreshed prediction table: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Refresh the materialized prediction table from an inventory file."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--data", default=config.app_config.test_data_file)
+    parser.add_argument("--update", action="store_true", help="keep Ids not in --data")
+    args = parser.parse_args()
+
+    report = refresh_prediction_table(
+        directory=args.directory,
+        input_data=load_dataset(file_name=args.data),
+        remove_missing=not args.update,
+    )
+    print(json.dumps(report, indent=2))
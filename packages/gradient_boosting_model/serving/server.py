@@ -0,0 +1,346 @@
+import asyncio
+import collections
+import functools
+import json
+import os
+import signal
+import socket
+import time
+import typing as t
+
+from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.serving.shm_daemon import ScoringDaemon
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# request line and headers; longer heads get 431
+MAX_HEAD_BYTES = 16384
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+JSON_TYPE = "application/json"
+METRICS_TYPE = "text/plain; version=0.0.4"
+
+
+def _dumps(payload: t.Any) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+class ServerMetrics:
+    """Request counters of one worker process, in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self.requests: t.Counter[t.Tuple[str, int]] = collections.Counter()
+        self.seconds: t.DefaultDict[str, float] = collections.defaultdict(float)
+        self.rows_scored = 0
+
+    def observe(self, *, route: str, status: int, seconds: float, rows: int) -> None:
+        self.requests[route, status] += 1
+        self.seconds[route] += seconds
+        self.rows_scored += rows
+
+    def render(self) -> bytes:
+        lines = [
+            "# TYPE gb_requests_total counter",
+            *(
+                f'gb_requests_total{{route="{route}",status="{status}"}} {count}'
+                for (route, status), count in sorted(self.requests.items())
+            ),
+            "# TYPE gb_request_seconds_total counter",
+            *(
+                f'gb_request_seconds_total{{route="{route}"}} {seconds}'
+                for route, seconds in sorted(self.seconds.items())
+            ),
+            "# TYPE gb_rows_scored_total counter",
+            f"gb_rows_scored_total {self.rows_scored}",
+            "# TYPE gb_worker_info gauge",
+            f'gb_worker_info{{pid="{os.getpid()}",version="{_version}"}} 1',
+        ]
+        return ("\n".join(lines) + "\n").encode()
+
+
+def _prediction_payload(*, route: str, results: dict) -> t.Tuple[int, dict, int]:
+    """The status, body and number of predictions answering `results`.
+
+    Rows dropped for a missing value (`dropped_rows` in the metadata) get
+    a null prediction in `/predict/batch`, so the predictions line up
+    with the input rows; a dropped `/predict` record gets 422.
+    """
+    version = results["version"]
+    if results["errors"]:
+        return 400, {"version": version, "errors": results["errors"]}, 0
+    if results["predictions"] is None:
+        raise RuntimeError("No model pipeline is loaded.")
+    dropped = results.get("metadata", {}).get("dropped_rows", [])
+    kept = results["predictions"].tolist()
+    if route == "/predict":
+        if dropped:
+            errors = {"0": {"_schema": ["Missing value not allowed."]}}
+            return 422, {"version": version, "errors": errors}, 0
+        return 200, {"version": version, "prediction": kept[0]}, 1
+    predictions: t.List[t.Optional[float]] = kept
+    if dropped:
+        predictions = [None] * (len(kept) + len(dropped))
+        dropped_set = set(dropped)
+        positions = [i for i in range(len(predictions)) if i not in dropped_set]
+        for position, prediction in zip(positions, kept):
+            predictions[position] = prediction
+    return 200, {"version": version, "predictions": predictions}, len(kept)
+
+
+class PredictionServer:
+    """HTTP/1.1 front end for `make_prediction`, on asyncio streams.
+
+    Connections are kept alive unless the client asks otherwise or stays
+    idle for `keep_alive_seconds`. Bodies must come with a Content-Length
+    of at most `max_request_bytes`; larger ones are refused with 413
+    before they are read. Scoring runs on the loop's default executor, so
+    `/health` and `/metrics` stay responsive during a large batch.
+
+    `predictor` scores the requests, `make_prediction` by default; a
+    `ScoringDaemon.predict` sends them to a shared scoring process
+    instead, and a `TimeoutError` from it (all its slots busy) gets 503.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_request_bytes: int = config.serving_config.max_request_bytes,
+        keep_alive_seconds: float = config.serving_config.keep_alive_seconds,
+        predictor: t.Callable[..., dict] = make_prediction,
+    ):
+        self.max_request_bytes = max_request_bytes
+        self.keep_alive_seconds = keep_alive_seconds
+        self.predictor = predictor
+        self.metrics = ServerMetrics()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while await self._handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> bool:
+        """Serve one request and return whether the connection stays open."""
+        try:
+            head = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), timeout=self.keep_alive_seconds
+            )
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return False
+        except asyncio.LimitOverrunError:
+            await self._respond(writer, 431, _dumps({"error": "Headers too large"}))
+            return False
+
+        try:
+            request_line, *header_lines = head[:-4].decode("latin-1").split("\r\n")
+            method, target, http_version = request_line.split(" ")
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            await self._respond(writer, 400, _dumps({"error": "Malformed request"}))
+            return False
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = (
+            connection != "close"
+            if http_version == "HTTP/1.1"
+            else connection == "keep-alive"
+        )
+        if "transfer-encoding" in headers:
+            await self._respond(writer, 411, _dumps({"error": "Send Content-Length"}))
+            return False
+        if length < 0:
+            await self._respond(writer, 400, _dumps({"error": "Malformed request"}))
+            return False
+        if length > self.max_request_bytes:
+            await self._respond(
+                writer,
+                413,
+                _dumps({"error": f"Body exceeds {self.max_request_bytes} bytes"}),
+            )
+            return False
+
+        body = await reader.readexactly(length)
+        route = target.split("?", 1)[0]
+        start = time.perf_counter()
+        status, payload, content_type, rows = await self._dispatch(method, route, body)
+        self.metrics.observe(
+            route=route if status != 404 else "other",
+            status=status,
+            seconds=time.perf_counter() - start,
+            rows=rows,
+        )
+        await self._respond(writer, status, payload, content_type, keep_alive)
+        return keep_alive
+
+    async def _dispatch(
+        self, method: str, route: str, body: bytes
+    ) -> t.Tuple[int, bytes, str, int]:
+        if route == "/health":
+            if method != "GET":
+                return 405, _dumps({"error": "Use GET"}), JSON_TYPE, 0
+            return 200, _dumps({"status": "ok", "version": _version}), JSON_TYPE, 0
+        if route == "/metrics":
+            if method != "GET":
+                return 405, _dumps({"error": "Use GET"}), JSON_TYPE, 0
+            return 200, self.metrics.render(), METRICS_TYPE, 0
+        if route not in ("/predict", "/predict/batch"):
+            return 404, _dumps({"error": f"No route {route}"}), JSON_TYPE, 0
+        if method != "POST":
+            return 405, _dumps({"error": "Use POST"}), JSON_TYPE, 0
+
+        try:
+            input_data = json.loads(body)
+        except ValueError:
+            return 400, _dumps({"error": "Body is not valid JSON"}), JSON_TYPE, 0
+        if not isinstance(input_data, dict):
+            return 400, _dumps({"error": "Body must be a JSON object"}), JSON_TYPE, 0
+        if route == "/predict":
+            # one record, as columns of length one
+            input_data = {name: [value] for name, value in input_data.items()}
+        elif not all(isinstance(values, list) for values in input_data.values()):
+            return 400, _dumps({"error": "Columns must be JSON arrays"}), JSON_TYPE, 0
+
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                None, functools.partial(self.predictor, input_data=input_data)
+            )
+            status, payload, rows = _prediction_payload(route=route, results=results)
+        except TimeoutError as exc:
+            return 503, _dumps({"error": str(exc)}), JSON_TYPE, 0
+        except Exception as exc:
+            _logger.exception("Prediction failed")
+            return 500, _dumps({"error": str(exc)}), JSON_TYPE, 0
+        return status, _dumps(payload), JSON_TYPE, rows
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: bytes,
+        content_type: str = JSON_TYPE,
+        keep_alive: bool = False,
+    ) -> None:
+        head = (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + payload)
+        await writer.drain()
+
+
+async def start_server(
+    *,
+    sock: t.Optional[socket.socket] = None,
+    host: str = config.serving_config.host,
+    port: int = config.serving_config.port,
+    prediction_server: t.Optional[PredictionServer] = None,
+) -> asyncio.AbstractServer:
+    """Start serving on `sock`, or on a new socket bound to `host`/`port`."""
+    prediction_server = prediction_server or PredictionServer()
+    if sock is not None:
+        return await asyncio.start_server(
+            prediction_server.handle_connection, sock=sock, limit=MAX_HEAD_BYTES
+        )
+    return await asyncio.start_server(
+        prediction_server.handle_connection, host, port, limit=MAX_HEAD_BYTES
+    )
+
+
+async def _serve_forever(
+    sock: socket.socket, prediction_server: t.Optional[PredictionServer] = None
+) -> None:
+    server = await start_server(sock=sock, prediction_server=prediction_server)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(
+    *,
+    host: str = config.serving_config.host,
+    port: int = config.serving_config.port,
+    workers: int = config.serving_config.serving_workers,
+    scoring_daemon: bool = config.serving_config.scoring_daemon,
+) -> None:
+    """Serve predictions until interrupted.
+
+    The listening socket is bound and the model loaded (on import of
+    `predict`) before `workers` processes are forked, so they share the
+    socket and the model's memory pages. With `scoring_daemon`, the
+    workers only parse and validate requests, and a single `ScoringDaemon`
+    process started before them does all the scoring.
+    """
+    sock = socket.create_server((host, port), backlog=1024)
+    _logger.warning(f"Serving model version {_version} on {host}:{port}")
+    daemon = ScoringDaemon().start() if scoring_daemon else None
+    prediction_server = (
+        PredictionServer(predictor=daemon.predict) if daemon is not None else None
+    )
+    try:
+        _serve_workers(sock=sock, workers=workers, prediction_server=prediction_server)
+    finally:
+        if daemon is not None:
+            daemon.close()
+
+
+def _serve_workers(
+    *,
+    sock: socket.socket,
+    workers: int,
+    prediction_server: t.Optional[PredictionServer],
+) -> None:
+    if workers <= 1:
+        asyncio.run(_serve_forever(sock, prediction_server))
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                asyncio.run(_serve_forever(sock, prediction_server))
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(signum: int, frame: t.Any) -> None:
+        for child in children:
+            os.kill(child, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+if __name__ == "__main__":
+    serve()
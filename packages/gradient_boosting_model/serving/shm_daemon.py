@@ -0,0 +1,318 @@
+import multiprocessing
+import typing as t
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import (
+    get_pipeline,
+    score_features,
+    validation_fields,
+)
+from gradient_boosting_model.processing.adapters import InputData, to_dataframe
+from gradient_boosting_model.processing.dedup import find_unique_rows
+from gradient_boosting_model.processing.dtypes import downcast_dtypes
+from gradient_boosting_model.processing.validation import dropped_rows, validate_inputs
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# slot states
+FREE, CLAIMED, SUBMITTED, DONE, FAILED, ABANDONED = range(6)
+
+
+def record_dtype(*, string_length: int) -> np.dtype:
+    """Fixed-size record of the model features: strings for categorical, else float."""
+    model_config = config.gradient_boosting_model_config
+    categorical_vars = model_config.categorical_vars
+    if isinstance(categorical_vars, str):
+        categorical_vars = [categorical_vars]
+    return np.dtype(
+        [
+            (var, f"U{string_length}" if var in categorical_vars else np.float64)
+            for var in model_config.features
+        ]
+    )
+
+
+class ScoringDaemon:
+    """One scoring process fed by other processes through shared memory.
+
+    The daemon owns a ring of `n_slots` slots in a `SharedMemory` block,
+    each holding up to `slot_rows` fixed-size feature records and as many
+    float64 predictions. `start` forks the scoring process; processes
+    forked after that (e.g. the server's front-end workers) inherit the
+    block and its semaphores and call `predict`, which validates the input
+    like `make_prediction`, writes the features straight into a free slot
+    and waits for the predictions to be written back into it. The scoring
+    process drains every submitted slot at once and scores them with the
+    same `score_features` and pipeline as `make_prediction`. Missing
+    categorical values travel as a separate null mask, so an empty
+    string stays a category, and `compact_dtypes` and `dedup_rows` in the
+    scoring config apply as in `make_prediction` (duplicate rows are
+    collapsed before they are written to a slot).
+
+    When every slot is busy, `predict` blocks for up to `timeout_seconds`
+    and then raises `TimeoutError`, so callers can shed load. Settings
+    left as None are read from the serving config.
+    """
+
+    def __init__(
+        self,
+        *,
+        n_slots: t.Optional[int] = None,
+        slot_rows: t.Optional[int] = None,
+        string_length: t.Optional[int] = None,
+        timeout_seconds: t.Optional[float] = None,
+    ):
+        serving_config = config.serving_config
+        if n_slots is None:
+            n_slots = serving_config.daemon_slots
+        if slot_rows is None:
+            slot_rows = serving_config.daemon_slot_rows
+        if string_length is None:
+            string_length = serving_config.daemon_string_length
+        if timeout_seconds is None:
+            timeout_seconds = serving_config.daemon_timeout_seconds
+        self.n_slots = n_slots
+        self.slot_rows = slot_rows
+        self.timeout_seconds = timeout_seconds
+        self.record_dtype = record_dtype(string_length=string_length)
+        self.string_length = string_length
+        self._string_vars = [
+            var
+            for var in self.record_dtype.names or ()
+            if self.record_dtype[var].kind == "U"
+        ]
+
+        layout = [
+            ("requests", self.record_dtype, (n_slots, slot_rows)),
+            # missing categorical values, one flag per string field
+            ("nulls", np.dtype(bool), (n_slots, slot_rows, len(self._string_vars))),
+            ("predictions", np.dtype(np.float64), (n_slots, slot_rows)),
+            ("state", np.dtype(np.int64), (n_slots,)),
+            ("n_rows", np.dtype(np.int64), (n_slots,)),
+            ("stages", np.dtype(np.int64), (n_slots,)),
+            ("queue", np.dtype(np.int64), (n_slots,)),
+            # submitted and scored slot counts, the tail and head of the queue
+            ("cursor", np.dtype(np.int64), (2,)),
+        ]
+        sizes = [dtype.itemsize * int(np.prod(shape)) for _, dtype, shape in layout]
+        self._shm = shared_memory.SharedMemory(create=True, size=sum(sizes))
+        self._arrays: t.Dict[str, np.ndarray] = {}
+        offset = 0
+        for (name, dtype, shape), size in zip(layout, sizes):
+            self._arrays[name] = np.ndarray(
+                shape, dtype=dtype, buffer=self._shm.buf, offset=offset
+            )
+            offset += size
+        self._arrays["state"][:] = FREE
+        self._arrays["cursor"][:] = 0
+
+        context = multiprocessing.get_context("fork")
+        self._context = context
+        self._lock = context.Lock()
+        self._free = context.Semaphore(n_slots)
+        self._pending = context.Semaphore(0)
+        self._done = [context.Semaphore(0) for _ in range(n_slots)]
+        self._stop = context.Event()
+        self._process: t.Optional[multiprocessing.process.BaseProcess] = None
+
+    def start(self) -> "ScoringDaemon":
+        """Fork the scoring process."""
+        self._process = self._context.Process(
+            target=self._serve, name="scoring-daemon", daemon=True
+        )
+        self._process.start()
+        _logger.info(f"Started scoring daemon with {self.n_slots} slots.")
+        return self
+
+    def close(self) -> None:
+        """Stop the scoring process and release the shared memory."""
+        self._stop.set()
+        if self._process is not None:
+            self._process.join(timeout=self.timeout_seconds)
+            self._process = None
+        self._arrays = {}
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "ScoringDaemon":
+        return self.start()
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.close()
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            if not self._pending.acquire(timeout=0.1):
+                continue
+            batch = [self._pop()]
+            while len(batch) < self.n_slots and self._pending.acquire(block=False):
+                batch.append(self._pop())
+            self._score(batch)
+
+    def _pop(self) -> int:
+        with self._lock:
+            cursor = self._arrays["cursor"]
+            slot = int(self._arrays["queue"][cursor[1] % self.n_slots])
+            cursor[1] += 1
+        return slot
+
+    def _score(self, slots: t.List[int]) -> None:
+        requests, n_rows = self._arrays["requests"], self._arrays["n_rows"]
+        nulls = self._arrays["nulls"]
+        if len(slots) == 1:
+            # the features are read in place from the shared block
+            records = requests[slots[0], : n_rows[slots[0]]]
+            null_mask = nulls[slots[0], : n_rows[slots[0]]]
+        else:
+            records = np.concatenate(
+                [requests[slot, : n_rows[slot]] for slot in slots]
+            )
+            null_mask = np.concatenate([nulls[slot, : n_rows[slot]] for slot in slots])
+        state = FAILED
+        try:
+            features = to_dataframe(input_data=records)
+            for position, var in enumerate(self._string_vars):
+                if null_mask[:, position].any():
+                    features[var] = features[var].where(~null_mask[:, position])
+            predictions, stages = score_features(
+                pipeline=get_pipeline(),
+                features=features,
+                n_threads=None,
+                chunk_rows=None,
+            )
+            offset = 0
+            for slot in slots:
+                rows = int(n_rows[slot])
+                self._arrays["predictions"][slot, :rows] = predictions[
+                    offset:offset + rows
+                ]
+                self._arrays["stages"][slot] = stages
+                offset += rows
+            state = DONE
+        except Exception:
+            _logger.exception("Scoring daemon failed to score a batch")
+
+        with self._lock:
+            for slot in slots:
+                if self._arrays["state"][slot] == ABANDONED:
+                    # nobody is waiting, recycle the slot
+                    self._arrays["state"][slot] = FREE
+                    self._free.release()
+                else:
+                    self._arrays["state"][slot] = state
+                    self._done[slot].release()
+
+    def _columns(self, features: pd.DataFrame) -> t.Dict[str, np.ndarray]:
+        """The feature columns as arrays of the record field types.
+
+        Missing categorical values are written as empty strings and
+        flagged in the `nulls` column.
+        """
+        columns = {}
+        columns["nulls"] = features[self._string_vars].isna().to_numpy()
+        for var in self.record_dtype.names or ():
+            if var in self._string_vars:
+                values = features[var].astype(object).where(features[var].notna(), "")
+                strings = values.to_numpy(dtype=str)
+                if strings.size and np.char.str_len(strings).max() > self.string_length:
+                    raise ValueError(
+                        f"Values of {var} exceed {self.string_length} characters."
+                    )
+                columns[var] = strings
+            else:
+                columns[var] = features[var].to_numpy(dtype=np.float64)
+        return columns
+
+    def _submit(
+        self, *, columns: t.Dict[str, np.ndarray], rows: slice, out: np.ndarray
+    ) -> int:
+        """Score `rows` of `columns` in one slot into `out`, return the stages used."""
+        if not self._free.acquire(timeout=self.timeout_seconds):
+            raise TimeoutError("All scoring daemon slots are busy.")
+        state = self._arrays["state"]
+        with self._lock:
+            slot = int(np.flatnonzero(state == FREE)[0])
+            state[slot] = CLAIMED
+        n_rows = len(out)
+        # the only copy of the features, straight into the shared block
+        records = self._arrays["requests"][slot, :n_rows]
+        for var, values in columns.items():
+            if var == "nulls":
+                self._arrays["nulls"][slot, :n_rows] = values[rows]
+            else:
+                records[var] = values[rows]
+        self._arrays["n_rows"][slot] = n_rows
+        with self._lock:
+            cursor = self._arrays["cursor"]
+            self._arrays["queue"][cursor[0] % self.n_slots] = slot
+            cursor[0] += 1
+            state[slot] = SUBMITTED
+        self._pending.release()
+
+        if not self._done[slot].acquire(timeout=self.timeout_seconds):
+            with self._lock:
+                abandoned = state[slot] == SUBMITTED
+                if abandoned:
+                    state[slot] = ABANDONED
+            if abandoned:
+                raise TimeoutError("The scoring daemon did not answer in time.")
+            # answered in the meantime
+            self._done[slot].acquire()
+
+        try:
+            if state[slot] == FAILED:
+                raise RuntimeError("The scoring daemon failed to score the batch.")
+            out[:] = self._arrays["predictions"][slot, :n_rows]
+            return int(self._arrays["stages"][slot])
+        finally:
+            with self._lock:
+                state[slot] = FREE
+            self._free.release()
+
+    def predict(self, *, input_data: InputData) -> dict:
+        """Validate and score a batch in the daemon, like `make_prediction`.
+
+        Batches larger than a slot are submitted one slot at a time.
+        """
+        data = to_dataframe(input_data=input_data)
+        validated_data, errors = validate_inputs(
+            input_data=data, fields=validation_fields()
+        )
+        results: t.Dict[str, t.Any] = {
+            "predictions": None,
+            "version": _version,
+            "errors": errors,
+            "metadata": {},
+        }
+        if errors:
+            return results
+        dropped = dropped_rows(input_data=data, validated_data=validated_data)
+        if dropped:
+            results["metadata"]["dropped_rows"] = dropped
+
+        features = validated_data[config.gradient_boosting_model_config.features]
+        if config.scoring_config.compact_dtypes:
+            features = downcast_dtypes(dataframe=features)
+        inverse = None
+        if config.scoring_config.dedup_rows and len(features) > 1:
+            unique_positions, inverse = find_unique_rows(dataframe=features)
+            results["metadata"]["dedup"] = {
+                "rows": len(features),
+                "unique_rows": len(unique_positions),
+            }
+            features = features.iloc[unique_positions]
+        columns = self._columns(features)
+        predictions, stages = np.empty(len(features)), 0
+        for start in range(0, len(predictions), self.slot_rows):
+            rows = slice(start, start + self.slot_rows)
+            stages = self._submit(columns=columns, rows=rows, out=predictions[rows])
+        results["predictions"] = predictions if inverse is None else predictions[inverse]
+        results["metadata"]["stages_used"] = stages
+        return results
@@ -0,0 +1,269 @@
+import argparse
+import typing as t
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import special
+
+from gradient_boosting_model.config.core import config, DATASET_DIR
+from gradient_boosting_model.predict import validation_fields
+from gradient_boosting_model.processing.columnar import (
+    read_columnar_chunks,
+    write_columnar_chunk,
+)
+from gradient_boosting_model.processing.validation import HouseDataInputSchema
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# resolution of the inverse ECDF kept for each numeric column
+QUANTILE_POINTS = 1024
+# what invalid rows get in one of their numeric fields
+INVALID_VALUE = "not a number"
+CHUNK_FILE_PATTERN = "part-{:05d}.npz"
+
+
+def _nearest_correlation(matrix: np.ndarray, min_eigenvalue: float = 1e-6) -> np.ndarray:
+    """Clip negative eigenvalues so pairwise estimates form a valid correlation."""
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    eigenvalues = np.clip(eigenvalues, min_eigenvalue, None)
+    fixed = (eigenvectors * eigenvalues) @ eigenvectors.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+
+class SyntheticDataGenerator:
+    """Generate rows that look like a reference dataset, at any scale.
+
+    A Gaussian copula is fitted to the reference: every column keeps its
+    own marginal (an inverse ECDF for numbers, category frequencies for
+    strings) and its null rate, while the correlations between columns
+    are those of their normal scores. Rows are produced in chunks, so
+    memory stays bounded by `chunk_rows` however many rows are requested,
+    and every chunk is seeded from `(seed, chunk index)`, so output is
+    reproducible.
+    """
+
+    def __init__(
+        self,
+        *,
+        data: pd.DataFrame,
+        id_column: str = "Id",
+        quantile_points: int = QUANTILE_POINTS,
+        fields: t.Optional[t.Sequence[str]] = None,
+    ):
+        self.id_column = id_column
+        self.columns = [column for column in data.columns if column != id_column]
+        self.null_rates = data[self.columns].isnull().mean().to_numpy()
+        self._quantiles: t.Dict[str, np.ndarray] = {}
+        self._categories: t.Dict[str, t.Tuple[np.ndarray, np.ndarray]] = {}
+        self.integer_columns: t.List[str] = []
+
+        probabilities = (np.arange(quantile_points) + 0.5) / quantile_points
+        scores = {}
+        for column in self.columns:
+            values = data[column].dropna()
+            if pd.api.types.is_numeric_dtype(data[column]):
+                numbers = values.to_numpy(dtype=np.float64)
+                self._quantiles[column] = (
+                    np.quantile(numbers, probabilities, method="inverted_cdf")
+                    if numbers.size
+                    else np.full(quantile_points, np.nan)
+                )
+                if np.all(np.mod(numbers, 1) == 0):
+                    self.integer_columns.append(column)
+                uniforms = (values.rank(method="average") - 0.5) / len(values)
+            else:
+                frequencies = values.value_counts(normalize=True)
+                cumulative = frequencies.cumsum().to_numpy()
+                if cumulative.size:
+                    cumulative[-1] = 1.0
+                self._categories[column] = (
+                    frequencies.index.to_numpy(dtype=str),
+                    cumulative,
+                )
+                midpoints = cumulative - frequencies.to_numpy() / 2
+                uniforms = values.map(dict(zip(frequencies.index, midpoints)))
+            scores[column] = special.ndtri(uniforms.astype(np.float64))
+
+        # pairwise over non-null values; constant columns are uncorrelated
+        correlation = pd.DataFrame(scores, index=data.index).corr().to_numpy()
+        correlation = np.nan_to_num(correlation)
+        np.fill_diagonal(correlation, 1.0)
+        self._cholesky = np.linalg.cholesky(_nearest_correlation(correlation))
+
+        if fields is None:
+            # what make_prediction validates, the whole schema in strict mode
+            fields = validation_fields() or list(HouseDataInputSchema().fields)
+        renames = config.gradient_boosting_model_config.variables_to_rename
+        # a string in one of these makes a row fail validation
+        self.invalid_columns = [
+            column
+            for column in self._quantiles
+            if renames.get(column, column) in fields
+        ]
+
+    @classmethod
+    def from_csv(cls, *, file_name: str = config.app_config.training_data_file):
+        """Fit to a CSV in the datasets dir, keeping its column names."""
+        return cls(data=pd.read_csv(Path(DATASET_DIR) / file_name))
+
+    def generate(
+        self,
+        *,
+        n_rows: int,
+        seed: int = 0,
+        chunk_rows: int = 100000,
+        drift: t.Optional[t.Mapping[str, float]] = None,
+        invalid_rate: float = 0.0,
+    ) -> t.Iterator[pd.DataFrame]:
+        """Yield DataFrames of at most `chunk_rows` rows, `n_rows` in total.
+
+        `drift` shifts the latent normal of the named columns by that many
+        standard deviations: numeric columns move along their quantiles,
+        string columns towards their rarer categories; the other columns
+        keep their marginals.
+        `invalid_rate` is the fraction of rows that get `INVALID_VALUE` in
+        one of the numeric fields validated by `make_prediction` (or in
+        `fields`, if given when fitting), so they come back in its errors.
+        """
+        drift = drift or {}
+        unknown = set(drift) - set(self.columns)
+        if unknown:
+            raise ValueError(f"Cannot drift unknown columns: {sorted(unknown)}")
+        shifts = np.array([drift.get(column, 0.0) for column in self.columns])
+
+        for chunk_index, start in enumerate(range(0, n_rows, chunk_rows)):
+            rng = np.random.default_rng([seed, chunk_index])
+            yield self._generate_chunk(
+                rng=rng,
+                first_id=start + 1,
+                size=min(chunk_rows, n_rows - start),
+                shifts=shifts,
+                invalid_rate=invalid_rate,
+            )
+
+    def _generate_chunk(
+        self,
+        *,
+        rng: np.random.Generator,
+        first_id: int,
+        size: int,
+        shifts: np.ndarray,
+        invalid_rate: float,
+    ) -> pd.DataFrame:
+        latent = rng.standard_normal((size, len(self.columns))) @ self._cholesky.T
+        uniforms = special.ndtr(latent + shifts)
+        is_null = rng.random((size, len(self.columns))) < self.null_rates
+
+        columns: t.Dict[str, np.ndarray] = {
+            self.id_column: np.arange(first_id, first_id + size, dtype=np.int64)
+        }
+        for position, column in enumerate(self.columns):
+            column_uniforms, column_nulls = uniforms[:, position], is_null[:, position]
+            if column in self._quantiles:
+                grid = self._quantiles[column]
+                index = (column_uniforms * grid.size).astype(np.intp)
+                values = grid[np.minimum(index, grid.size - 1)]
+                values[column_nulls] = np.nan
+            else:
+                categories, cumulative = self._categories[column]
+                index = np.searchsorted(cumulative, column_uniforms, side="right")
+                values = categories[np.minimum(index, categories.size - 1)]
+                values = values.astype(object)
+                values[column_nulls] = np.nan
+            columns[column] = values
+
+        if invalid_rate > 0 and self.invalid_columns:
+            rows = np.flatnonzero(rng.random(size) < invalid_rate)
+            targets = rng.choice(self.invalid_columns, size=rows.size)
+            for column in np.unique(targets):
+                columns[column] = columns[column].astype(object)
+                columns[column][rows[targets == column]] = INVALID_VALUE
+
+        return pd.DataFrame(columns, copy=False)
+
+    def to_csv(self, *, path: t.Union[str, Path], **generate_kwargs: t.Any) -> None:
+        """Stream generated rows to one CSV file, formatted like the reference."""
+        for chunk_index, chunk in enumerate(self.generate(**generate_kwargs)):
+            chunk = chunk.astype(
+                {
+                    column: "Int64"
+                    for column in self.integer_columns
+                    # holding INVALID_VALUE
+                    if chunk[column].dtype != object
+                }
+            )
+            chunk.to_csv(
+                path,
+                mode="a" if chunk_index else "w",
+                header=not chunk_index,
+                index=False,
+            )
+
+    def to_npz(self, *, path: t.Union[str, Path], **generate_kwargs: t.Any) -> None:
+        """Stream generated rows to a directory of columnar `.npz` chunks.
+
+        See `write_columnar_chunk` for the layout; read them back with
+        `read_npz`.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for chunk_index, chunk in enumerate(self.generate(**generate_kwargs)):
+            write_columnar_chunk(
+                path=path / CHUNK_FILE_PATTERN.format(chunk_index),
+                dataframe=chunk,
+                compress=False,
+            )
+
+
+def read_npz(path: t.Union[str, Path]) -> t.Iterator[pd.DataFrame]:
+    """Yield the chunks written by `SyntheticDataGenerator.to_npz` in order."""
+    return read_columnar_chunks(path, pattern="part-*.npz")
+
+
+def _parse_drift(items: t.Sequence[str]) -> t.Dict[str, float]:
+    drift = {}
+    for item in items:
+        column, _, shift = item.partition("=")
+        drift[column] = float(shift)
+    return drift
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stream synthetic house price rows fitted to the training data."
+    )
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--format", choices=["csv", "npz"], default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--reference",
+        default=config.app_config.training_data_file,
+        help="dataset to fit, e.g. the test data for rows without SalePrice",
+    )
+    parser.add_argument("--chunk-rows", type=int, default=100000)
+    parser.add_argument(
+        "--drift",
+        nargs="*",
+        default=[],
+        metavar="COLUMN=SHIFT",
+        help="latent shift in standard deviations, e.g. GrLivArea=0.5",
+    )
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator.from_csv(file_name=args.reference)
+    write = generator.to_csv if args.format == "csv" else generator.to_npz
+    write(
+        path=args.output,
+        n_rows=args.rows,
+        seed=args.seed,
+        chunk_rows=args.chunk_rows,
+        drift=_parse_drift(args.drift),
+        invalid_rate=args.invalid_rate,
+    )
+    _logger.warning(f"Wrote {args.rows} synthetic rows to: {args.output}")
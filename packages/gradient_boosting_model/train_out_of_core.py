@@ -0,0 +1,134 @@
+import argparse
+import json
+import tempfile
+import typing as t
+from pathlib import Path
+
+from sklearn.ensemble import GradientBoostingRegressor
+
+from gradient_boosting_model import __version__ as _version
+from gradient_boosting_model.config.core import config, TRAINED_MODEL_DIR
+from gradient_boosting_model.processing.out_of_core import (
+    StreamingPreprocessor,
+    fit_binned_booster,
+    read_training_chunks,
+    write_binned_dataset,
+)
+from gradient_boosting_model.processing.profiling import RunProfiler
+from gradient_boosting_model.processing.scoring_bundle import write_bundle
+
+import logging
+
+
+_logger = logging.getLogger(__name__)
+
+
+def run_out_of_core_training(
+    *,
+    file_name: str = config.app_config.training_data_file,
+    bundle_dir: t.Optional[Path] = None,
+    work_dir: t.Optional[Path] = None,
+    chunk_rows: int = config.gradient_boosting_model_config.out_of_core_chunk_rows,
+) -> dict:
+    """Train a scoring bundle without loading the training data into memory.
+
+    The data is read twice, `chunk_rows` rows at a time: once to fit the
+    preprocessing statistics and bin thresholds, and once to write the
+    binned features and target to memory-mapped files in `work_dir` (a
+    temporary directory by default), from which the booster is trained.
+    The trees use the depth and learning rate of the price pipeline's
+    model, with least squares loss only. The result is written as a
+    NumPy-only scoring bundle, to be loaded with `bundle_scorer.load`.
+
+    Returns a run report with the timings and peak memory of each phase.
+    """
+    model_config = config.gradient_boosting_model_config
+    if model_config.loss != "squared_error":
+        raise ValueError(
+            f"Out-of-core training only supports squared_error, not {model_config.loss}."
+        )
+    if bundle_dir is None:
+        bundle_dir = TRAINED_MODEL_DIR / (
+            f"{config.app_config.pipeline_save_file}{_version}_out_of_core_bundle"
+        )
+    defaults = GradientBoostingRegressor()
+
+    with RunProfiler() as profiler:
+        with tempfile.TemporaryDirectory() as temporary_dir:
+            directory = Path(work_dir or temporary_dir)
+            directory.mkdir(parents=True, exist_ok=True)
+
+            with profiler.measure("fit_preprocessing"):
+                preprocessor = StreamingPreprocessor(model_config=model_config)
+                for chunk in read_training_chunks(
+                    file_name=file_name, chunk_rows=chunk_rows
+                ):
+                    preprocessor.update(chunk)
+                preprocessor.finalize(max_bins=model_config.max_bins)
+
+            with profiler.measure("write_binned_dataset"):
+                bins, target = write_binned_dataset(
+                    chunks=read_training_chunks(
+                        file_name=file_name, chunk_rows=chunk_rows
+                    ),
+                    preprocessor=preprocessor,
+                    directory=directory,
+                )
+
+            with profiler.measure("fit_booster"):
+                tree_arrays = fit_binned_booster(
+                    bins=bins,
+                    target=target,
+                    thresholds=preprocessor.thresholds,
+                    work_dir=directory,
+                    n_estimators=model_config.n_estimators,
+                    learning_rate=defaults.learning_rate,
+                    max_depth=defaults.max_depth,
+                    min_samples_leaf=defaults.min_samples_leaf,
+                    chunk_rows=chunk_rows,
+                )
+            binned_bytes = bins.nbytes
+            del bins, target
+
+        with profiler.measure("save_bundle"):
+            write_bundle(
+                arrays={**preprocessor.to_arrays(), **tree_arrays}, bundle_dir=bundle_dir
+            )
+
+    report = {
+        "version": _version,
+        "rows": preprocessor.n_rows,
+        "binned_bytes": binned_bytes,
+        "bins": [thresholds.size + 1 for thresholds in preprocessor.thresholds],
+        "bundle_dir": str(bundle_dir),
+        **profiler.report(),
+    }
+    _logger.warning(f"Trained out-of-core bundle: {bundle_dir.name}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Train a scoring bundle from data streamed in chunks."
+    )
+    parser.add_argument("--data", default=config.app_config.training_data_file)
+    parser.add_argument("--bundle-dir", type=Path)
+    parser.add_argument("--work-dir", type=Path)
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=config.gradient_boosting_model_config.out_of_core_chunk_rows,
+    )
+    args = parser.parse_args()
+
+    print(
+        json.dumps(
+            run_out_of_core_training(
+                file_name=args.data,
+                bundle_dir=args.bundle_dir,
+                work_dir=args.work_dir,
+                chunk_rows=args.chunk_rows,
+            ),
+            indent=2,
+        )
+    )
@@ -1,10 +1,14 @@
+import datetime
+
 from sklearn.model_selection import train_test_split
 
 from gradient_boosting_model import pipeline
 from gradient_boosting_model.processing.data_management import (
     load_dataset,
     save_pipeline,
+    save_run_report,
 )
+from gradient_boosting_model.processing.profiling import RunProfiler, fit_with_profile
 from gradient_boosting_model.config.core import config
 from gradient_boosting_model import __version__ as _version
 
@@ -15,23 +19,47 @@ _logger = logging.getLogger(__name__)
 
 
 def run_training() -> None:
-    """Train the model."""
+    """Train the model.
+
+    Wall time, CPU time and peak memory of every step are written
+    to a JSON run report next to the saved pipeline.
+    """
+    with RunProfiler() as profiler:
+        started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+        # read training data
+        with profiler.measure("load_dataset"):
+            data = load_dataset(file_name=config.app_config.training_data_file)
 
-    # read training data
-    data = load_dataset(file_name=config.app_config.training_data_file)
+        # divide train and test
+        with profiler.measure("train_test_split"):
+            X_train, X_test, y_train, y_test = train_test_split(
+                data[config.gradient_boosting_model_config.features],  # predictors
+                data[config.gradient_boosting_model_config.target],
+                test_size=config.gradient_boosting_model_config.test_size,
+                random_state=config.gradient_boosting_model_config.random_state,
+            )
 
-    # divide train and test
-    X_train, X_test, y_train, y_test = train_test_split(
-        data[config.gradient_boosting_model_config.features],  # predictors
-        data[config.gradient_boosting_model_config.target],
-        test_size=config.gradient_boosting_model_config.test_size,
-        random_state=config.gradient_boosting_model_config.random_state,
-    )
+        fit_with_profile(
+            pipeline=pipeline.price_pipe, X=X_train, y=y_train, profiler=profiler
+        )
+        train_score = pipeline.price_pipe[-1].train_score_.tolist()
 
-    pipeline.price_pipe.fit(X_train, y_train)
+        _logger.warning(f"saving model version: {_version}")
+        with profiler.measure("save_pipeline"):
+            save_pipeline(
+                pipeline_to_persist=pipeline.price_pipe, holdout=(X_test, y_test)
+            )
 
-    _logger.warning(f"saving model version: {_version}")
-    save_pipeline(pipeline_to_persist=pipeline.price_pipe)
+        save_run_report(
+            report={
+                "version": _version,
+                "started_at": started_at,
+                "rows": {"train": len(X_train), "test": len(X_test)},
+                **profiler.report(),
+                "train_score": train_score,
+            }
+        )
 
 
 if __name__ == "__main__":
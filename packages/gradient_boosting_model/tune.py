@@ -0,0 +1,168 @@
+import itertools
+import tempfile
+import typing as t
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold, train_test_split
+
+from gradient_boosting_model.config.core import (
+    config,
+    create_and_validate_config,
+    fetch_config_from_yaml,
+    CONFIG_FILE_PATH,
+    ModelConfig,
+)
+from gradient_boosting_model.pipeline import build_price_pipe
+from gradient_boosting_model.processing.data_management import load_dataset
+
+import logging
+
+
+_logger = logging.getLogger(__name__)
+
+
+def candidate_configs(
+    *,
+    param_grid: t.Mapping[str, t.Sequence[t.Any]],
+    base_config: ModelConfig = config.gradient_boosting_model_config,
+) -> t.List[ModelConfig]:
+    """Expand a parameter grid into validated model configs."""
+    names = list(param_grid)
+    return [
+        ModelConfig(**{**base_config.model_dump(), **dict(zip(names, values))})
+        for values in itertools.product(*param_grid.values())
+    ]
+
+
+def _fit_and_score(
+    *,
+    model_config: ModelConfig,
+    X: pd.DataFrame,
+    y: pd.Series,
+    train_index: np.ndarray,
+    test_index: np.ndarray,
+    cache_dir: str,
+) -> float:
+    """Fit one candidate on one fold and return its held out MSE."""
+    pipe = build_price_pipe(
+        model_config=model_config, memory=Memory(cache_dir, verbose=0)
+    )
+    pipe.fit(X.iloc[train_index], y.iloc[train_index])
+    return mean_squared_error(
+        y.iloc[test_index], pipe.predict(X.iloc[test_index])
+    )
+
+
+def cross_validate(
+    *,
+    model_configs: t.Sequence[ModelConfig],
+    X: pd.DataFrame,
+    y: pd.Series,
+    n_splits: int = config.gradient_boosting_model_config.cv_folds,
+    n_jobs: int = config.gradient_boosting_model_config.tuning_n_jobs,
+    cache_dir: t.Optional[t.Union[str, Path]] = None,
+) -> np.ndarray:
+    """Cross-validate several model configs.
+
+    Every (config, fold) pair runs as its own task on a process pool.
+    The pipelines share an on-disk joblib cache, so a preprocessing step
+    with the same parameters fitted on the same fold is only fitted once,
+    whichever candidate or process needs it first.
+
+    Returns:
+        The held out MSE of each config on each fold, shape (configs, folds).
+    """
+    folds = list(
+        KFold(
+            n_splits=n_splits,
+            shuffle=True,
+            random_state=config.gradient_boosting_model_config.random_state,
+        ).split(X)
+    )
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_and_score)(
+                model_config=model_config,
+                X=X,
+                y=y,
+                train_index=train_index,
+                test_index=test_index,
+                cache_dir=str(cache_dir or scratch_dir),
+            )
+            for model_config in model_configs
+            for train_index, test_index in folds
+        )
+    return np.asarray(scores).reshape(len(model_configs), len(folds))
+
+
+def tune(
+    *,
+    param_grid: t.Optional[t.Mapping[str, t.Sequence[t.Any]]] = None,
+    n_splits: int = config.gradient_boosting_model_config.cv_folds,
+    n_jobs: int = config.gradient_boosting_model_config.tuning_n_jobs,
+    cache_dir: t.Optional[t.Union[str, Path]] = None,
+) -> dict:
+    """Search the tuning grid with cross-validation on the training split.
+
+    The test split used by `run_training` is left untouched.
+    """
+    if param_grid is None:
+        param_grid = config.gradient_boosting_model_config.tuning_grid
+
+    data = load_dataset(file_name=config.app_config.training_data_file)
+    X_train, _, y_train, _ = train_test_split(
+        data[config.gradient_boosting_model_config.features],
+        data[config.gradient_boosting_model_config.target],
+        test_size=config.gradient_boosting_model_config.test_size,
+        random_state=config.gradient_boosting_model_config.random_state,
+    )
+
+    model_configs = candidate_configs(param_grid=param_grid)
+    scores = cross_validate(
+        model_configs=model_configs,
+        X=X_train,
+        y=y_train,
+        n_splits=n_splits,
+        n_jobs=n_jobs,
+        cache_dir=cache_dir,
+    )
+
+    results = [
+        {
+            "params": {name: getattr(model_config, name) for name in param_grid},
+            "mean_mse": float(fold_scores.mean()),
+            "fold_mse": fold_scores.tolist(),
+        }
+        for model_config, fold_scores in zip(model_configs, scores)
+    ]
+    best = min(results, key=lambda result: result["mean_mse"])
+    _logger.info(f"Best tuning candidate: {best}")
+    return {"best_params": best["params"], "results": results}
+
+
+def write_best_config(
+    *,
+    best_params: t.Mapping[str, t.Any],
+    output_path: Path = CONFIG_FILE_PATH,
+) -> None:
+    """Write the config with the tuned parameters applied.
+
+    The YAML is round-tripped, so comments and layout are kept, and
+    it is validated before anything is written.
+    """
+    parsed_config = fetch_config_from_yaml()
+    for name, value in best_params.items():
+        parsed_config[name] = str(value)
+    create_and_validate_config(parsed_config=parsed_config)
+
+    output_path.write_text(parsed_config.as_yaml())
+    _logger.warning(f"Wrote tuned config to: {output_path}")
+
+
+if __name__ == "__main__":
+    tuning_results = tune()
+    write_best_config(best_params=tuning_results["best_params"])
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gradient_boosting_model.config.core import config, DATASET_DIR
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.processing.adapters import to_dataframe
+
+
+@pytest.fixture()
+def raw_input_data():
+    # original column names, before `variables_to_rename` is applied
+    return pd.read_csv(DATASET_DIR / config.app_config.test_data_file).iloc[:50]
+
+
+def test_structured_array_is_wrapped_without_copying(raw_input_data):
+    # Given
+    records = raw_input_data[["LotArea", "1stFlrSF"]].to_records(index=False)
+
+    # When
+    subject = to_dataframe(input_data=records)
+
+    # Then
+    assert list(subject.columns) == ["LotArea", "FirstFlrSF"]
+    assert np.shares_memory(subject["FirstFlrSF"].to_numpy(), records)
+
+
+def test_dict_of_arrays_is_wrapped_without_copying():
+    # Given
+    columns = {"1stFlrSF": np.arange(3), "GrLivArea": np.arange(3.0)}
+
+    # When
+    subject = to_dataframe(input_data=columns)
+
+    # Then
+    assert np.shares_memory(subject["FirstFlrSF"].to_numpy(), columns["1stFlrSF"])
+    assert np.shares_memory(subject["GrLivArea"].to_numpy(), columns["GrLivArea"])
+
+
+def test_make_prediction_accepts_all_input_layouts(raw_input_data):
+    # Given
+    expected = make_prediction(input_data=raw_input_data)["predictions"]
+    layouts = [
+        raw_input_data.to_dict(orient="series"),
+        {name: column.to_numpy() for name, column in raw_input_data.items()},
+        raw_input_data.to_records(index=False),
+        raw_input_data.to_dict(orient="records"),
+    ]
+
+    for layout in layouts:
+        # When
+        subject = make_prediction(input_data=layout)
+
+        # Then
+        assert not subject["errors"]
+        np.testing.assert_array_equal(subject["predictions"], expected)
+
+
+def test_make_prediction_does_not_modify_caller_data(raw_input_data):
+    # Given
+    original = raw_input_data.copy()
+
+    # When
+    make_prediction(input_data=raw_input_data)
+
+    # Then
+    pd.testing.assert_frame_equal(raw_input_data, original)
@@ -0,0 +1,168 @@
+import functools
+import http.server
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from gradient_boosting_model.config.core import config, TRAINED_MODEL_DIR
+from gradient_boosting_model.predict import make_prediction, pipeline_file_name
+from gradient_boosting_model.processing.artifact_store import (
+    CACHE_DIR_NAME,
+    CHUNK_PREFIX,
+    HttpBackend,
+    LocalBackend,
+    MANIFEST_PREFIX,
+    publish,
+    pull,
+)
+from gradient_boosting_model.processing.data_management import load_pipeline
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files with `Range: bytes=N-` support, like a typical web server."""
+
+    def send_head(self):
+        range_header = self.headers.get("Range")
+        path = self.translate_path(self.path)
+        if not range_header:
+            return super().send_head()
+        try:
+            data = open(path, "rb").read()
+        except OSError:
+            self.send_error(404)
+            return None
+        offset = int(range_header.split("=")[1].rstrip("-"))
+        if offset >= len(data):
+            self.send_error(416)
+            return None
+        self.send_response(206)
+        self.send_header("Content-Length", str(len(data) - offset))
+        self.end_headers()
+        self.wfile.write(data[offset:])
+        return None
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def store_url(tmp_path):
+    handler = functools.partial(RangeRequestHandler, directory=str(tmp_path / "store"))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    thread.join()
+
+
+def test_pulled_pipeline_loads_and_reuses_chunks(tmp_path, sample_input_data):
+    # Given
+    backend = LocalBackend(root=tmp_path / "store")
+    source = tmp_path / "v1"
+    source.mkdir()
+    pipeline_bytes = (TRAINED_MODEL_DIR / pipeline_file_name).read_bytes()
+    (source / pipeline_file_name).write_bytes(pipeline_bytes)
+    (source / "metadata.json").write_text('{"version": 1}')
+    first = publish(backend=backend, name="v1", source_dir=source, chunk_bytes=16384)
+    # the next version only changes its metadata
+    (source / "metadata.json").write_text('{"version": 2}')
+    second = publish(backend=backend, name="v2", source_dir=source, chunk_bytes=16384)
+    model_dir = tmp_path / "node"
+
+    # When
+    first_pull = pull(backend=backend, name="v1", model_dir=model_dir)
+    second_pull = pull(backend=backend, name="v2", model_dir=model_dir)
+    pipeline = load_pipeline(file_name=pipeline_file_name, model_dir=model_dir)
+
+    # Then
+    n_chunks = -(-len(pipeline_bytes) // 16384) + 1
+    assert first["uploaded_chunks"] == first_pull["downloaded_chunks"] == n_chunks
+    assert second["uploaded_chunks"] == second_pull["downloaded_chunks"] == 1
+    assert second_pull["reused_chunks"] == n_chunks - 1
+    assert second_pull["unchanged_files"] == 1
+    assert (model_dir / "metadata.json").read_text() == '{"version": 2}'
+    assert len(list((model_dir / CACHE_DIR_NAME).iterdir())) == n_chunks
+    features = sample_input_data[config.gradient_boosting_model_config.features]
+    assert np.array_equal(
+        pipeline.predict(features.iloc[:100]),
+        make_prediction(input_data=sample_input_data.iloc[:100])["predictions"],
+    )
+
+
+def test_http_pull_resumes_and_checks_integrity(tmp_path, store_url):
+    # Given
+    source = tmp_path / "source"
+    source.mkdir()
+    payload = np.random.default_rng(0).bytes(100000)
+    (source / "model.pkl").write_bytes(payload)
+    publish(
+        backend=LocalBackend(root=tmp_path / "store"),
+        name="v1",
+        source_dir=source,
+        chunk_bytes=40000,
+    )
+    model_dir = tmp_path / "node"
+    cache_dir = model_dir / CACHE_DIR_NAME
+    cache_dir.mkdir(parents=True)
+    chunks = sorted((tmp_path / "store" / CHUNK_PREFIX).iterdir())
+    # an interrupted download of the first chunk
+    first = chunks[0]
+    (cache_dir / f"{first.name}.part").write_bytes(first.read_bytes()[:25000])
+
+    # When
+    report = pull(backend=HttpBackend(base_url=store_url), name="v1", model_dir=model_dir)
+
+    # Then
+    assert (model_dir / "model.pkl").read_bytes() == payload
+    assert report["downloaded_chunks"] == 3
+    assert report["downloaded_bytes"] == 100000 - 25000
+    assert not list(cache_dir.glob("*.part"))
+
+    # Given a corrupted chunk in the store
+    (model_dir / "model.pkl").unlink()
+    (cache_dir / first.name).unlink()
+    first.write_bytes(b"corrupt")
+
+    # Then
+    with pytest.raises(ValueError, match="valid copy"):
+        pull(
+            backend=HttpBackend(base_url=store_url),
+            name="v1",
+            model_dir=model_dir,
+            retries=1,
+        )
+    assert not (model_dir / "model.pkl").exists()
+
+
+@pytest.mark.parametrize(
+    "path, digest, match",
+    [
+        ("../outside.pkl", "0" * 64, "leaves the model dir"),
+        ("/tmp/outside.pkl", "0" * 64, "leaves the model dir"),
+        (f"{CACHE_DIR_NAME}/chunk", "0" * 64, "leaves the model dir"),
+        ("model.pkl", "../../outside", "not a SHA-256"),
+    ],
+)
+def test_pull_rejects_manifests_writing_elsewhere(tmp_path, path, digest, match):
+    # Given
+    backend = LocalBackend(root=tmp_path / "store")
+    manifest = {
+        "name": "v1",
+        "files": [{"path": path, "size": 1, "sha256": "0" * 64, "chunks": [digest]}],
+    }
+    backend.write(f"{MANIFEST_PREFIX}/v1.json", json.dumps(manifest).encode())
+
+    # Then
+    with pytest.raises(ValueError, match=match):
+        pull(backend=backend, name="v1", model_dir=tmp_path / "node")
+    assert not (tmp_path / "outside.pkl").exists()
+    with pytest.raises(ValueError, match="expected hash"):
+        pull(
+            backend=backend,
+            name="v1",
+            model_dir=tmp_path / "node",
+            manifest_sha256="0" * 64,
+        )
@@ -0,0 +1,78 @@
+import numpy as np
+
+from gradient_boosting_model.pipeline import build_price_pipe
+from gradient_boosting_model.processing import bundle_scorer
+from gradient_boosting_model.processing.compaction import (
+    compact_pipeline,
+    merge_leaves,
+)
+from gradient_boosting_model.processing.scoring_bundle import (
+    export_pipeline_arrays,
+    quantize_thresholds,
+)
+
+
+def test_quantized_thresholds_give_identical_splits():
+    # Given
+    rng = np.random.default_rng(0)
+    X = rng.normal(scale=1e4, size=10_000).astype(np.float32)
+    thresholds = rng.normal(scale=1e4, size=10_000)
+
+    # When
+    subject = quantize_thresholds(thresholds)
+
+    # Then
+    assert subject.dtype == np.float32
+    assert np.array_equal(X <= thresholds, X <= subject)
+
+
+def test_compact_pipeline_stays_within_tolerance(pipeline_inputs):
+    # Given
+    X_train, X_test, y_train, y_test = pipeline_inputs
+    pipe = build_price_pipe()
+    pipe.fit(X_train, y_train)
+    n_estimators = pipe[-1].n_estimators_
+
+    # When
+    compacted, report = compact_pipeline(
+        pipeline=pipe,
+        X_holdout=X_test,
+        y_holdout=y_test,
+        mse_tolerance=0.01,
+        leaf_tolerance=1000.0,
+    )
+
+    # Then
+    assert report["stages"]["after"] <= report["stages"]["before"]
+    assert compacted[-1].n_estimators_ == report["stages"]["after"]
+    assert pipe[-1].n_estimators_ == n_estimators
+    mse = report["holdout_mse"]
+    assert mse["after"] <= mse["before"] * 1.01
+    assert mse["quantized_bundle"] <= mse["before"] * 1.01
+    assert report["bundle_bytes"]["after"] < report["bundle_bytes"]["before"]
+    assert report["pickle_bytes"]["after"] <= report["pickle_bytes"]["before"]
+
+
+def test_bundle_matches_model_after_merging_leaves(pipeline_inputs):
+    # Given
+    X_train, X_test, y_train, _ = pipeline_inputs
+    pipe = build_price_pipe()
+    pipe.fit(X_train, y_train)
+
+    # When
+    merged = merge_leaves(model=pipe[-1], leaf_tolerance=2000.0)
+    scorer = bundle_scorer.BundleScorer(export_pipeline_arrays(pipeline=pipe))
+    transformed = pipe[:-1].transform(X_test)
+
+    # Then
+    assert merged > 0
+    for tree in pipe[-1].estimators_[:, 0]:
+        # every node but the root is the child of exactly one other node
+        children = np.concatenate([tree.tree_.children_left, tree.tree_.children_right])
+        children = children[children != -1]
+        assert sorted(children) == list(range(1, tree.tree_.node_count))
+    np.testing.assert_allclose(
+        scorer.predict_matrix(transformed.to_numpy(dtype=np.float32)),
+        pipe[-1].predict(transformed),
+        rtol=1e-12,
+    )
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.processing import dedup
+from gradient_boosting_model.processing.dedup import find_unique_rows
+
+
+def test_find_unique_rows_rebuilds_original_rows():
+    # Given
+    data = pd.DataFrame(
+        {"a": [1.0, 2.0, 1.0, np.nan, np.nan], "b": ["x", "y", "x", None, None]}
+    )
+
+    # When
+    unique_positions, inverse = find_unique_rows(dataframe=data)
+
+    # Then
+    assert len(unique_positions) == 3
+    rebuilt = data.iloc[unique_positions].iloc[inverse].reset_index(drop=True)
+    pd.testing.assert_frame_equal(rebuilt, data)
+
+
+def test_hash_collisions_do_not_merge_different_rows(monkeypatch):
+    # Given
+    data = pd.DataFrame(
+        {"a": [1.0, 2.0, 1.0, np.nan, np.nan], "b": ["x", "y", "x", None, None]}
+    )
+    # every row gets the same hash
+    monkeypatch.setattr(
+        dedup.pd.util,
+        "hash_pandas_object",
+        lambda dataframe, index: pd.Series(np.zeros(len(dataframe), dtype=np.uint64)),
+    )
+
+    # When
+    unique_positions, inverse = find_unique_rows(dataframe=data)
+
+    # Then
+    rebuilt = data.iloc[unique_positions].iloc[inverse].reset_index(drop=True)
+    pd.testing.assert_frame_equal(rebuilt, data)
+    assert inverse[0] == inverse[2]
+
+
+def test_make_prediction_collapses_duplicate_rows(sample_input_data):
+    # Given
+    batch = pd.concat([sample_input_data] * 3, ignore_index=True)
+    expected = make_prediction(input_data=batch.copy(), dedup=False)
+
+    # When
+    subject = make_prediction(input_data=batch.copy(), dedup=True)
+
+    # Then
+    assert np.array_equal(subject["predictions"], expected["predictions"])
+    dedup = subject["metadata"]["dedup"]
+    assert dedup["rows"] == len(expected["predictions"])
+    assert dedup["unique_rows"] <= dedup["rows"] / 3
+    assert dedup["dedup_ratio"] >= 2 / 3
+
+
+def test_make_prediction_reports_errors_per_original_row(sample_input_data):
+    # Given
+    batch = pd.concat([sample_input_data.iloc[:5]] * 2, ignore_index=True)
+    batch.at[7, "BsmtQual"] = 50
+
+    # When
+    subject = make_prediction(input_data=batch, dedup=True)
+
+    # Then
+    assert subject["predictions"] is None
+    assert subject["errors"] == {7: {"BsmtQual": ["Not a valid string."]}}
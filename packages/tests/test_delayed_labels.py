@@ -0,0 +1,139 @@
+import numpy as np
+
+from gradient_boosting_model.monitoring.delayed_labels import DelayedLabelEvaluator
+
+DAY = 86400.0
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_add_labels_matches_numpy_metrics():
+    # Given
+    rng = np.random.RandomState(0)
+    ids = np.arange(1000)
+    predictions = rng.normal(200000, 50000, size=ids.size)
+    labels = predictions + rng.normal(0, 10000, size=ids.size)
+    evaluator = DelayedLabelEvaluator(capacity=2000, clock=FakeClock(10.0))
+    evaluator.record(ids=ids, predictions=predictions, version="0.1.0")
+
+    # When
+    shuffled = rng.permutation(ids.size)
+    matched = evaluator.add_labels(ids=ids[shuffled], labels=labels[shuffled])
+
+    # Then
+    errors = predictions - labels
+    (subject,) = evaluator.metrics()
+    assert matched == ids.size
+    assert evaluator.n_pending == 0
+    assert subject["count"] == ids.size
+    assert np.isclose(subject["rmse"], np.sqrt(np.mean(errors**2)))
+    assert np.isclose(subject["mae"], np.mean(np.abs(errors)))
+    assert np.isclose(subject["bias"], np.mean(errors))
+
+
+def test_latest_prediction_wins_and_labels_count_once():
+    # Given
+    clock = FakeClock(0.0)
+    evaluator = DelayedLabelEvaluator(capacity=10, clock=clock)
+    evaluator.record(ids=[1, 2], predictions=[100.0, 200.0], version="a")
+    clock.now = 1.0
+    evaluator.record(ids=[1], predictions=[150.0], version="a")
+
+    # When
+    matched = evaluator.add_labels(ids=[1, 1, 3], labels=[140.0, 0.0, 5.0])
+
+    # Then
+    (subject,) = evaluator.metrics()
+    assert matched == 1
+    assert subject["count"] == 1
+    assert subject["bias"] == 10.0
+    assert evaluator.add_labels(ids=[1], labels=[140.0]) == 1
+
+
+def test_labels_evaluate_every_version_scoring_an_id():
+    # Given
+    clock = FakeClock(0.0)
+    evaluator = DelayedLabelEvaluator(capacity=10, clock=clock)
+    evaluator.record(ids=[1, 2], predictions=[100.0, 200.0], version="live")
+    clock.now = 1.0
+    # a shadow version scores the same Ids later
+    evaluator.record(ids=[1, 2], predictions=[130.0, 190.0], version="shadow")
+
+    # When
+    matched = evaluator.add_labels(ids=[1, 2, 1], labels=[120.0, 200.0, 0.0])
+
+    # Then
+    subject = {row["version"]: row for row in evaluator.metrics()}
+    assert matched == 2
+    assert evaluator.n_pending == 0
+    assert subject["live"]["count"] == subject["shadow"]["count"] == 2
+    assert subject["live"]["bias"] == -10.0
+    assert subject["shadow"]["mae"] == 10.0
+
+
+def test_store_is_bounded_by_capacity_and_retention():
+    # Given
+    clock = FakeClock(0.0)
+    evaluator = DelayedLabelEvaluator(capacity=3, retention_seconds=DAY, clock=clock)
+    evaluator.record(ids=[1, 2, 3, 4], predictions=[1.0, 2.0, 3.0, 4.0], version="a")
+
+    # When
+    first_matched = evaluator.add_labels(ids=[1], labels=[1.0])
+    clock.now = 2 * DAY
+    expired_matched = evaluator.add_labels(ids=[2, 3, 4], labels=[2.0, 3.0, 4.0])
+
+    # Then
+    assert first_matched == 0
+    assert expired_matched == 0
+    assert evaluator.n_pending == 0
+
+
+def test_expiry_follows_time_order_around_the_ring():
+    # Given
+    clock = FakeClock(0.0)
+    evaluator = DelayedLabelEvaluator(capacity=5, retention_seconds=DAY, clock=clock)
+    for hour, ids in enumerate([[1, 2], [3, 4], [5, 6], [7]]):
+        clock.now = hour * 3600.0
+        evaluator.record(ids=ids, predictions=[0.0] * len(ids), version="a")
+
+    # When
+    # ids 1 and 2 were overwritten, 3 and 4 expire, 5 to 7 wrap around the ring end
+    clock.now = DAY + 1.5 * 3600.0
+    evaluator.record(ids=[8], predictions=[0.0], version="a")
+    pending = evaluator.n_pending
+    matched = evaluator.add_labels(ids=list(range(1, 9)), labels=[0.0] * 8)
+
+    # Then
+    assert pending == 4
+    assert matched == 4
+    assert evaluator.n_pending == 0
+
+
+def test_metrics_are_kept_per_version_and_window():
+    # Given
+    clock = FakeClock(0.0)
+    evaluator = DelayedLabelEvaluator(
+        capacity=10, window_seconds=DAY, max_windows=2, clock=clock
+    )
+    for day in range(3):
+        evaluator.record(
+            ids=[day], predictions=[10.0], version="a", timestamp=day * DAY
+        )
+        evaluator.record(
+            ids=[day + 100], predictions=[20.0], version="b", timestamp=day * DAY
+        )
+
+    # When
+    evaluator.add_labels(ids=[0, 1, 2, 100, 101, 102], labels=[0.0] * 6)
+
+    # Then
+    subject = evaluator.metrics(version="a")
+    assert [row["window_start"] for row in subject] == [DAY, 2 * DAY]
+    assert all(row["bias"] == 10.0 for row in subject)
+    assert all(row["bias"] == 20.0 for row in evaluator.metrics(version="b"))
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import _price_pipe, make_prediction
+from gradient_boosting_model.processing import dtypes
+from gradient_boosting_model.processing.dtypes import (
+    check_split_parity,
+    downcast_dtypes,
+)
+from gradient_boosting_model.processing.validation import drop_na_inputs
+
+
+def test_downcast_dtypes_shrinks_memory(sample_input_data):
+    # When
+    compact = downcast_dtypes(dataframe=sample_input_data)
+
+    # Then
+    assert compact["LotArea"].dtype == np.int32
+    assert compact["BsmtFinSF1"].dtype == np.float32
+    assert compact["BsmtQual"].dtype == "category"
+    assert (
+        compact.memory_usage(deep=True).sum()
+        < sample_input_data.memory_usage(deep=True).sum() / 2
+    )
+
+
+def test_downcast_dtypes_keeps_lossy_floats():
+    # Given
+    values = np.array([0.1, 1e-40])
+    frame = pd.DataFrame({"x": values})
+
+    # When
+    compact = downcast_dtypes(dataframe=frame)
+
+    # Then
+    assert compact["x"].dtype == np.float64
+    assert np.array_equal(compact["x"].to_numpy(), values)
+
+
+def test_compact_dtypes_give_identical_splits(sample_input_data):
+    # Given
+    features = config.gradient_boosting_model_config.features
+    data = drop_na_inputs(input_data=sample_input_data)[features]
+
+    # When
+    subject = check_split_parity(pipeline=_price_pipe, data=data)
+
+    # Then
+    assert subject
+
+
+def test_split_parity_fails_on_a_lossy_downcast(sample_input_data, monkeypatch):
+    # Given
+    features = config.gradient_boosting_model_config.features
+    data = drop_na_inputs(input_data=sample_input_data)[features]
+
+    def lossy_downcast(*, dataframe):
+        return dataframe.assign(LotArea=dataframe["LotArea"] // 1000 * 1000)
+
+    monkeypatch.setattr(dtypes, "downcast_dtypes", lossy_downcast)
+
+    # When
+    subject = check_split_parity(pipeline=_price_pipe, data=data)
+
+    # Then
+    assert not subject
+
+
+def test_make_prediction_in_compact_mode(sample_input_data, monkeypatch):
+    # Given
+    expected = make_prediction(input_data=sample_input_data.copy())
+    monkeypatch.setattr(config.scoring_config, "compact_dtypes", True)
+
+    # When
+    subject = make_prediction(input_data=sample_input_data.copy())
+
+    # Then
+    assert not subject["errors"]
+    assert np.array_equal(subject["predictions"], expected["predictions"])
@@ -0,0 +1,104 @@
+import itertools
+import math
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.explain import explain
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.processing.tree_shap import TreeExplainer
+
+
+def _expected_value(tree, x, subset, node=0):
+    """Path-dependent expectation of a tree given the features in `subset`."""
+    left, right = tree.children_left[node], tree.children_right[node]
+    if left == -1:
+        return tree.value[node, 0, 0]
+    if tree.feature[node] in subset:
+        child = left if x[tree.feature[node]] <= tree.threshold[node] else right
+        return _expected_value(tree, x, subset, child)
+    cover = tree.weighted_n_node_samples
+    return (
+        cover[left] * _expected_value(tree, x, subset, left)
+        + cover[right] * _expected_value(tree, x, subset, right)
+    ) / cover[node]
+
+
+def _brute_force_shap(model, x):
+    n_features = len(x)
+    phi = np.zeros(n_features)
+    for feature in range(n_features):
+        others = [other for other in range(n_features) if other != feature]
+        for size in range(n_features):
+            weight = (
+                math.factorial(size)
+                * math.factorial(n_features - size - 1)
+                / math.factorial(n_features)
+            )
+            for subset in itertools.combinations(others, size):
+                for stage in model.estimators_[:, 0]:
+                    with_feature = _expected_value(stage.tree_, x, {*subset, feature})
+                    without = _expected_value(stage.tree_, x, set(subset))
+                    phi[feature] += (
+                        weight * model.learning_rate * (with_feature - without)
+                    )
+    return phi
+
+
+def test_tree_explainer_matches_brute_force_shapley_values():
+    # Given
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4)).astype(np.float32)
+    y = X[:, 0] * X[:, 1] + np.where(X[:, 2] > 0, 2.0, 0.0) + X[:, 0] ** 2
+    model = GradientBoostingRegressor(n_estimators=5, random_state=0).fit(X, y)
+    model.feature_names_in_ = np.array(["a", "b", "c", "d"], dtype=object)
+
+    # When
+    subject = TreeExplainer(model=model)
+    shap_values = subject.shap_values(X[:5])
+
+    # Then
+    for row in range(5):
+        np.testing.assert_allclose(
+            shap_values[row], _brute_force_shap(model, X[row]), atol=1e-10
+        )
+    np.testing.assert_allclose(
+        subject.expected_value + shap_values.sum(axis=1),
+        model.predict(X[:5]),
+        rtol=1e-12,
+    )
+
+
+def test_explain_adds_up_to_predictions(sample_input_data):
+    # Given
+    expected = make_prediction(input_data=sample_input_data)["predictions"]
+
+    # When
+    subject = explain(input_data=sample_input_data)
+
+    # Then
+    contributions = subject["contributions"]
+    assert list(contributions.columns) == config.gradient_boosting_model_config.features
+    assert (contributions["YrSold"] == 0).all()
+    assert contributions["YearRemodAdd"].abs().sum() > 0
+    np.testing.assert_allclose(
+        subject["base_value"] + contributions.sum(axis=1), expected, rtol=1e-9
+    )
+
+
+def test_explain_rows_all_dropped_for_missing_values(sample_input_data):
+    # Given
+    data = sample_input_data.iloc[:3].copy()
+    data["GarageCars"] = np.nan
+
+    # When
+    subject = explain(input_data=data)
+
+    # Then
+    assert subject["errors"] is None
+    assert subject["contributions"].empty
+    assert list(subject["contributions"].columns) == (
+        config.gradient_boosting_model_config.features
+    )
+    assert subject["predictions"].shape == (0,)
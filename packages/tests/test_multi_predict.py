@@ -0,0 +1,35 @@
+import numpy as np
+
+from gradient_boosting_model.multi_predict import MultiModelPredictor
+from gradient_boosting_model.pipeline import build_price_pipe
+from gradient_boosting_model.processing.validation import validate_inputs
+from gradient_boosting_model.tune import candidate_configs
+
+
+def test_variants_share_preprocessing_and_match_their_pipelines(
+    pipeline_inputs, sample_input_data
+):
+    # Given
+    X_train, _, y_train, _ = pipeline_inputs
+    model_configs = candidate_configs(
+        param_grid={"loss": ["squared_error", "huber"], "rare_label_tol": [0.01, 0.2]}
+    )
+    pipelines = {
+        f"{c.loss}_{c.rare_label_tol}": build_price_pipe(model_config=c).fit(
+            X_train, y_train
+        )
+        for c in model_configs
+    }
+    predictor = MultiModelPredictor(pipelines=pipelines)
+
+    # When
+    subject = predictor.predict(input_data=sample_input_data)
+
+    # Then
+    assert subject["errors"] is None
+    assert subject["metadata"]["preprocessing_groups"] == 2
+    assert list(subject["predictions"].columns) == list(pipelines)
+    features, _ = validate_inputs(input_data=sample_input_data)
+    for name, pipeline in pipelines.items():
+        expected = pipeline.predict(features[X_train.columns])
+        assert np.array_equal(subject["predictions"][name].to_numpy(), expected)
@@ -0,0 +1,116 @@
+import asyncio
+import csv
+
+import numpy as np
+
+from gradient_boosting_model.serving.open_loop import (
+    LatencyHistogram,
+    Sender,
+    arrival_offsets,
+    find_knee,
+    run_open_loop,
+    sweep,
+    target_sender,
+    write_csv,
+)
+
+
+class SerialSender(Sender):
+    """Serves one request at a time, taking `seconds` for each."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._lock = None
+
+    async def send(self, index):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await asyncio.sleep(self.seconds)
+        return "ok", self.seconds
+
+    async def close(self):
+        self._lock = None
+
+
+def test_histogram_percentiles_within_precision():
+    # Given
+    values = np.random.default_rng(0).lognormal(mean=-4, sigma=1.5, size=100000)
+    first, second = LatencyHistogram(), LatencyHistogram()
+
+    # When
+    first.record(values[:50000])
+    second.record(values[50000:])
+    first.merge(second)
+
+    # Then
+    assert first.total_count == 100000
+    assert first.value_at_percentile(100) == values.max()
+    for percentile in (50, 90, 99, 99.9):
+        expected = np.percentile(values, percentile, method="inverted_cdf")
+        assert np.isclose(first.value_at_percentile(percentile), expected, rtol=2e-3)
+    summary = first.to_dict()
+    assert sum(count for _, count in summary["buckets"]) == 100000
+    assert len(first.counts) < 50000
+
+
+def test_arrival_schedules():
+    # When
+    constant = arrival_offsets(rate=50, duration_seconds=10, arrival="constant")
+    poisson = arrival_offsets(rate=50, duration_seconds=100, arrival="poisson")
+
+    # Then
+    assert len(constant) == 500
+    assert np.allclose(np.diff(constant), 0.02)
+    assert np.isclose(len(poisson), 5000, rtol=0.05)
+    assert np.isclose(np.diff(poisson).std(), 0.02, rtol=0.1)
+
+
+def test_open_loop_latency_includes_queueing():
+    # Given a target serving 20 requests per second at most
+    sender = SerialSender(seconds=0.05)
+
+    # When
+    report = run_open_loop(
+        sender=sender, rate=40, duration_seconds=1, arrival="constant"
+    )
+
+    # Then the service time hides the backlog the schedule builds up
+    assert report["requests"] == 40
+    assert report["service_latency"]["percentiles"]["p99"] < 0.06
+    assert report["latency"]["percentiles"]["p99"] > 0.9
+    assert report["achieved_rate"] < 25
+
+
+def test_sweep_finds_knee_and_writes_csv(tmp_path):
+    # Given
+    sender = SerialSender(seconds=0.02)
+
+    # When
+    report = sweep(
+        sender=sender, rates=[80, 10, 20], duration_seconds=1, arrival="constant"
+    )
+    write_csv(results=report["results"], file_name=tmp_path / "sweep.csv")
+
+    # Then
+    assert report["knee_rate"] == 20
+    assert [result["offered_rate"] for result in report["results"]] == [10, 20, 80]
+    with open(tmp_path / "sweep.csv") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert [float(row["offered_rate"]) for row in rows] == [10, 20, 80]
+    assert float(rows[2]["p99"]) > float(rows[2]["service_p99"])
+    assert find_knee(results=report["results"][2:]) is None
+
+
+def test_local_target_scores_on_schedule(sample_input_data):
+    # When
+    with target_sender(
+        target="make_prediction", data=sample_input_data, batch_size=5, threads=2
+    ) as sender:
+        report = run_open_loop(
+            sender=sender, rate=20, duration_seconds=1, arrival="constant"
+        )
+
+    # Then
+    assert report["outcomes"] == {"ok": 20}
+    assert report["max_send_lag_seconds"] < 0.05
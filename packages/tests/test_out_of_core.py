@@ -0,0 +1,80 @@
+import tracemalloc
+
+import numpy as np
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.pipeline import build_price_pipe
+from gradient_boosting_model.processing import bundle_scorer
+from gradient_boosting_model.processing.out_of_core import (
+    FEATURES_FILE_NAME,
+    StreamingPreprocessor,
+    read_training_chunks,
+)
+from gradient_boosting_model.processing.scoring_bundle import export_pipeline_arrays
+from gradient_boosting_model.train_out_of_core import run_out_of_core_training
+
+TREE_ARRAYS = {
+    "init_value", "learning_rate", "max_depth", "roots", "children_left",
+    "children_right", "feature", "threshold", "value",
+}
+
+
+def _fit_on_all_rows(raw_training_data):
+    model_config = config.gradient_boosting_model_config
+    return build_price_pipe().fit(
+        raw_training_data[model_config.features],
+        raw_training_data[model_config.target],
+    )
+
+
+def test_chunked_statistics_match_fitted_pipeline(raw_training_data):
+    # Given
+    preprocessor = StreamingPreprocessor()
+    expected = export_pipeline_arrays(pipeline=_fit_on_all_rows(raw_training_data))
+
+    # When
+    for chunk in read_training_chunks(
+        file_name=config.app_config.training_data_file, chunk_rows=100
+    ):
+        preprocessor.update(chunk)
+    subject = preprocessor.finalize().to_arrays()
+
+    # Then
+    assert preprocessor.n_rows == len(raw_training_data)
+    for name in set(expected) - TREE_ARRAYS:
+        if name.startswith("frequent__"):
+            assert set(subject[name]) == set(expected[name])
+        else:
+            np.testing.assert_array_equal(subject[name], expected[name], err_msg=name)
+
+
+def test_out_of_core_bundle_scores_like_its_training(raw_training_data, tmp_path):
+    # Given
+    model_config = config.gradient_boosting_model_config
+    features = raw_training_data[model_config.features]
+    target = raw_training_data[model_config.target].to_numpy()
+
+    was_tracing = tracemalloc.is_tracing()
+
+    # When
+    report = run_out_of_core_training(
+        bundle_dir=tmp_path / "bundle", work_dir=tmp_path / "work", chunk_rows=300
+    )
+    scorer = bundle_scorer.load(tmp_path / "bundle" / bundle_scorer.BUNDLE_FILE_NAME)
+    subject = scorer.predict({name: column.tolist() for name, column in features.items()})
+
+    # Then
+    binned = np.load(tmp_path / "work" / FEATURES_FILE_NAME, mmap_mode="r")
+    assert binned.dtype == np.uint8
+    assert binned.shape == (len(features), len(scorer.model_features))
+    assert report["rows"] == len(features)
+    assert tracemalloc.is_tracing() == was_tracing
+    # the bundle thresholds route rows exactly as their bins did in training
+    np.testing.assert_allclose(
+        subject, np.load(tmp_path / "work" / "raw_predictions.npy"), rtol=1e-12
+    )
+    rmse = np.sqrt(np.mean((subject - target) ** 2))
+    exact_rmse = np.sqrt(
+        np.mean((_fit_on_all_rows(raw_training_data).predict(features) - target) ** 2)
+    )
+    assert rmse < exact_rmse * 1.1
@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import _price_pipe, make_prediction
+from gradient_boosting_model.processing import parallel
+from gradient_boosting_model.processing.parallel import predict_in_chunks
+from gradient_boosting_model.processing.validation import validate_inputs
+
+
+def test_predict_in_chunks_matches_model_predict(sample_input_data):
+    # Given
+    validated_data, _ = validate_inputs(input_data=sample_input_data)
+    transformed = _price_pipe[:-1].transform(
+        validated_data[config.gradient_boosting_model_config.features]
+    )
+
+    # When
+    subject = predict_in_chunks(
+        model=_price_pipe[-1],
+        X=transformed.to_numpy(dtype=np.float32),
+        n_threads=3,
+        chunk_rows=100,
+    )
+
+    # Then
+    assert np.array_equal(subject, _price_pipe[-1].predict(transformed))
+
+
+def test_make_prediction_parallel_path(sample_input_data, monkeypatch):
+    # Given
+    expected = make_prediction(input_data=sample_input_data.copy(), n_threads=1)
+    monkeypatch.setattr(config.scoring_config, "parallel_min_rows", 10)
+
+    # When
+    subject = make_prediction(
+        input_data=sample_input_data.copy(), n_threads=4, chunk_rows=64
+    )
+
+    # Then
+    assert not subject["errors"]
+    assert np.array_equal(subject["predictions"], expected["predictions"])
+
+
+def test_concurrent_calls_share_the_pool_within_their_thread_limits(
+    sample_input_data, monkeypatch
+):
+    # Given
+    validated_data, _ = validate_inputs(input_data=sample_input_data)
+    X = _price_pipe[:-1].transform(
+        validated_data[config.gradient_boosting_model_config.features]
+    ).to_numpy(dtype=np.float32)
+    expected = _price_pipe[-1].predict(X)
+    add_stage_predictions = parallel.add_stage_predictions
+    lock, running, peak = threading.Lock(), {}, {}
+
+    def counting_add_stage_predictions(*, out, **kwargs):
+        # the result array of the call this chunk belongs to
+        key = out.base.__array_interface__["data"][0]
+        with lock:
+            running[key] = running.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), running[key])
+        time.sleep(0.001)
+        add_stage_predictions(out=out, **kwargs)
+        with lock:
+            running[key] -= 1
+
+    monkeypatch.setattr(
+        parallel, "add_stage_predictions", counting_add_stage_predictions
+    )
+    pool = ThreadPoolExecutor(max_workers=6)
+    monkeypatch.setattr(parallel, "_executor", pool)
+
+    # When
+    with pool, ThreadPoolExecutor(max_workers=8) as callers:
+        subject = list(
+            callers.map(
+                lambda n_threads: (
+                    n_threads,
+                    predict_in_chunks(
+                        model=_price_pipe[-1], X=X, n_threads=n_threads, chunk_rows=50
+                    ),
+                ),
+                [1 + i % 6 for i in range(36)],
+            )
+        )
+
+    # Then
+    assert len(peak) == 36
+    for n_threads, predictions in subject:
+        assert np.array_equal(predictions, expected)
+        assert peak[predictions.__array_interface__["data"][0]] <= n_threads
+    assert max(peak.values()) > 1
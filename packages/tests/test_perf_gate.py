@@ -0,0 +1,129 @@
+import copy
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import _price_pipe
+from gradient_boosting_model.processing import data_management
+from gradient_boosting_model.processing import perf_gate
+from gradient_boosting_model.processing.perf_gate import (
+    benchmark_pipeline,
+    check_performance,
+)
+from gradient_boosting_model.processing.profiling import RunProfiler
+
+
+def test_benchmark_pipeline_reports_latency_and_size(sample_input_data):
+    # When
+    subject = benchmark_pipeline(
+        pipeline=_price_pipe, data=sample_input_data, batch_sizes=[1, 3000]
+    )
+
+    # Then
+    assert [batch["batch_size"] for batch in subject["batches"]] == [1, 3000]
+    assert all(batch["repeats"] >= 3 for batch in subject["batches"])
+    assert all(batch["rows_per_second"] > 0 for batch in subject["batches"])
+    assert subject["pickle_bytes"] > 0
+    assert subject["stages"] == _price_pipe[-1].n_estimators_
+
+
+def test_benchmark_inside_a_profiled_section_is_not_traced(
+    sample_input_data, monkeypatch
+):
+    # Given
+    traced_predictions = []
+
+    def predict(batch):
+        traced_predictions.append(tracemalloc.is_tracing())
+        return _price_pipe.predict(batch)
+
+    pipeline = copy.deepcopy(_price_pipe)
+    monkeypatch.setattr(pipeline, "predict", predict)
+    monkeypatch.setattr(perf_gate, "pickle_size", lambda pipeline: 0)
+
+    # When
+    with RunProfiler() as profiler:
+        with profiler.measure("save_pipeline"):
+            data = np.ones(1_000_000)
+            benchmark_pipeline(
+                pipeline=pipeline, data=sample_input_data, batch_sizes=[1]
+            )
+            del data
+            tracing_after = tracemalloc.is_tracing()
+
+    # Then
+    assert traced_predictions and not any(traced_predictions)
+    assert tracing_after
+    assert profiler.sections[0]["peak_memory_bytes"] >= 8_000_000
+
+
+def test_check_performance_flags_budgets_and_regressions():
+    # Given
+    previous = {
+        "batches": [{"batch_size": 1, "median_seconds": 0.001}],
+        "pickle_bytes": 1000,
+    }
+    benchmark = {
+        "batches": [
+            {"batch_size": 1, "median_seconds": 0.1, "rows_per_second": 10},
+        ],
+        "pickle_bytes": 10**9,
+    }
+
+    # When
+    subject = check_performance(benchmark=benchmark, previous=previous)
+
+    # Then
+    assert [violation.split(" ")[:2] for violation in subject] == [
+        ["single", "row"],
+        ["throughput", "10"],
+        ["model", "size"],
+        ["latency", "at"],
+        ["model", "size"],
+    ]
+    assert "regressed from 1000" in subject[-1]
+
+
+def test_save_pipeline_refuses_a_model_over_budget(
+    monkeypatch, pipeline_inputs, tmp_path
+):
+    # Given
+    _, X_test, _, y_test = pipeline_inputs
+    monkeypatch.setattr(data_management, "TRAINED_MODEL_DIR", tmp_path)
+    monkeypatch.setattr(config.performance_config, "perf_gate", "refuse")
+    monkeypatch.setattr(config.performance_config, "benchmark_batch_sizes", [1])
+    monkeypatch.setattr(config.performance_config, "max_model_bytes", 1)
+    monkeypatch.setattr(config.gradient_boosting_model_config, "compact_model", True)
+    monkeypatch.setattr(
+        config.gradient_boosting_model_config, "compaction_leaf_tolerance", 1000.0
+    )
+    benchmarks = []
+
+    def recording_benchmark_pipeline(**kwargs):
+        benchmarks.append(benchmark_pipeline(**kwargs))
+        return benchmarks[-1]
+
+    monkeypatch.setattr(
+        data_management, "benchmark_pipeline", recording_benchmark_pipeline
+    )
+    pipeline = copy.deepcopy(_price_pipe)
+    n_nodes = [stage.tree_.node_count for stage in pipeline[-1].estimators_[:, 0]]
+    (tmp_path / "previous.pkl").touch()
+
+    # When
+    with pytest.raises(ValueError, match="model size"):
+        data_management.save_pipeline(
+            pipeline_to_persist=pipeline, holdout=(X_test, y_test)
+        )
+
+    # Then
+    assert [path.name for path in tmp_path.iterdir()] == ["previous.pkl"]
+    assert [batch["batch_size"] for batch in benchmarks[0]["batches"]] == [1]
+    # the caller's pipeline was not compacted
+    assert pipeline[-1].n_estimators_ == _price_pipe[-1].n_estimators_
+    assert n_nodes == [
+        stage.tree_.node_count for stage in pipeline[-1].estimators_[:, 0]
+    ]
+    assert benchmarks[0]["nodes"] < sum(n_nodes)
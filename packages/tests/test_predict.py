@@ -81,3 +81,16 @@ def test_prediction_range(raw_training_data):
         assert min_target_value * 0.9 <= pred <= max_target_value * 1.1, (
             "Prediction is out of the expected range"
         )
+
+
+def test_prediction_when_every_row_is_dropped_for_missing_values(sample_input_data):
+    # Given a row missing a value that is not allowed to be missing
+    input_df = sample_input_data.iloc[[0]].copy()
+    input_df["GarageCars"] = None
+
+    # When
+    subject = make_prediction(input_data=input_df)
+
+    # Then
+    assert subject["errors"] is None
+    assert len(subject["predictions"]) == 0
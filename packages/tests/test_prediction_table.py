@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.processing.validation import validate_inputs
+from gradient_boosting_model.serving.prediction_table import (
+    MANIFEST_FILE_NAME,
+    PredictionTable,
+    refresh_prediction_table,
+)
+
+
+def test_table_serves_make_prediction_results(sample_input_data, tmp_path):
+    # Given
+    validated_data, _ = validate_inputs(input_data=sample_input_data)
+    expected = make_prediction(input_data=sample_input_data)["predictions"]
+
+    # When
+    report = refresh_prediction_table(directory=tmp_path, input_data=sample_input_data)
+    table = PredictionTable(directory=tmp_path)
+
+    # Then
+    assert report["rebuilt"] and report["scored"] == len(validated_data)
+    ids = validated_data["Id"].to_numpy()
+    np.testing.assert_allclose(table.lookup(ids), expected, rtol=1e-12)
+    assert table.get(int(ids[3])) == table.lookup(ids[3:4])[0]
+    assert table.get(-1) is None
+    assert np.isnan(table.lookup([-1])[0])
+
+
+def test_refresh_rescores_only_changed_rows(sample_input_data, tmp_path):
+    # Given
+    refresh_prediction_table(directory=tmp_path, input_data=sample_input_data)
+    before = PredictionTable(directory=tmp_path)
+    inventory = sample_input_data.iloc[10:].copy()
+    inventory.loc[inventory.index[:5], "GrLivArea"] += 500
+    new_listing = sample_input_data.iloc[[20]].assign(Id=10**6)
+    inventory = pd.concat([inventory, new_listing])
+
+    # When
+    report = refresh_prediction_table(directory=tmp_path, input_data=inventory)
+    table = PredictionTable(directory=tmp_path)
+
+    # Then
+    validated_data, _ = validate_inputs(input_data=inventory)
+    expected = make_prediction(input_data=inventory)["predictions"]
+    assert not report["rebuilt"]
+    assert report["scored"] == 6
+    assert report["removed"] == len(before) + 1 - len(table)
+    np.testing.assert_allclose(
+        table.lookup(validated_data["Id"].to_numpy()), expected, rtol=1e-12
+    )
+    # the table opened before the refresh still reads its own generation
+    assert before.get(int(sample_input_data["Id"].iloc[0])) is not None
+
+
+def test_new_model_version_rebuilds_table(sample_input_data, tmp_path):
+    # Given
+    refresh_prediction_table(directory=tmp_path, input_data=sample_input_data)
+    manifest_path = tmp_path / MANIFEST_FILE_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest_path.write_text(json.dumps({**manifest, "version": "0.0.1"}))
+
+    # When
+    report = refresh_prediction_table(
+        directory=tmp_path, input_data=sample_input_data, remove_missing=False
+    )
+
+    # Then
+    assert report["rebuilt"]
+    assert report["reused"] == 0
+    assert PredictionTable(directory=tmp_path).version == manifest["version"]
@@ -0,0 +1,125 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+from gradient_boosting_model import predict
+from gradient_boosting_model.monitoring import capture
+from gradient_boosting_model.monitoring.capture import (
+    CAPTURE_FILE_PATTERN,
+    CAPTURED_AT_COLUMN,
+    TrafficRecorder,
+)
+from gradient_boosting_model.monitoring.replay import replay
+from gradient_boosting_model.pipeline import build_price_pipe
+from gradient_boosting_model.processing.columnar import read_columnar_chunks
+from gradient_boosting_model.processing.validation import validate_inputs
+from gradient_boosting_model.tune import candidate_configs
+
+
+def test_recorder_captures_exact_validated_inputs(
+    monkeypatch, sample_input_data, tmp_path
+):
+    # Given
+    recorder = TrafficRecorder(directory=tmp_path, chunk_rows=1000)
+    monkeypatch.setattr(predict, "_recorder", recorder)
+    expected, _ = validate_inputs(
+        input_data=sample_input_data, fields=predict.validation_fields()
+    )
+
+    # When
+    predict.make_prediction(input_data=sample_input_data)
+    recorder.flush()
+
+    # Then
+    subject = pd.concat(read_columnar_chunks(tmp_path), ignore_index=True)
+    assert len(list(tmp_path.glob("capture-*.npz"))) == 1
+    pd.testing.assert_frame_equal(
+        subject.drop(columns=[CAPTURED_AT_COLUMN]),
+        expected.reset_index(drop=True),
+    )
+
+
+def test_capture_files_sort_by_time_across_workers(monkeypatch, tmp_path):
+    # Given
+    frame = pd.DataFrame({"LotArea": [1, 2]})
+    recorders = {
+        pid: TrafficRecorder(directory=tmp_path, chunk_rows=2, clock=lambda: now)
+        for pid in (900, 1000)
+    }
+
+    # When
+    for now, pid in [(5, 1000), (20, 900), (100, 1000)]:
+        monkeypatch.setattr(capture.os, "getpid", lambda: pid)
+        recorders[pid].record(dataframe=frame)
+        recorders[pid].flush()
+    for recorder in recorders.values():
+        recorder.close()
+
+    # Then
+    subject = list(read_columnar_chunks(tmp_path, pattern=CAPTURE_FILE_PATTERN))
+    assert [chunk[CAPTURED_AT_COLUMN].iloc[0] for chunk in subject] == [5, 20, 100]
+
+
+def test_replay_compares_pipeline_versions(
+    pipeline_inputs, sample_input_data, tmp_path
+):
+    # Given
+    X_train, _, y_train, _ = pipeline_inputs
+    (model_config,) = candidate_configs(param_grid={"n_estimators": [20]})
+    candidate_file = tmp_path / "candidate.pkl"
+    candidate = build_price_pipe(model_config=model_config).fit(X_train, y_train)
+    joblib.dump(candidate, candidate_file)
+
+    capture_dir = tmp_path / "capture"
+    recorder = TrafficRecorder(directory=capture_dir, chunk_rows=500)
+    for start in range(0, len(sample_input_data), 400):
+        recorder.record(dataframe=sample_input_data.iloc[start:start + 400])
+    recorder.close()
+
+    # When
+    subject = replay(
+        capture_dir=capture_dir,
+        pipeline_files={
+            "current": predict.pipeline_file_name,
+            "same": predict.pipeline_file_name,
+            "candidate": str(candidate_file),
+        },
+        n_jobs=2,
+    )
+
+    # Then
+    assert subject["rows"] == len(sample_input_data)
+    assert subject["chunks"] == len(list(capture_dir.glob("capture-*.npz")))
+    current = subject["versions"]["current"]
+    assert current["scored_rows"] + current["error_rows"] == len(sample_input_data)
+    assert subject["deltas"]["same"]["changed_rows"] == 0
+    assert subject["deltas"]["candidate"]["changed_rows"] > 0
+    assert np.isfinite(subject["deltas"]["candidate"]["rmse"])
+
+
+def test_replay_skips_deltas_when_the_baseline_fails(sample_input_data, tmp_path):
+    # Given
+    broken_file = tmp_path / "broken.pkl"
+    # an unfitted pipeline fails on every chunk
+    joblib.dump(build_price_pipe(), broken_file)
+    capture_dir = tmp_path / "capture"
+    recorder = TrafficRecorder(directory=capture_dir, chunk_rows=500)
+    recorder.record(dataframe=sample_input_data.iloc[:1000])
+    recorder.close()
+
+    # When
+    subject = replay(
+        capture_dir=capture_dir,
+        pipeline_files={
+            "broken": str(broken_file),
+            "current": predict.pipeline_file_name,
+            "same": predict.pipeline_file_name,
+        },
+        n_jobs=1,
+    )
+
+    # Then
+    assert subject["baseline_failed_chunks"] == subject["chunks"] == 1
+    assert subject["versions"]["broken"]["scored_rows"] == 0
+    assert subject["versions"]["current"]["scored_rows"] > 0
+    assert subject["deltas"] == {}
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import _price_pipe
+from gradient_boosting_model.processing import bundle_scorer
+from gradient_boosting_model.processing.scoring_bundle import save_scoring_bundle
+from gradient_boosting_model.processing.validation import validate_inputs
+
+
+def test_bundle_matches_pipeline_predictions(sample_input_data, tmp_path):
+    # Given
+    validated_data, _ = validate_inputs(input_data=sample_input_data)
+    features = validated_data[config.gradient_boosting_model_config.features]
+    bundle_dir = save_scoring_bundle(pipeline=_price_pipe, bundle_dir=tmp_path)
+    scorer = bundle_scorer.load(bundle_dir / bundle_scorer.BUNDLE_FILE_NAME)
+
+    # When
+    subject = scorer.predict(
+        {name: column.tolist() for name, column in features.items()}
+    )
+
+    # Then
+    expected = _price_pipe.predict(features)
+    np.testing.assert_allclose(subject, expected, rtol=1e-12)
+
+
+def test_bundle_imports_without_heavy_dependencies(sample_input_data, tmp_path):
+    # Given
+    save_scoring_bundle(pipeline=_price_pipe, bundle_dir=tmp_path)
+    record = sample_input_data.iloc[:1].to_json(orient="columns")
+    script = (
+        "import json, sys, bundle_scorer\n"
+        f"record = {{k: list(v.values()) for k, v in json.loads({record!r}).items()}}\n"
+        "print(bundle_scorer.load().predict(record)[0])\n"
+        "assert not {'sklearn', 'pandas', 'gradient_boosting_model'} "
+        "& set(sys.modules)\n"
+    )
+
+    # When
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+    )
+
+    # Then
+    assert completed.returncode == 0, completed.stderr
+    expected = _price_pipe.predict(
+        sample_input_data.iloc[:1][config.gradient_boosting_model_config.features]
+    )
+    assert np.isclose(float(completed.stdout), expected[0], rtol=1e-12)
@@ -0,0 +1,186 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.serving.loadgen import build_payloads, run_load
+from gradient_boosting_model.serving.open_loop import ServerSender, run_open_loop
+from gradient_boosting_model.serving.server import PredictionServer, start_server
+
+
+@pytest.fixture(scope="module")
+def server_port():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(
+        start_server(
+            host="127.0.0.1",
+            port=0,
+            prediction_server=PredictionServer(max_request_bytes=1000000),
+        )
+    )
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server.sockets[0].getsockname()[1]
+    loop.call_soon_threadsafe(server.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def _post(connection, path, body):
+    connection.request("POST", path, body=body)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_predict_routes_match_make_prediction(server_port, sample_input_data):
+    # Given
+    batch = sample_input_data.iloc[:50]
+    expected = make_prediction(input_data=batch)["predictions"]
+    record, columns = (
+        build_payloads(data=batch, batch_size=size, n_payloads=1)[0]
+        for size in (1, 50)
+    )
+    connection = http.client.HTTPConnection("127.0.0.1", server_port)
+
+    # When
+    single_status, single = _post(connection, "/predict", record)
+    # the same keep-alive connection serves the next request
+    batch_status, batched = _post(connection, "/predict/batch", columns)
+
+    # Then
+    assert single_status == batch_status == 200
+    assert np.isclose(single["prediction"], expected[0])
+    assert np.allclose(batched["predictions"], expected)
+
+
+def test_server_rejects_bad_requests(server_port, sample_input_data):
+    # Given
+    record = json.loads(build_payloads(data=sample_input_data, n_payloads=1)[0])
+    record["GrLivArea"] = "large"
+    connection = http.client.HTTPConnection("127.0.0.1", server_port)
+
+    # When
+    invalid_status, invalid = _post(connection, "/predict", json.dumps(record))
+    missing_status, _ = _post(connection, "/nowhere", b"{}")
+    # the server answers from the headers, without reading the body
+    with socket.create_connection(("127.0.0.1", server_port)) as raw:
+        raw.sendall(b"POST /predict/batch HTTP/1.1\r\nContent-Length: 1000001\r\n\r\n")
+        too_large = raw.recv(1024)
+    with socket.create_connection(("127.0.0.1", server_port)) as raw:
+        raw.sendall(b"POST /predict HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+        negative_length = raw.recv(1024)
+
+    # Then
+    assert invalid_status == 400
+    assert "GrLivArea" in invalid["errors"]["0"]
+    assert missing_status == 404
+    assert too_large.startswith(b"HTTP/1.1 413 ")
+    assert negative_length.startswith(b"HTTP/1.1 400 ")
+
+
+def test_health_metrics_and_load_generator(server_port, sample_input_data):
+    # Given
+    payloads = build_payloads(data=sample_input_data, n_payloads=10)
+
+    # When
+    report = asyncio.run(
+        run_load(
+            port=server_port,
+            payloads=payloads,
+            concurrency=2,
+            duration_seconds=30,
+            max_requests=20,
+        )
+    )
+    connection = http.client.HTTPConnection("127.0.0.1", server_port)
+    connection.request("GET", "/health")
+    health = json.loads(connection.getresponse().read())
+    connection.request("GET", "/metrics")
+    metrics = connection.getresponse().read().decode()
+
+    # Then
+    assert report["requests"] == 20
+    assert report["statuses"] == {"200": 20}
+    assert health["status"] == "ok"
+    assert 'gb_requests_total{route="/predict",status="200"}' in metrics
+
+
+def test_open_loop_load_against_server(server_port, sample_input_data):
+    # Given
+    sender = ServerSender(
+        payloads=build_payloads(data=sample_input_data, n_payloads=10), port=server_port
+    )
+
+    # When
+    report = run_open_loop(
+        sender=sender, rate=20, duration_seconds=1, arrival="constant"
+    )
+
+    # Then
+    assert report["requests"] == 20
+    assert report["outcomes"] == {"200": 20}
+    assert report["latency"]["count"] == report["service_latency"]["count"] == 20
+    assert not sender._idle
+
+
+def test_busy_predictor_gets_service_unavailable(sample_input_data):
+    # Given
+    def busy_predictor(*, input_data):
+        raise TimeoutError("All scoring daemon slots are busy.")
+
+    server = PredictionServer(predictor=busy_predictor)
+    body = build_payloads(data=sample_input_data, n_payloads=1)[0]
+
+    # When
+    status, payload, _, _ = asyncio.run(server._dispatch("POST", "/predict", body))
+
+    # Then
+    assert status == 503
+    assert json.loads(payload) == {"error": "All scoring daemon slots are busy."}
+
+
+def test_records_dropped_for_missing_values(server_port, sample_input_data):
+    # Given
+    batch = sample_input_data.iloc[:3].copy()
+    batch["GarageCars"] = batch["GarageCars"].astype(object)
+    batch.iloc[1, batch.columns.get_loc("GarageCars")] = None
+    record = json.loads(build_payloads(data=batch.iloc[[1]], n_payloads=1)[0])
+    columns = build_payloads(data=batch, batch_size=3, n_payloads=1)[0]
+    expected = make_prediction(input_data=batch)
+    connection = http.client.HTTPConnection("127.0.0.1", server_port)
+
+    # When
+    single_status, single = _post(connection, "/predict", json.dumps(record))
+    batch_status, batched = _post(connection, "/predict/batch", columns)
+
+    # Then
+    assert expected["metadata"]["dropped_rows"] == [1]
+    assert single_status == 422
+    assert "0" in single["errors"]
+    assert batch_status == 200
+    assert batched["predictions"][1] is None
+    assert np.allclose(
+        [batched["predictions"][0], batched["predictions"][2]],
+        expected["predictions"],
+    )
+
+
+def test_missing_pipeline_gets_internal_server_error(sample_input_data):
+    # Given
+    def unloaded_predictor(*, input_data):
+        return {"predictions": None, "version": "0", "errors": None, "metadata": {}}
+
+    server = PredictionServer(predictor=unloaded_predictor)
+    body = build_payloads(data=sample_input_data, n_payloads=1)[0]
+
+    # When
+    status, payload, _, _ = asyncio.run(server._dispatch("POST", "/predict", body))
+
+    # Then
+    assert status == 500
+    assert json.loads(payload) == {"error": "No model pipeline is loaded."}
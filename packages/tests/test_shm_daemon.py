@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.serving.shm_daemon import ScoringDaemon
+
+
+def test_daemon_scores_like_make_prediction(sample_input_data):
+    # Given
+    expected = make_prediction(input_data=sample_input_data)
+
+    with ScoringDaemon(n_slots=2, slot_rows=500) as daemon:
+        # When
+        # more rows than one slot holds
+        subject = daemon.predict(input_data=sample_input_data)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            child = daemon.predict(input_data=sample_input_data.iloc[:5])
+            os.write(write_fd, child["predictions"].tobytes())
+            os._exit(0)
+        os.waitpid(pid, 0)
+        from_child = np.frombuffer(os.read(read_fd, 1024), dtype=np.float64)
+
+    # Then
+    assert subject["errors"] is None
+    np.testing.assert_array_equal(subject["predictions"], expected["predictions"])
+    np.testing.assert_array_equal(from_child, expected["predictions"][:5])
+
+
+def test_daemon_reports_validation_errors_without_scoring(sample_input_data):
+    # Given
+    invalid = sample_input_data.iloc[:3].copy()
+    invalid["GrLivArea"] = "large"
+
+    daemon = ScoringDaemon(n_slots=1, slot_rows=10, timeout_seconds=0.1)
+
+    # When
+    # never started, so anything submitted would time out
+    try:
+        subject = daemon.predict(input_data=invalid)
+    finally:
+        daemon.close()
+
+    # Then
+    assert subject["predictions"] is None
+    assert "GrLivArea" in subject["errors"][0]
+
+
+def test_full_ring_pushes_back(sample_input_data):
+    # Given
+    daemon = ScoringDaemon(n_slots=1, slot_rows=10, timeout_seconds=0.1)
+
+    try:
+        # When
+        # not started: the first request holds the only slot unanswered
+        with pytest.raises(TimeoutError, match="did not answer"):
+            daemon.predict(input_data=sample_input_data.iloc[:1])
+        with pytest.raises(TimeoutError, match="slots are busy"):
+            daemon.predict(input_data=sample_input_data.iloc[:1])
+    finally:
+        daemon.close()
+
+
+def test_daemon_keeps_missing_and_empty_categories_apart(sample_input_data):
+    # Given
+    batch = sample_input_data.iloc[:6].copy()
+    batch["BsmtQual"] = batch["BsmtQual"].astype(object)
+    batch.iloc[2, batch.columns.get_loc("BsmtQual")] = np.nan
+    # repeated rows are collapsed before they reach a slot
+    batch = pd.concat([batch, batch.iloc[[0, 2]]], ignore_index=True)
+    empty = batch.iloc[:1].copy()
+    empty["BsmtQual"] = ""
+    expected = make_prediction(input_data=batch)
+
+    with ScoringDaemon(n_slots=2, slot_rows=4) as daemon:
+        # When
+        subject = daemon.predict(input_data=batch)
+        # an empty string is a category the model has not seen, not a
+        # missing value, in both paths
+        with pytest.raises(ValueError):
+            make_prediction(input_data=empty)
+        with pytest.raises(RuntimeError, match="failed to score"):
+            daemon.predict(input_data=empty)
+
+    # Then
+    np.testing.assert_array_equal(subject["predictions"], expected["predictions"])
+    assert subject["metadata"]["dedup"] == {"rows": 8, "unique_rows": 6}
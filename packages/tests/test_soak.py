@@ -0,0 +1,71 @@
+import numpy as np
+
+from gradient_boosting_model.monitoring import soak
+
+
+def test_detect_trend_flags_only_significant_growth():
+    # Given
+    rng = np.random.default_rng(0)
+    elapsed = np.arange(60.0)
+    flat = 100 + rng.normal(scale=1.0, size=60)
+    growing = flat + 0.5 * elapsed
+
+    # When
+    flat_trend = soak.detect_trend(elapsed=elapsed, values=flat, alpha=0.01)
+    growing_trend = soak.detect_trend(elapsed=elapsed, values=growing, alpha=0.01)
+
+    # Then
+    assert not flat_trend["significant"]
+    assert growing_trend["significant"]
+    assert np.isclose(growing_trend["growth"], 0.5 * 59 / 100, rtol=0.1)
+
+
+def test_soak_fails_on_leaking_and_mutating_predictor(monkeypatch):
+    # Given
+    leaked = []
+
+    def leaky_prediction(*, input_data, **kwargs):
+        leaked.append(bytearray(1 << 20))
+        # the kind of caller data mutation the soak run checks for
+        input_data.rename(columns={"Id": "id"}, inplace=True)
+        return {"predictions": None, "errors": None}
+
+    monkeypatch.setattr(soak, "make_prediction", leaky_prediction)
+
+    # When
+    subject = soak.run_soak(
+        duration_seconds=3,
+        sample_seconds=0.2,
+        warmup_seconds=0.5,
+        pool_rows=1000,
+        batch_rows=10,
+        mix={"batch_frame": 1.0},
+    )
+
+    # Then
+    assert not subject["passed"]
+    failed = " ".join(subject["failures"])
+    assert "rss_bytes" in failed and "traced_bytes" in failed
+    assert "batch_frame requests changed their input" in failed
+    assert subject["trends"]["traced_bytes"]["growth"] > 1
+    assert subject["allocation_growth"][0]["size_diff_bytes"] > 1 << 20
+    assert len(subject["samples"]) >= 10
+
+
+def test_soak_passes_on_real_traffic():
+    # When
+    subject = soak.run_soak(
+        duration_seconds=4,
+        sample_seconds=0.25,
+        warmup_seconds=1,
+        pool_rows=1000,
+        batch_rows=20,
+        trace_allocations=False,
+    )
+
+    # Then
+    assert not any("rss_bytes" in failure for failure in subject["failures"])
+    assert not any("changed their input" in failure for failure in subject["failures"])
+    assert subject["request_errors"] == {}
+    assert set(subject["requests"]) <= set(soak.TRAFFIC_MIX)
+    assert len(subject["samples"]) >= 12
@@ -0,0 +1,77 @@
+import itertools
+
+import numpy as np
+
+from gradient_boosting_model import predict
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.predict import _price_pipe, make_prediction
+from gradient_boosting_model.processing.staged import (
+    StageCostModel,
+    staged_accuracy_curve,
+)
+from gradient_boosting_model.processing.validation import validate_inputs
+
+
+def test_make_prediction_uses_first_stages(sample_input_data):
+    # Given
+    validated, _ = validate_inputs(input_data=sample_input_data)
+    model = _price_pipe[-1]
+    transformed = _price_pipe[:-1].transform(
+        validated[config.gradient_boosting_model_config.features]
+    )
+    expected = next(itertools.islice(model.staged_predict(transformed), 9, None))
+
+    # When
+    subject = make_prediction(input_data=sample_input_data, max_stages=10)
+
+    # Then
+    assert subject["metadata"]["stages_used"] == 10
+    assert np.allclose(subject["predictions"], expected)
+
+
+def test_make_prediction_fits_stages_to_deadline(sample_input_data):
+    # When
+    rushed = make_prediction(input_data=sample_input_data, deadline_seconds=1e-9)
+    relaxed = make_prediction(input_data=sample_input_data, deadline_seconds=60)
+    default = make_prediction(input_data=sample_input_data)
+
+    # Then
+    assert rushed["metadata"]["stages_used"] == 1
+    assert relaxed["metadata"]["stages_used"] == _price_pipe[-1].n_estimators_
+    assert np.allclose(relaxed["predictions"], default["predictions"])
+
+
+def test_staged_accuracy_curve_ends_at_full_model(pipeline_inputs):
+    # Given
+    _, X_test, _, y_test = pipeline_inputs
+    model = _price_pipe[-1]
+
+    # When
+    subject = staged_accuracy_curve(
+        model=model, X=_price_pipe[:-1].transform(X_test), y=y_test
+    )
+
+    # Then
+    assert subject["stages"][-1] == model.n_estimators_
+    assert subject["relative_mse"][-1] == 1.0
+    assert subject["holdout_mse"][0] > subject["holdout_mse"][-1]
+
+
+def test_stage_cost_is_calibrated_at_load_and_scaled_by_threads():
+    # Given
+    subject = StageCostModel()
+    subject.stage_overhead_seconds, subject.stage_row_seconds = 1e-5, 1e-7
+
+    # When
+    serial = subject.stage_seconds(rows=10000)
+    # 10 chunks on 4 threads: 3 chunks for the busiest thread
+    parallel = subject.stage_seconds(rows=10000, n_threads=4, chunk_rows=1000)
+    affordable = subject.affordable_stages(
+        rows=10000, seconds=0.1, max_stages=1000, n_threads=4, chunk_rows=1000
+    )
+
+    # Then
+    assert predict._stage_cost.is_calibrated
+    assert np.isclose(serial, 1e-5 + 1e-3)
+    assert np.isclose(parallel, 3 * (1e-5 + 1e-4))
+    assert affordable == int(0.1 / parallel)
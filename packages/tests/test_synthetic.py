@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gradient_boosting_model.config.core import config, DATASET_DIR
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.processing.validation import validate_inputs
+from gradient_boosting_model.synthetic import SyntheticDataGenerator, read_npz
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return SyntheticDataGenerator.from_csv(file_name=config.app_config.test_data_file)
+
+
+def _validate(chunk):
+    return validate_inputs(
+        input_data=chunk.rename(
+            columns=config.gradient_boosting_model_config.variables_to_rename
+        )
+    )
+
+
+def test_generated_rows_follow_reference_and_validate(generator):
+    # Given
+    reference = pd.read_csv(f"{DATASET_DIR}/{config.app_config.test_data_file}")
+
+    # When
+    subject = pd.concat(generator.generate(n_rows=20000, chunk_rows=5000))
+
+    # Then
+    assert subject["Id"].tolist() == list(range(1, 20001))
+    for column in ["GrLivArea", "LotFrontage", "OverallQual"]:
+        assert np.isclose(subject[column].mean(), reference[column].mean(), rtol=0.05)
+        assert np.isclose(
+            subject[column].isnull().mean(), reference[column].isnull().mean(), atol=0.01
+        )
+    frequencies = subject["BsmtQual"].value_counts(normalize=True)
+    expected = reference["BsmtQual"].value_counts(normalize=True)
+    assert np.allclose(frequencies[expected.index], expected, atol=0.01)
+    correlation = subject[["GrLivArea", "OverallQual"]].corr(method="spearman")
+    expected_correlation = reference[["GrLivArea", "OverallQual"]].corr(
+        method="spearman"
+    )
+    assert np.isclose(correlation.iloc[0, 1], expected_correlation.iloc[0, 1], atol=0.1)
+    # the reference itself has a few nulls the schema does not allow
+    _, errors = _validate(subject.head(1000))
+    renamed_reference = reference.rename(
+        columns=config.gradient_boosting_model_config.variables_to_rename
+    )
+    assert all(
+        renamed_reference[field].isnull().any()
+        for row_errors in errors.values()
+        for field in row_errors
+    )
+
+
+def test_generation_is_deterministic_and_injects_drift_and_invalid_rows(generator):
+    # When
+    first = next(generator.generate(n_rows=1000, seed=3))
+    second = next(generator.generate(n_rows=1000, seed=3))
+    drifted = next(generator.generate(n_rows=1000, seed=3, drift={"GrLivArea": 1.0}))
+    invalid = next(generator.generate(n_rows=1000, seed=3, invalid_rate=0.1))
+
+    # Then
+    pd.testing.assert_frame_equal(first, second)
+    assert drifted["GrLivArea"].median() > first["GrLivArea"].median()
+    _, errors = _validate(invalid)
+    assert 50 < len(errors) < 150
+
+
+def test_invalid_rows_come_back_in_prediction_errors(generator):
+    # Given
+    chunk = next(generator.generate(n_rows=1000, seed=3, invalid_rate=0.2))
+    invalid = chunk[generator.invalid_columns].map(
+        lambda value: isinstance(value, str)
+    )
+
+    # When
+    subject = make_prediction(input_data=chunk)
+
+    # Then
+    assert 100 < invalid.any(axis=1).sum() < 300
+    # error keys are positions among the rows not dropped for missing values
+    kept = np.delete(
+        invalid.any(axis=1).to_numpy(), subject["metadata"].get("dropped_rows", [])
+    )
+    assert sorted(map(int, subject["errors"])) == list(np.flatnonzero(kept))
+
+
+def test_npz_chunks_round_trip(generator, tmp_path):
+    # Given
+    expected = list(generator.generate(n_rows=2500, chunk_rows=1000))
+
+    # When
+    generator.to_npz(path=tmp_path, n_rows=2500, chunk_rows=1000)
+    subject = list(read_npz(tmp_path))
+
+    # Then
+    assert len(subject) == 3
+    for chunk, expected_chunk in zip(subject, expected):
+        pd.testing.assert_frame_equal(chunk, expected_chunk)
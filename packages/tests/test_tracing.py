@@ -0,0 +1,138 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.monitoring import tracing
+from gradient_boosting_model.pipeline import price_pipe
+from gradient_boosting_model.predict import _price_pipe, make_prediction
+from gradient_boosting_model.processing import parallel
+from gradient_boosting_model.processing.validation import validate_inputs
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = tracing.InMemoryExporter()
+    monkeypatch.setattr(tracing, "_tracer", tracing.Tracer(exporter=exporter))
+    return exporter
+
+
+def test_make_prediction_emits_nested_spans(exporter, sample_input_data):
+    # Given
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    # When
+    subject = make_prediction(input_data=sample_input_data.iloc[:50], trace_id=trace_id)
+
+    # Then
+    assert subject["errors"] is None
+    spans = {span.name: span for span in exporter.spans}
+    root = spans["make_prediction"]
+    assert root.parent_span_id is None
+    assert root.attributes["rows"] == 50
+    assert {span.trace_id for span in exporter.spans} == {trace_id}
+    steps = [f"price_pipe.{name}" for name, _ in price_pipe.steps]
+    assert set(steps) <= set(spans)
+    for name in ["validate_inputs", *steps]:
+        assert spans[name].parent_span_id == root.span_id
+        assert root.start_time_unix_nano <= spans[name].start_time_unix_nano
+        assert spans[name].end_time_unix_nano <= root.end_time_unix_nano
+    # the root span ends last
+    assert exporter.spans[-1] is root
+
+
+def test_chunk_spans_follow_the_caller_into_pool_threads(
+    exporter, sample_input_data, monkeypatch
+):
+    # Given
+    monkeypatch.setattr(parallel, "_executor", ThreadPoolExecutor(max_workers=3))
+    validated_data, _ = validate_inputs(input_data=sample_input_data)
+    transformed = _price_pipe[:-1].transform(
+        validated_data[config.gradient_boosting_model_config.features]
+    )
+    X = transformed.to_numpy(dtype=np.float32)
+
+    # When
+    with tracing.span("request") as root:
+        parallel.predict_in_chunks(
+            model=_price_pipe[-1], X=X, n_threads=3, chunk_rows=50
+        )
+
+    # Then
+    chunks = [span for span in exporter.spans if span.name != "request"]
+    assert sorted(span.attributes["start"] for span in chunks) == list(
+        range(0, len(X), 50)
+    )
+    assert {span.parent_span_id for span in chunks} == {root.span_id}
+    assert {span.trace_id for span in chunks} == {root.trace_id}
+    assert tracing.current_span() is None
+
+
+def test_head_sampling_keeps_or_drops_whole_traces(monkeypatch, sample_input_data):
+    # Given
+    exporter = tracing.InMemoryExporter()
+    tracer = tracing.Tracer(exporter=exporter, sample_ratio=0.5)
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    request_ids = [f"request-{i}" for i in range(200)]
+
+    # When
+    for request_id in request_ids:
+        with tracing.span("request", trace_id=request_id):
+            with tracing.span("child"):
+                pass
+
+    # Then
+    sampled = [tracing.as_trace_id(i) for i in request_ids]
+    sampled = [trace_id for trace_id in sampled if tracer.is_sampled(trace_id)]
+    assert 60 < len(sampled) < 140
+    assert [span.trace_id for span in exporter.spans] == [
+        trace_id for trace_id in sampled for _ in range(2)
+    ]
+    assert tracing.current_span() is None
+
+
+def test_json_lines_exporter_buffers_otlp_spans(monkeypatch, tmp_path):
+    # Given
+    path = tmp_path / "traces.jsonl"
+    exporter = tracing.JsonLinesExporter(path=path, buffer_spans=3)
+    monkeypatch.setattr(tracing, "_tracer", tracing.Tracer(exporter=exporter))
+
+    # When
+    with pytest.raises(KeyError):
+        with tracing.span("root", rows=10, model_version="1.0"):
+            with tracing.span("step", ratio=0.5):
+                pass
+            raise KeyError("missing")
+    written_before_flush = path.exists()
+    with tracing.span("other"):
+        pass
+    exporter.flush()
+
+    # Then
+    assert not written_before_flush
+    step, root, other = [json.loads(line) for line in path.read_text().splitlines()]
+    assert step["parentSpanId"] == root["spanId"]
+    assert step["traceId"] == root["traceId"] != other["traceId"]
+    assert int(root["startTimeUnixNano"]) <= int(root["endTimeUnixNano"])
+    assert root["attributes"] == [
+        {"key": "rows", "value": {"intValue": "10"}},
+        {"key": "model_version", "value": {"stringValue": "1.0"}},
+    ]
+    assert root["status"] == {"code": 2, "message": "KeyError: 'missing'"}
+    assert step["status"] == {"code": 0}
+
+
+def test_spans_are_shared_no_ops_when_tracing_is_off(monkeypatch):
+    # Given
+    monkeypatch.setattr(tracing, "_tracer", None)
+
+    # When
+    with tracing.span("make_prediction", rows=1) as subject:
+        recording = tracing.is_recording()
+
+    # Then
+    assert subject is None
+    assert not recording
+    assert tracing.span("other") is tracing.span("make_prediction")
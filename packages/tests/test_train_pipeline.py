@@ -0,0 +1,49 @@
+import json
+import tracemalloc
+
+import numpy as np
+
+from gradient_boosting_model import train_pipeline
+from gradient_boosting_model.pipeline import build_price_pipe
+from gradient_boosting_model.processing import data_management
+from gradient_boosting_model.processing.profiling import RunProfiler, fit_with_profile
+
+
+def test_fit_with_profile_matches_pipeline_fit(pipeline_inputs):
+    # Given
+    X_train, X_test, y_train, _ = pipeline_inputs
+    expected = build_price_pipe().fit(X_train, y_train).predict(X_test)
+    was_tracing = tracemalloc.is_tracing()
+
+    # When
+    with RunProfiler() as profiler:
+        subject = fit_with_profile(
+            pipeline=build_price_pipe(), X=X_train, y=y_train, profiler=profiler
+        )
+
+    # Then
+    assert np.array_equal(subject.predict(X_test), expected)
+    names = [section["name"] for section in profiler.sections]
+    assert names[:2] == ["numerical_imputer.fit", "numerical_imputer.transform"]
+    assert names[-1] == "gb_model.fit"
+    # tracing is left as it was found
+    assert tracemalloc.is_tracing() == was_tracing
+
+
+def test_run_training_writes_run_report(monkeypatch, tmp_path):
+    # Given
+    monkeypatch.setattr(data_management, "TRAINED_MODEL_DIR", tmp_path)
+
+    # When
+    train_pipeline.run_training()
+
+    # Then
+    with open(tmp_path / data_management.run_report_file_name()) as report_file:
+        subject = json.load(report_file)
+    names = [section["name"] for section in subject["sections"]]
+    assert names[:2] == ["load_dataset", "train_test_split"]
+    assert names[-1] == "save_pipeline"
+    assert "rare_label_encoder.fit" in names
+    assert all(section["peak_memory_bytes"] > 0 for section in subject["sections"])
+    assert len(subject["train_score"]) == 50
+    assert (tmp_path / data_management.metadata_file_name()).exists()
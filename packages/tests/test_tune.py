@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from gradient_boosting_model.config.core import (
+    create_and_validate_config,
+    fetch_config_from_yaml,
+)
+from gradient_boosting_model.tune import (
+    candidate_configs,
+    cross_validate,
+    tune,
+    write_best_config,
+)
+
+
+def test_candidate_configs_expand_and_validate_grid():
+    # When
+    subject = candidate_configs(
+        param_grid={"n_estimators": ["10", "20"], "loss": ["squared_error", "huber"]}
+    )
+
+    # Then
+    assert len(subject) == 4
+    assert {(c.n_estimators, c.loss) for c in subject} == {
+        (10, "squared_error"),
+        (10, "huber"),
+        (20, "squared_error"),
+        (20, "huber"),
+    }
+
+
+def test_cross_validate_reuses_cached_preprocessing(pipeline_inputs, tmp_path):
+    # Given
+    X_train, _, y_train, _ = pipeline_inputs
+    model_configs = candidate_configs(param_grid={"n_estimators": [5, 10]})
+
+    # When
+    scores = cross_validate(
+        model_configs=model_configs,
+        X=X_train,
+        y=y_train,
+        n_splits=2,
+        n_jobs=2,
+        cache_dir=tmp_path,
+    )
+
+    # Then
+    assert scores.shape == (2, 2)
+    cached_fits = [
+        path
+        for path in tmp_path.rglob("*")
+        if path.is_dir() and path.parent.name == "_fit_transform_one"
+    ]
+    # six preprocessing steps per fold, shared by both candidates
+    assert len(cached_fits) == 6 * 2
+
+
+def test_tune_writes_a_valid_config(tmp_path):
+    # Given
+    output_path = Path(tmp_path) / "tuned_config.yml"
+
+    # When
+    results = tune(
+        param_grid={"n_estimators": [5, 10], "loss": ["squared_error"]},
+        n_splits=2,
+        n_jobs=1,
+    )
+    write_best_config(best_params=results["best_params"], output_path=output_path)
+
+    # Then
+    assert len(results["results"]) == 2
+    tuned = create_and_validate_config(
+        parsed_config=fetch_config_from_yaml(cfg_path=output_path)
+    )
+    assert tuned.gradient_boosting_model_config.n_estimators == 10
@@ -1,4 +1,12 @@
-from gradient_boosting_model.processing.validation import validate_inputs
+import collections
+import gc
+import weakref
+
+from gradient_boosting_model import predict
+from gradient_boosting_model.config.core import config
+from gradient_boosting_model.pipeline import build_price_pipe
+from gradient_boosting_model.predict import _price_pipe, make_prediction
+from gradient_boosting_model.processing.validation import model_fields, validate_inputs
 
 
 def test_validate_inputs_valid_data(sample_input_data):
@@ -33,3 +41,75 @@ def test_validate_inputs_identifies_single_error(sample_input_data):
     assert errors
     assert len(errors) == 1
     assert errors[1] == {"BldgType": ["Not a valid string."]}
+
+
+def test_validate_inputs_projects_model_fields(sample_input_data):
+    # Given
+    test_inputs = sample_input_data.copy()
+    test_inputs.at[1, "BldgType"] = 50  # not read by the model
+    test_inputs.at[2, "BsmtQual"] = 50  # read by the model
+    fields = model_fields(pipelines=[_price_pipe], extras=["Id"])
+
+    # When
+    validated_inputs, errors = validate_inputs(input_data=test_inputs, fields=fields)
+
+    # Then
+    assert "Id" in fields and "YrSold" in fields and "BldgType" not in fields
+    assert set(fields) >= set(config.gradient_boosting_model_config.features)
+    assert list(validated_inputs.columns) == fields
+    assert len(validated_inputs) == 1457
+    assert errors == {2: {"BsmtQual": ["Not a valid string."]}}
+
+
+def test_make_prediction_strict_mode_validates_every_field(sample_input_data):
+    # Given
+    test_inputs = sample_input_data.iloc[:5].copy()
+    test_inputs.at[1, "BldgType"] = 50
+
+    # When
+    projected = make_prediction(input_data=test_inputs)
+    strict = make_prediction(input_data=test_inputs, strict=True)
+
+    # Then
+    assert projected["errors"] is None
+    assert strict["errors"] == {1: {"BldgType": ["Not a valid string."]}}
+
+
+def test_validation_fields_are_computed_once(monkeypatch):
+    # Given
+    calls = []
+
+    def counting_model_fields(**kwargs):
+        calls.append(kwargs)
+        return model_fields(**kwargs)
+
+    monkeypatch.setattr(predict, "model_fields", counting_model_fields)
+    monkeypatch.setattr(predict, "_fields_cache", collections.OrderedDict())
+
+    # When
+    first = predict.validation_fields()
+    second = predict.validation_fields()
+    with_extra = predict.validation_fields(extras=["BldgType"])
+
+    # Then
+    assert first == second
+    assert "BldgType" in with_extra and "BldgType" not in first
+    assert len(calls) == 2
+
+
+def test_validation_fields_cache_is_bounded_and_weak(monkeypatch):
+    # Given
+    monkeypatch.setattr(predict, "_fields_cache", collections.OrderedDict())
+    monkeypatch.setattr(predict, "FIELDS_CACHE_SIZE", 2)
+    pipelines = [build_price_pipe() for _ in range(3)]
+    references = [weakref.ref(pipeline) for pipeline in pipelines]
+
+    # When
+    for pipeline in pipelines:
+        predict.validation_fields(pipelines=[pipeline])
+    del pipeline, pipelines
+    gc.collect()
+
+    # Then
+    assert len(predict._fields_cache) == 2
+    assert all(reference() is None for reference in references)
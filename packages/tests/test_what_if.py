@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gradient_boosting_model.predict import make_prediction
+from gradient_boosting_model.what_if import what_if
+
+
+def _expected(base, points):
+    rows = pd.concat([base] * len(points), ignore_index=True)
+    for column in points.columns:
+        rows[column] = points[column].to_numpy()
+    return make_prediction(input_data=rows)["predictions"]
+
+
+def test_cartesian_grid_matches_scoring_each_point(sample_input_data):
+    # Given
+    base = sample_input_data.iloc[[3]]
+    grid = {
+        "GarageCars": [0, 1, 2, 3, 2],
+        # both change the years since remodelling
+        "YearRemodAdd": [1960, 1990, 2005],
+        "YrSold": [2006, 2010],
+        "BsmtQual": ["TA", "Gd", "Ex"],
+        "1stFlrSF": [600, 1200],
+    }
+
+    # When
+    subject = what_if(base_record=base, grid=grid)
+
+    # Then
+    assert subject["errors"] is None
+    assert len(subject["grid"]) == 4 * 3 * 2 * 3 * 2
+    assert list(subject["grid"].columns) == [
+        "GarageCars", "YearRemodAdd", "YrSold", "BsmtQual", "FirstFlrSF"
+    ]
+    assert np.allclose(subject["predictions"], _expected(base, subject["grid"]))
+    assert np.isclose(
+        subject["base_prediction"], make_prediction(input_data=base)["predictions"][0]
+    )
+
+
+def test_one_at_a_time_grid_varies_each_feature_alone(sample_input_data):
+    # Given
+    base = sample_input_data.iloc[[10]]
+    grid = {"GrLivArea": [800, 1500, 2500], "GarageCars": [1, 3]}
+
+    # When
+    subject = what_if(base_record=base, grid=grid, mode="one_at_a_time")
+
+    # Then
+    assert subject["grid"]["feature"].tolist() == ["GrLivArea"] * 3 + ["GarageCars"] * 2
+    for feature in grid:
+        varied = (subject["grid"]["feature"] == feature).to_numpy()
+        points = pd.DataFrame({feature: subject["grid"]["value"][varied].to_numpy()})
+        assert np.allclose(subject["predictions"][varied], _expected(base, points))
+
+
+def test_invalid_grid_values_are_reported(sample_input_data):
+    # When
+    subject = what_if(
+        base_record=sample_input_data.iloc[[0]],
+        grid={"GrLivArea": ["large", 1000], "GarageCars": [None]},
+    )
+
+    # Then
+    assert subject["predictions"] is None
+    assert subject["errors"]["GrLivArea=large"] == {
+        "GrLivArea": ["Not a valid integer."]
+    }
+    assert "GarageCars=None" in subject["errors"]
+    with pytest.raises(ValueError, match="unknown features"):
+        what_if(base_record=sample_input_data.iloc[[0]], grid={"Pool": [1]})
+    with pytest.raises(ValueError, match="more than 10"):
+        what_if(
+            base_record=sample_input_data.iloc[[0]],
+            grid={"GrLivArea": list(range(11))},
+            max_points=10,
+        )
+
+
+def test_fields_the_model_does_not_read_are_not_validated(sample_input_data):
+    # Given
+    base = sample_input_data.iloc[[0]].copy()
+    base["BldgType"] = 50
+
+    # When
+    subject = what_if(base_record=base, grid={"GarageCars": [1, 2]})
+
+    # Then
+    assert make_prediction(input_data=base)["errors"] is None
+    assert subject["errors"] is None
+    assert len(subject["predictions"]) == 2